@@ -0,0 +1,47 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Shared by the bench scripts that pace through a kernel. Such scripts take a module:newKernel spec naming a zero arg
+# callable that answers a warmed BonesKernel (e.g. the one given to KernelPool), as the kernel's libraries live
+# outside this repo.
+
+import os, sys, time, importlib
+
+
+def argsOrUsage(minArgs, usage):
+    # answers the command line args, exiting with the usage if there are too few
+    args = sys.argv[1:]
+    if len(args) < minArgs:
+        print(f'usage: {usage}')
+        sys.exit(1)
+    return args
+
+
+def kernelFactory(spec):
+    modName, fnName = spec.split(':')
+    return getattr(importlib.import_module(modName), fnName)
+
+
+def newKernel(spec):
+    return kernelFactory(spec)()
+
+
+def srcFrom(srcOrPath):
+    if os.path.exists(srcOrPath):
+        with open(srcOrPath) as f:
+            return f.read()
+    return srcOrPath
+
+
+def timePace(k, src, repeats=1):
+    # answers the mean seconds per pace and the last answer
+    t1 = time.perf_counter()
+    for _ in range(repeats):
+        answer = k.pace(src)
+    return (time.perf_counter() - t1) / repeats, answer
@@ -0,0 +1,72 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Block calls/sec as a higher order fn such as each sees them - a block is paced, then called from python in a tight
+# loop, once via its blockctx (args bound into the enclosing frame) and once by pushing a fresh frame per call as a
+# tcfunc does. Optionally also times pacing a whole each loop.
+#
+#   python bench/bench_block_calls.py module:newKernel [block] [n] [eachSrc]
+#
+# newKernel is a zero arg callable answering a warmed BonesKernel, block defaults to {[x] x}, eachSrc would be
+# something like '1 upto 100000 each {[x] x + 1}' for a kernel whose libraries define upto and each
+
+import sys, time
+
+from bones.kernel.tc_interpreter import blockctx
+
+from _bench import argsOrUsage, newKernel, timePace
+
+
+def _framedCall(k, block, args):
+    # the per call frame approach, for comparison
+    sm = k.sm
+    frame = sm.pushFrame(block.symtab)
+    try:
+        for name, arg in zip(block.argnames, args):
+            frame[name] = arg
+        val = None
+        for n in block.body:
+            val = k.tcrunner.ex(n)
+        return val
+    finally:
+        sm.popFrame()
+
+
+def _time(fn, n):
+    t1 = time.perf_counter()
+    for i in range(n):
+        fn(i)
+    return n / (time.perf_counter() - t1)
+
+
+def main(spec, blockSrc, n, eachSrc):
+    k = newKernel(spec)
+    ctx = k.pace(blockSrc)
+    if not isinstance(ctx, blockctx):
+        print(f'{blockSrc!r} answered {type(ctx).__name__} not a block')
+        sys.exit(1)
+    if ctx.block.numargs != 1:
+        print('the block must take one arg')
+        sys.exit(1)
+    block = ctx.block
+    print(f'{"":>10} {"calls/s":>12}')
+    print(f'{"blockctx":>10} {_time(ctx, n):>12,.0f}')
+    print(f'{"framed":>10} {_time(lambda i: _framedCall(k, block, (i,)), n):>12,.0f}')
+    if eachSrc:
+        print(f'{eachSrc!r} took {timePace(k, eachSrc)[0]:.3f}s')
+
+
+if __name__ == '__main__':
+    args = argsOrUsage(1, 'bench_block_calls.py module:newKernel [block] [n] [eachSrc]')
+    main(
+        args[0],
+        args[1] if len(args) > 1 else '{[x] x}',
+        int(args[2]) if len(args) > 2 else 100_000,
+        args[3] if len(args) > 3 else '',
+    )
@@ -0,0 +1,85 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Early exits - ^ from inside a block unwinds by answering UNWIND rather than raising. First the mechanism on its own,
+# unwinding through the same python frames by UNWIND vs by an exception, then (given a kernel) a recursive bones fn
+# where about half the calls exit early.
+#
+#   python bench/bench_early_return.py [module:newKernel [src.b]] [n]
+#
+# newKernel is a zero arg callable answering a warmed BonesKernel whose libraries define <, +, - and ifTrue:, src.b
+# defaults to DEFAULT_SRC
+
+import sys, time
+
+from bones.kernel._core import UNWIND
+
+from _bench import newKernel, srcFrom, timePace
+
+
+DEFAULT_SRC = '''
+_fib: {[n:count] <:count>
+    n < 2 ifTrue: [^ n]
+    _fib(n - 1) + _fib(n - 2)
+}
+_fib(20)
+'''
+
+_DEPTH = 4      # interpreter frames between the ^ and the fn it returns from, e.g. tcapply -> ifTrue: -> blockctx
+
+
+class _Return(Exception): pass
+
+
+def _byStatus(depth, exit):
+    if depth == 0: return UNWIND if exit else 1
+    if (r := _byStatus(depth - 1, exit)) is UNWIND: return r
+    return r
+
+
+def _byException(depth, exit):
+    if depth == 0:
+        if exit: raise _Return()
+        return 1
+    return _byException(depth - 1, exit)
+
+
+def _catching(fn, exit):
+    try:
+        return fn(_DEPTH, exit)
+    except _Return:
+        return 0
+
+
+def _rate(fn, exit, n):
+    t1 = time.perf_counter()
+    for _ in range(n):
+        _catching(fn, exit)
+    return n / (time.perf_counter() - t1)
+
+
+def micro(n):
+    print(f'{"":>10} {"no exit/s":>14} {"exit/s":>14}')
+    for name, fn in (('status', _byStatus), ('exception', _byException)):
+        print(f'{name:>10} {_rate(fn, False, n):>14,.0f} {_rate(fn, True, n):>14,.0f}')
+
+
+def kernel(spec, src, repeats):
+    k = newKernel(spec)
+    k.pace(src)                         # warm up
+    t, answer = timePace(k, src, repeats)
+    print(f'answer {answer}, {t * 1000:.2f} ms per pace')
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    n = int(args.pop()) if args and args[-1].isdigit() else 200_000
+    micro(n)
+    if args:
+        kernel(args[0], srcFrom(args[1]) if len(args) > 1 else DEFAULT_SRC, max(1, n // 20_000))
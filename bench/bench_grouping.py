@@ -0,0 +1,66 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# tokens/sec of parse_groups.parseStructure over the canon
+#
+#   python bench/bench_grouping.py [repeats]
+
+import sys, os, glob, time
+
+from bones.core.sentinels import Missing
+from bones.kernel import lex, parse_groups
+from bones.kernel.symbol_table import SymbolTable
+from bones.lang.types import unary
+
+
+CANON = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'canon')
+
+
+class _GroupingKernel:
+    # grouping only needs the style registry from the kernel
+    def __init__(self):
+        self.styleByName = {}
+    def styleForName(self, name):
+        return self.styleByName.get(name, unary)
+
+
+def _group(tokens, src):
+    k = _GroupingKernel()
+    globalCtx = SymbolTable(k, Missing, Missing, Missing, Missing, 'global')
+    scratch = SymbolTable(k, Missing, Missing, Missing, globalCtx, 'scratch')
+    return parse_groups.parseStructure(tokens, scratch, src)
+
+
+def canonSources():
+    answer = []
+    for path in sorted(glob.glob(os.path.join(CANON, '**', '*.b'), recursive=True)):
+        with open(path) as f:
+            src = f.read()
+        try:
+            tokens, lines = lex.lexBonesSrc(1, src)
+            _group(tokens, src)
+        except Exception:
+            continue        # some canon files exercise features the grouper doesn't handle yet
+        answer.append((path, src, tokens))
+    return answer
+
+
+def main(repeats):
+    sources = canonSources()
+    numTokens = sum(len(tokens) for _, _, tokens in sources) * repeats
+    t1 = time.perf_counter()
+    for _ in range(repeats):
+        for path, src, tokens in sources:
+            _group(tokens, src)
+    t2 = time.perf_counter()
+    print(f'{len(sources)} files, {numTokens} tokens in {t2 - t1:.3f}s - {numTokens / (t2 - t1):,.0f} tokens/s')
+
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
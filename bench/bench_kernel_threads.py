@@ -0,0 +1,63 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# N kernels on N threads, each pacing the same source - throughput and speedup over one thread. Expect ~1x on a GIL
+# build (the kernels only need to not corrupt each other) and, on a free-threaded build, scaling limited by parsing
+# and analysis, which take turns as they share bones.core.context.
+#
+#   python bench/bench_kernel_threads.py module:newKernel src.b [maxThreads] [repeats]
+#
+# newKernel is a zero arg callable answering a warmed BonesKernel (e.g. the one given to KernelPool)
+
+import sys, os, time, threading
+
+from _bench import argsOrUsage, kernelFactory, srcFrom
+
+
+def run(newKernel, src, numThreads, repeats):
+    kernels = [newKernel() for _ in range(numThreads)]
+    errors = []
+    barrier = threading.Barrier(numThreads + 1)
+
+    def work(k):
+        k.pace(src)                     # warm up outside the timing
+        barrier.wait()
+        try:
+            for _ in range(repeats):
+                k.pace(src)
+        except Exception as ex:
+            errors.append(ex)
+
+    threads = [threading.Thread(target=work, args=(k,)) for k in kernels]
+    for t in threads: t.start()
+    barrier.wait()
+    t1 = time.perf_counter()
+    for t in threads: t.join()
+    t2 = time.perf_counter()
+    if errors: raise errors[0]
+    return numThreads * repeats / (t2 - t1)
+
+
+def main(spec, path, maxThreads, repeats):
+    newKernel = kernelFactory(spec)
+    src = srcFrom(path)
+    gil = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f'{os.path.basename(path)}, GIL {"enabled" if gil else "disabled"}')
+    print(f'{"threads":>8} {"paces/s":>12} {"speedup":>8}')
+    base, n = None, 1
+    while n <= maxThreads:
+        rate = run(newKernel, src, n, repeats)
+        base = base or rate
+        print(f'{n:>8} {rate:>12,.1f} {rate / base:>8.2f}')
+        n *= 2
+
+
+if __name__ == '__main__':
+    args = argsOrUsage(2, 'bench_kernel_threads.py module:newKernel src.b [maxThreads] [repeats]')
+    main(args[0], args[1], int(args[2]) if len(args) > 2 else os.cpu_count(), int(args[3]) if len(args) > 3 else 20)
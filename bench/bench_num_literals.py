@@ -0,0 +1,50 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Pacing a script with a large embedded numeric table, once with the kernel's litnumarrayCons (the table goes straight
+# from the tokens into one buffer) and once without (a tclittup of boxed litnums). Without it 2D tuples aren't parsed
+# yet so both runs use a 1D table of rows * cols elements, plus a rows x cols 2D table for the array.
+#
+#   python bench/bench_num_literals.py module:newKernel [rows] [cols]
+#
+# newKernel is a zero arg callable answering a warmed BonesKernel
+
+import sys, random
+
+from bones.core.sentinels import Missing
+
+from _bench import argsOrUsage, newKernel, timePace
+
+
+def tableSrc(rows, cols, sep):
+    rng = random.Random(1)
+    lines = [', '.join(f'{rng.random():.4f}' for _ in range(cols)) + sep for _ in range(rows)]
+    return 'table: (\n' + '\n'.join(lines).rstrip(',') + '\n)\n'
+
+
+def main(spec, rows, cols):
+    k = newKernel(spec)
+    flat, table = tableSrc(rows, cols, ','), tableSrc(rows, cols, ';')
+    cons = k.litnumarrayCons
+    if cons is Missing:
+        print('the kernel has no litnumarrayCons')
+        sys.exit(1)
+    print(f'{rows * cols} elements')
+    print(f'  2D array {timePace(k, table)[0] * 1000:>10.1f} ms')
+    print(f'  1D array {timePace(k, flat)[0] * 1000:>10.1f} ms')
+    k.litnumarrayCons = Missing
+    try:
+        print(f'  1D boxed {timePace(k, flat)[0] * 1000:>10.1f} ms')
+    finally:
+        k.litnumarrayCons = cons
+
+
+if __name__ == '__main__':
+    args = argsOrUsage(1, 'bench_num_literals.py module:newKernel [rows] [cols]')
+    main(args[0], int(args[1]) if len(args) > 1 else 1_000, int(args[2]) if len(args) > 2 else 10)
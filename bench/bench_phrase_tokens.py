@@ -0,0 +1,45 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Parsing long pipelines, e.g. `x f f f ... f` as one phrase, through the kernel - the time in each PACE phase as
+# reported by the profiler, and the phrase phase per step, which stays flat if parsePhrase / buildFnApplication are
+# linear in the length of the phrase
+#
+#   python bench/bench_phrase_tokens.py module:newKernel [fn] [steps ...]
+#
+# newKernel is a zero arg callable answering a warmed BonesKernel in which fn (default inc) is a unary fn of a number
+
+from _bench import argsOrUsage, newKernel
+
+
+def pipelineSrc(fn, steps):
+    return 'x ' + ' '.join([fn] * steps)
+
+
+def main(spec, fn, stepss):
+    k = newKernel(spec)
+    k.pace('x: 1')
+    print(f'{"steps":>8} {"lex (s)":>10} {"group (s)":>10} {"phrase (s)":>11} {"execute (s)":>12} {"phrase/step (us)":>17}')
+    for steps in stepss:
+        src = pipelineSrc(fn, steps)
+        prof = k.startProfiling(nodes=False)
+        try:
+            k.pace(src)
+        finally:
+            k.stopProfiling()
+        t = prof.phaseTimes
+        perStep = t['phrase'] / steps * 1_000_000
+        print(f'{steps:>8} {t["lex"]:>10.4f} {t["group"]:>10.4f} {t["phrase"]:>11.4f} {t["execute"]:>12.4f} {perStep:>17.2f}')
+
+
+if __name__ == '__main__':
+    args = argsOrUsage(1, 'bench_phrase_tokens.py module:newKernel [fn] [steps ...]')
+    fn = args[1] if len(args) > 1 and not args[1].isdigit() else 'inc'
+    stepss = [int(a) for a in args[1:] if a.isdigit()]
+    main(args[0], fn, stepss or [1_000, 10_000, 100_000])
@@ -0,0 +1,41 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Pacing a script that calls bones fns heavily, with the kernel's specialiser (call sites in a fn specialised by arg
+# types reuse their last selection) and without (every call site runs Overload.selectFunction).
+#
+#   python bench/bench_specialise.py module:newKernel src [repeats]
+#
+# newKernel is a zero arg callable answering a warmed BonesKernel, src is a script (or a path to one) that defines and
+# calls some fns, e.g. a recursive fn over a list. If the kernel wasn't made with maxSpecialisations one keeping 8 per fn
+# is used
+
+from bones.core.sentinels import Missing
+from bones.kernel.monomorph import Specialiser
+
+from _bench import argsOrUsage, newKernel, srcFrom, timePace
+
+
+def main(spec, src, repeats):
+    src = srcFrom(src)
+    k = newKernel(spec)
+    original = k.specialiser
+    specialiser = Specialiser(8) if original is Missing else original
+    try:
+        k.specialiser = specialiser
+        print(f'  specialised   {timePace(k, src, repeats)[0] * 1000:>10.1f} ms   {specialiser}')
+        k.specialiser = Missing
+        print(f'  generic       {timePace(k, src, repeats)[0] * 1000:>10.1f} ms')
+    finally:
+        k.specialiser = original
+
+
+if __name__ == '__main__':
+    args = argsOrUsage(2, 'bench_specialise.py module:newKernel src [repeats]')
+    main(args[0], args[1], int(args[2]) if len(args) > 2 else 5)
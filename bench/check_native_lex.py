@@ -0,0 +1,89 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# differential check of the native lexer (rainbow/src/bl/lex.c) against lex.lexBonesSrc over the canon plus some edge
+# cases, and the speed of each
+#
+#   cd rainbow/src/bl && cc -O2 -shared -fPIC -o libbllex.so lex.c && cd -
+#   python bench/check_native_lex.py [repeats]
+
+import sys, os, glob, time
+
+from bones.core.sentinels import Missing
+from bones.kernel import lex, lex_native
+
+
+CANON = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'canon')
+
+EDGE_CASES = [
+    '', '\n', 'a', 'a:b', 'a :b', 'a: b', '(a):b', 'f:(1)', 'x :_..g', '_..g: 1', '_.c: 1', 'a:_.c', '..m .p',
+    '`a', '`a`b`c', '`a `b', '(  [1, 2]', '{ [x] x}', '{{[x] x}}', '[[1]]', '2020.01.02', '2020.01.02D12:34:56.789GMT',
+    '2020.01.02D12:34:56', '2020.01.02D12:34', '12:34:56.7', '12:34', '12:34GMT', '1.5', '42', '1.', '^^', '^', '^^^',
+    '> <: >>', '"a"', '"a\\"b"', '"a\\\\"b"', '""""', '"\n"', 'a /- c -/ b /- d -/', '// c\nx', 'a \\\nb', 'a \\  \nb',
+    '+ ++ +++ ++++', '...', 'a, b; c. d', '\n\n  \n a\n\n', '  a\n    b\n\t c', 'a.b.c d._e', 'f (\x1c[1]',
+]
+
+
+def check(src):
+    expected = lex.lexBonesSrc(1, src)
+    actual = lex_native.lexBonesSrcNative(1, src)
+    if actual is Missing: return 'fallback'
+    if actual[1] != expected[1]: return 'lines differ'
+    for i, (a, e) in enumerate(zip(actual[0], expected[0])):
+        if a != e: return f'token {i} differs - native {tuple(a)} python {tuple(e)}'
+    if len(actual[0]) != len(expected[0]): return f'{len(actual[0])} tokens vs {len(expected[0])}'
+    return 'ok'
+
+
+def main(repeats):
+    if not lex_native.isAvailable():
+        print('native lexer not available - build rainbow/src/bl/libbllex.so or set BONES_LEX_LIB')
+        return 1
+    sources = []
+    for path in sorted(glob.glob(os.path.join(CANON, '**', '*.b'), recursive=True)):
+        with open(path) as f:
+            sources.append((os.path.relpath(path, CANON), f.read()))
+    sources += [(repr(src), src) for src in EDGE_CASES]
+
+    counts, failures = {}, 0
+    for name, src in sources:
+        try:
+            result = check(src)
+        except Exception as ex:
+            result = 'python error'      # nothing to compare against, the native lexer should have fallen back
+            if lex_native.lexBonesSrcNative(1, src) is not Missing: result = f'native accepted, python raised {ex}'
+        if result not in ('ok', 'fallback', 'python error'):
+            failures += 1
+            print(f'{name}: {result}')
+        key = result if result in ('ok', 'fallback', 'python error') else 'FAILED'
+        counts[key] = counts.get(key, 0) + 1
+    print(', '.join(f'{k}: {v}' for k, v in counts.items()))
+
+    timed = [src for name, src in sources if checkOk(src)]
+    numChars = sum(len(src) for src in timed) * repeats
+    t1 = time.perf_counter()
+    for _ in range(repeats):
+        for src in timed: lex.lexBonesSrc(1, src)
+    t2 = time.perf_counter()
+    for _ in range(repeats):
+        for src in timed: lex_native.lexBonesSrcNative(1, src)
+    t3 = time.perf_counter()
+    print(f'python {numChars / (t2 - t1):,.0f} chars/s, native {numChars / (t3 - t2):,.0f} chars/s ({(t2 - t1) / (t3 - t2):.1f}x)')
+    return 1 if failures else 0
+
+
+def checkOk(src):
+    try:
+        return check(src) == 'ok'
+    except Exception:
+        return False
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
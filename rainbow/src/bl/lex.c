@@ -0,0 +1,336 @@
+// *********************************************************************************************************************
+// Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+// "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+// http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+// distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+// either express or implied. See the License for the specific language governing permissions and limitations under the
+// License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+// *********************************************************************************************************************
+
+// Native implementation of bones.kernel.lex.lexBonesSrc for ASCII source. The Python lexer is the reference - each
+// regex rule is hand translated below, tried in the same order (the first that matches wins), and the same little
+// merge state machine is run so the tokens come out identical. Anything awkward (breakouts, conditional comments,
+// illegal tokens, unmatched characters) answers an error code and the caller falls back to the Python lexer, which
+// also produces the proper error messages.
+//
+// build:  cc -O2 -shared -fPIC -o libbllex.so lex.c
+//
+// output is a flat int32 buffer of BL_REC_SIZE ints per token - tag, s1, s2, l1, l2, c1, c2, indent - with the tag
+// ids supplied by the caller via bl_lex_set_tags so that lex.py remains the single source of truth for them
+
+#include <stdint.h>
+#include <string.h>
+
+#define BL_REC_SIZE 8
+
+#define BL_ERR_CAPACITY -1
+#define BL_ERR_NO_MATCH -2
+#define BL_ERR_ILLEGAL -3
+#define BL_ERR_FALLBACK -4
+#define BL_ERR_NO_TAGS -5
+
+// rules in the order of lex._bonesLexRules followed by the tags created by merging
+enum {
+    T_LEADING_SPACES, T_WHITE_BREAK, T_BREAKOUT, T_INLINE_COMMENT, T_CONDITIONAL_COMMENT, T_LINE_COMMENT,
+    T_LINE_BREAK, T_TEXT, T_SYMS, T_SYM,
+    T_GLOBALTIMESTAMP_SS, T_GLOBALTIMESTAMP_S, T_GLOBALTIMESTAMP_M, T_LOCALTIMESTAMP_SS, T_LOCALTIMESTAMP_S,
+    T_LOCALTIMESTAMP_M, T_DATE, T_GLOBALTIME_SS, T_GLOBALTIME_S, T_GLOBALTIME_M, T_LOCALTIME_SS, T_LOCALTIME_S,
+    T_LOCALTIME_M, T_DECIMAL, T_INTEGER,
+    T_R_ANGLE, T_SIGNAL, T_RETURN, T_L_ANGLE_COLON,
+    T_GLOBAL_BIND_LEFT, T_GLOBAL_NAME, T_GLOBAL_BIND_RIGHT, T_CONTEXT_BIND_LEFT, T_CONTEXT_NAME, T_CONTEXT_BIND_RIGHT,
+    T_MODULE_VALUE_NAME, T_PARENT_VALUE_NAME, T_NAME,
+    T_L_PAREN_BRACKET, T_L_PAREN, T_R_PAREN, T_L_BRACKET_BRACKET, T_L_BRACKET, T_R_BRACKET, T_L_BRACE_BRACE_BRACKET,
+    T_L_BRACE_BRACKET, T_L_BRACE_BRACE, T_R_BRACE_BRACE, T_L_BRACE, T_R_BRACE,
+    T_CONTINUATION, T_SYMBOLIC_NAME, T_ILLEGAL_MANY_DOTS, T_ELLIPSES, T_ILLEGAL_TWO_DOTS, T_DOT, T_COMMA, T_SEMI_COLON,
+    T_COLON,
+    T_NUM_RULES,
+    T_KEYWORD_OR_BIND_LEFT = T_NUM_RULES, T_BIND_RIGHT, T_R_PAREN_COLON, T_COLON_L_PAREN,
+    T_NUM
+};
+
+static int32_t tagIds[T_NUM];
+static int haveTags = 0;
+
+int bl_lex_num_tags(void) {
+    return T_NUM;
+}
+
+void bl_lex_set_tags(const int32_t *ids) {
+    memcpy(tagIds, ids, sizeof(tagIds));
+    haveTags = 1;
+}
+
+
+// ---------------------------------------------------------------------------------------------------------------------
+// character classes - what python's re uses for \w and \s on ASCII text (\s includes \x1c-\x1f as str.isspace does)
+// ---------------------------------------------------------------------------------------------------------------------
+
+static inline int isDigit(char c) { return c >= '0' && c <= '9'; }
+static inline int isAlpha(char c) { return (c >= 'a' && c <= 'z') || (c >= 'A' && c <= 'Z'); }
+static inline int isW(char c) { return isAlpha(c) || isDigit(c) || c == '_'; }
+static inline int isNameStart(char c) { return isAlpha(c) || c == '_'; }
+static inline int isSpace(char c) { return c == ' ' || (c >= '\t' && c <= '\r') || (c >= '\x1c' && c <= '\x1f'); }
+static inline int isOperator(char c) { return c != 0 && strchr("_<>!=#@$%^&*+/|~'?-", c) != 0; }
+
+static inline int startsWith(const char *s, long pos, long n, const char *prefix) {
+    long len = (long) strlen(prefix);
+    return pos + len <= n && memcmp(s + pos, prefix, len) == 0;
+}
+
+
+// ---------------------------------------------------------------------------------------------------------------------
+// matchers - answer the end of the match or -1
+// ---------------------------------------------------------------------------------------------------------------------
+
+static long name(const char *s, long pos, long n) {
+    // [a-zA-Z_]\w*
+    if (pos >= n || !isNameStart(s[pos])) return -1;
+    pos++;
+    while (pos < n && isW(s[pos])) pos++;
+    return pos;
+}
+
+static long dottedName(const char *s, long pos, long n) {
+    // ([a-zA-Z_]\w*\.)*[a-zA-Z_]\w* - segments are forced by the dots so greedy is the same as backtracking
+    long e = name(s, pos, n), e2;
+    if (e < 0) return -1;
+    while (e < n && s[e] == '.' && (e2 = name(s, e + 1, n)) >= 0) e = e2;
+    return e;
+}
+
+static long prefixedName(const char *s, long pos, long n, const char *prefix, int colon) {
+    long e;
+    if (!startsWith(s, pos, n, prefix)) return -1;
+    e = dottedName(s, pos + (long) strlen(prefix), n);
+    if (e < 0) return -1;
+    if (colon) return (e < n && s[e] == ':') ? e + 1 : -1;
+    return e;
+}
+
+static long template(const char *s, long pos, long n, const char *t) {
+    // y [1-2], d [0-9], m [0-1], t [0-3], u [A-Z], + [0-9]+, anything else is a literal - the classes either side of a
+    // + are never digits so greedy is the same as backtracking
+    for (; *t; t++) {
+        if (pos >= n) return -1;
+        char c = s[pos];
+        switch (*t) {
+            case 'y': if (c < '1' || c > '2') return -1; pos++; break;
+            case 'd': if (!isDigit(c)) return -1; pos++; break;
+            case 'm': if (c < '0' || c > '1') return -1; pos++; break;
+            case 't': if (c < '0' || c > '3') return -1; pos++; break;
+            case 'u': if (c < 'A' || c > 'Z') return -1; pos++; break;
+            case '+':
+                if (!isDigit(c)) return -1;
+                while (pos < n && isDigit(s[pos])) pos++;
+                break;
+            default: if (c != *t) return -1; pos++;
+        }
+    }
+    return pos;
+}
+
+static long text(const char *s, long pos, long n) {
+    // (\")(([\S\s]*?[^\\](\\\\)*))\1 - the first closing quote such that the content is not empty and ends in a
+    // non-backslash followed by an even number of backslashes
+    long q, k;
+    if (s[pos] != '"') return -1;
+    for (q = pos + 2; q < n; q++) {
+        if (s[q] != '"') continue;
+        k = 0;
+        while (q - 1 - k > pos && s[q - 1 - k] == '\\') k++;
+        if (q - 1 - k > pos && (k % 2) == 0) return q + 1;
+    }
+    return -1;
+}
+
+static long syms(const char *s, long pos, long n, int min) {
+    // (`\w+){min,}
+    long count = 0, e;
+    while (pos < n && s[pos] == '`') {
+        e = pos + 1;
+        while (e < n && isW(s[e])) e++;
+        if (e == pos + 1) break;
+        pos = e;
+        count++;
+    }
+    return count >= min ? pos : -1;
+}
+
+static long greedyComment(const char *s, long pos, long n, const char *opener, const char *closer) {
+    // (/-)(([\S\s]*)-/) - greedy so runs to the last closer in the source
+    long q;
+    if (!startsWith(s, pos, n, opener)) return -1;
+    for (q = n - 2; q >= pos + 2; q--) {
+        if (s[q] == closer[0] && s[q + 1] == closer[1]) return q + 2;
+    }
+    return -1;
+}
+
+static long spacesThen(const char *s, long pos, long n, const char *opener, char last) {
+    // opener(\s)*last
+    if (!startsWith(s, pos, n, opener)) return -1;
+    pos += (long) strlen(opener);
+    while (pos < n && isSpace(s[pos])) pos++;
+    return (pos < n && s[pos] == last) ? pos + 1 : -1;
+}
+
+static long literal(const char *s, long pos, long n, const char *lit) {
+    return startsWith(s, pos, n, lit) ? pos + (long) strlen(lit) : -1;
+}
+
+static long match(int rule, const char *s, long pos, long n) {
+    long e;
+    char c = s[pos];
+    switch (rule) {
+        case T_LEADING_SPACES:
+            if (c != ' ') return -1;
+            for (e = pos; e < n && s[e] == ' '; e++);
+            return e;
+        case T_WHITE_BREAK:
+            if (c != ' ' && c != '\t') return -1;
+            for (e = pos; e < n && (s[e] == ' ' || s[e] == '\t'); e++);
+            return e;
+        case T_BREAKOUT: return literal(s, pos, n, "'{[");        // caller falls back
+        case T_INLINE_COMMENT: return greedyComment(s, pos, n, "/-", "-/");
+        case T_CONDITIONAL_COMMENT: return greedyComment(s, pos, n, "/!", "!/");
+        case T_LINE_COMMENT:
+            if (!startsWith(s, pos, n, "//")) return -1;
+            for (e = pos + 2; e < n && s[e] != '\n'; e++);
+            return e;
+        case T_LINE_BREAK:
+            if (c != '\n') return -1;
+            for (e = pos; e < n && s[e] == '\n'; e++);
+            return e;
+        case T_TEXT: return text(s, pos, n);
+        case T_SYMS: return syms(s, pos, n, 2);
+        case T_SYM: return syms(s, pos, n, 1);
+        case T_GLOBALTIMESTAMP_SS: return template(s, pos, n, "yddd.md.tdDdd:dd:dd.+uuu");
+        case T_GLOBALTIMESTAMP_S: return template(s, pos, n, "yddd.md.tdDdd:dd:dduuu");
+        case T_GLOBALTIMESTAMP_M: return template(s, pos, n, "yddd.md.tdDdd:dduuu");
+        case T_LOCALTIMESTAMP_SS: return template(s, pos, n, "yddd.md.tdDdd:dd:dd.+");
+        case T_LOCALTIMESTAMP_S: return template(s, pos, n, "yddd.md.tdDdd:dd:dd");
+        case T_LOCALTIMESTAMP_M: return template(s, pos, n, "yddd.md.tdDdd:dd");
+        case T_DATE: return template(s, pos, n, "yddd.md.td");
+        case T_GLOBALTIME_SS: return template(s, pos, n, "dd:dd:dd.+uuu");
+        case T_GLOBALTIME_S: return template(s, pos, n, "dd:dd:dduuu");
+        case T_GLOBALTIME_M: return template(s, pos, n, "dd:dduuu");
+        case T_LOCALTIME_SS: return template(s, pos, n, "dd:dd:dd.+");
+        case T_LOCALTIME_S: return template(s, pos, n, "dd:dd:dd");
+        case T_LOCALTIME_M: return template(s, pos, n, "dd:dd");
+        case T_DECIMAL: return template(s, pos, n, "+.+");        // the (?!0-9) lookahead can never fail
+        case T_INTEGER: return template(s, pos, n, "+");
+        case T_R_ANGLE: return (c == '>' && !(pos + 1 < n && s[pos + 1] == '>')) ? pos + 1 : -1;
+        case T_SIGNAL: return (startsWith(s, pos, n, "^^") && !(pos + 2 < n && s[pos + 2] == '^')) ? pos + 2 : -1;
+        case T_RETURN: return (c == '^' && !(pos + 1 < n && s[pos + 1] == '^')) ? pos + 1 : -1;
+        case T_L_ANGLE_COLON: return literal(s, pos, n, "<:");
+        case T_GLOBAL_BIND_LEFT: return prefixedName(s, pos, n, "_..", 1);
+        case T_GLOBAL_NAME: return prefixedName(s, pos, n, "_..", 0);
+        case T_GLOBAL_BIND_RIGHT: return prefixedName(s, pos, n, ":_..", 0);
+        case T_CONTEXT_BIND_LEFT: return prefixedName(s, pos, n, "_.", 1);
+        case T_CONTEXT_NAME: return prefixedName(s, pos, n, "_.", 0);
+        case T_CONTEXT_BIND_RIGHT: return prefixedName(s, pos, n, ":_.", 0);
+        case T_MODULE_VALUE_NAME: return prefixedName(s, pos, n, "..", 0);
+        case T_PARENT_VALUE_NAME: return prefixedName(s, pos, n, ".", 0);
+        case T_NAME: return dottedName(s, pos, n);
+        case T_L_PAREN_BRACKET: return spacesThen(s, pos, n, "(", '[');
+        case T_L_PAREN: return literal(s, pos, n, "(");
+        case T_R_PAREN: return literal(s, pos, n, ")");
+        case T_L_BRACKET_BRACKET: return literal(s, pos, n, "[[");
+        case T_L_BRACKET: return literal(s, pos, n, "[");
+        case T_R_BRACKET: return literal(s, pos, n, "]");
+        case T_L_BRACE_BRACE_BRACKET: return spacesThen(s, pos, n, "{{", '[');
+        case T_L_BRACE_BRACKET: return spacesThen(s, pos, n, "{", '[');
+        case T_L_BRACE_BRACE: return literal(s, pos, n, "{{");
+        case T_R_BRACE_BRACE: return literal(s, pos, n, "}}");
+        case T_L_BRACE: return literal(s, pos, n, "{");
+        case T_R_BRACE: return literal(s, pos, n, "}");
+        case T_CONTINUATION:
+            // \\(^\t| )*[\n] - compileBonesRE strips the space and the ^ can never match so just \\\n
+            return literal(s, pos, n, "\\\n");
+        case T_SYMBOLIC_NAME:
+            for (e = pos; e < n && e < pos + 3 && isOperator(s[e]); e++);
+            return e > pos ? e : -1;
+        case T_ILLEGAL_MANY_DOTS:
+            for (e = pos; e < n && s[e] == '.'; e++);
+            return e - pos >= 4 ? e : -1;
+        case T_ELLIPSES: return literal(s, pos, n, "...");
+        case T_ILLEGAL_TWO_DOTS: return literal(s, pos, n, "..");
+        case T_DOT: return literal(s, pos, n, ".");
+        case T_COMMA: return literal(s, pos, n, ",");
+        case T_SEMI_COLON: return literal(s, pos, n, ";");
+        case T_COLON: return literal(s, pos, n, ":");
+    }
+    return -1;
+}
+
+
+// ---------------------------------------------------------------------------------------------------------------------
+// lex loop - mirrors lex.lexBonesSrc
+// ---------------------------------------------------------------------------------------------------------------------
+
+#define LINE_START(l) ((l) == 1 ? 0 : lineEnds[(l) - 1] + 1)
+
+static void setRec(int32_t *rec, int tag, long s1, long s2, long l1, long l2, long c1, long c2, long indent) {
+    rec[0] = tag; rec[1] = (int32_t) s1; rec[2] = (int32_t) s2; rec[3] = (int32_t) l1; rec[4] = (int32_t) l2;
+    rec[5] = (int32_t) c1; rec[6] = (int32_t) c2; rec[7] = (int32_t) indent;
+}
+
+long bl_lex(const char *s, long n, int32_t *out, long capacity, int32_t *lineEnds, long numLines) {
+    // lineEnds[l] (1 <= l <= numLines) is the offset of the \n ending line l (or n for the last line), i.e.
+    // lex.Line.s2. Answers the number of tokens written (excluding START) or a BL_ERR_ code
+    long pos = 0, e, l1 = 1, l2, s1, s2, c1, c2, indent, num = 0;
+    int rule, tag, priorTag = -1;
+    int32_t *last;
+
+    if (!haveTags) return BL_ERR_NO_TAGS;
+
+    while (pos < n) {
+        for (rule = 0; rule < T_NUM_RULES; rule++) {
+            if ((e = match(rule, s, pos, n)) >= 0) break;
+        }
+        if (rule == T_NUM_RULES) return BL_ERR_NO_MATCH;
+        if (rule == T_BREAKOUT || rule == T_CONDITIONAL_COMMENT) return BL_ERR_FALLBACK;
+        if (rule == T_ILLEGAL_MANY_DOTS || rule == T_ILLEGAL_TWO_DOTS) return BL_ERR_ILLEGAL;
+        tag = rule;
+
+        if (tag != T_LEADING_SPACES && tag != T_WHITE_BREAK) {
+            s1 = pos; s2 = e;
+            while (l1 < numLines && s1 > lineEnds[l1]) l1++;
+            l2 = l1;
+            while (l2 < numLines && s2 > lineEnds[l2]) l2++;
+            indent = s1 - LINE_START(l2);
+            if (tag == T_LINE_BREAK) {
+                c1 = 0; c2 = -1;
+            } else {
+                c1 = s1 - LINE_START(l1) + 1;
+                c2 = s2 - LINE_START(l2);
+            }
+            last = num > 0 ? out + (num - 1) * BL_REC_SIZE : 0;
+
+            if (priorTag == T_NAME && tag == T_COLON) {
+                tag = T_KEYWORD_OR_BIND_LEFT;
+                setRec(last, tagIds[tag], last[1], s2, last[3], l2, last[5], c2, last[7]);
+            } else if (priorTag == T_COLON && (tag == T_NAME || tag == T_GLOBAL_NAME)) {
+                tag = T_BIND_RIGHT;
+                setRec(last, tagIds[tag], s1, s2, l1, l2, s1, c2, indent);
+            } else if (tag == T_SYM || tag == T_SYMS || tag == T_L_BRACE_BRACKET || tag == T_L_PAREN_BRACKET) {
+                if (num >= capacity) return BL_ERR_CAPACITY;
+                setRec(out + num++ * BL_REC_SIZE, tagIds[tag], s1, s2, l1, l2, s1, c2, indent);
+            } else if (priorTag == T_R_PAREN && tag == T_COLON) {
+                tag = T_R_PAREN_COLON;
+                setRec(last, tagIds[tag], last[1], s2, last[3], l2, last[5], c2, last[7]);
+            } else if (priorTag == T_COLON && tag == T_L_PAREN) {
+                tag = T_COLON_L_PAREN;
+                setRec(last, tagIds[tag], last[1], s2, last[3], l2, last[5], c2, last[7]);
+            } else {
+                if (num >= capacity) return BL_ERR_CAPACITY;
+                // set blank lines to have indent of 0 (thus forcing a new phrase)
+                if (tag == T_LINE_BREAK && indent + 1 == s2 - LINE_START(l1)) indent = 0;
+                setRec(out + num++ * BL_REC_SIZE, tagIds[tag], s1, s2, l1, l2, c1, c2, indent);
+            }
+        }
+        pos = e;
+        priorTag = tag;
+    }
+    return num;
+}
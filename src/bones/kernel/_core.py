@@ -12,6 +12,24 @@ SCRATCH_CTX = 'scratch'
 
 RET_VAR_NAME = "__RET__"
 
+
+class _Unwind:
+    # answered in place of a value while a ^ or ^^ unwinds so the non-returning path costs just an identity check per
+    # phrase (and per arg) - fns and blocks that call blocks must stop and answer it when they see it
+    __slots__ = []
+    def __repr__(self):
+        return 'UNWIND'
+
+UNWIND = _Unwind()
+
+
+class TailCall:
+    # a call in tail position answered instead of made so the calling fn can loop - see tailcalls.py
+    __slots__ = ['fn', 'args']
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+
 LOCAL_SCOPE = 1       # e.g. fred - r/w - may be polymorphic
 PARENT_SCOPE = 2      # e.g. .fred - r/o
 MODULE_SCOPE = 3      # e.g. ..MAX_ITER - r/o
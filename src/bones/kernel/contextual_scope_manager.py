@@ -7,8 +7,68 @@
 # License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
 # **********************************************************************************************************************
 
+# Contextual scope - _.fred - is an immutable context handed down the call stack, e.g. a date or a logger, in place of
+# threading it through every fn as an arg (or a monad). A fn sees its caller's context, _.fred: x makes a new context
+# for the rest of the fn and the fns it calls, and the caller's is untouched.
+#
+# Each context name is given a slot when first defined and a context is a persistent map from slot to value, so
+#   - calling a fn is O(1) - the callee's frame just refers to the caller's context
+#   - _.fred: x is O(log32 n) and shares structure with the context it updates
+#   - reading _.fred is a dict lookup on the context's cache after the first read, and the cache is shared by every
+#     frame that refers to that context (i.e. all the calls made between two updates)
+
 from bones.core.sentinels import Missing
+from bones.core.errors import NotYetImplemented
+from bones.kernel.persistent import PMap
+from bones.kernel.symbol_table import VMeta
+
+
+class _Context:
+    __slots__ = ['_kvs', '_cache']
+
+    def __init__(self, kvs):
+        self._kvs = kvs
+        self._cache = {}
+
+    def get(self, slot):
+        if (v := self._cache.get(slot, Missing)) is Missing:
+            v = self._cache[slot] = self._kvs.get(slot, Missing)
+        return v
+
+    def set(self, slot, value):
+        return _Context(self._kvs.set(slot, value))
+
+    def __len__(self):
+        return len(self._kvs)
+
+    def __repr__(self):
+        return f'_Context({len(self._kvs)})'
+
+
+EMPTY_CONTEXT = _Context(PMap())
 
 
 class ContextualScopeManager:
-    pass
+    # the context outside of any fn is held in root - frames hold their own (see PythonStorageManager)
+    __slots__ = ['root', '_slotByName', '_vMetaByName']
+
+    def __init__(self):
+        self.root = EMPTY_CONTEXT
+        self._slotByName = {}
+        self._vMetaByName = {}
+
+    def slotFor(self, name):
+        if (slot := self._slotByName.get(name, Missing)) is Missing:
+            self._slotByName[name] = slot = len(self._slotByName)
+        return slot
+
+    def vMetaFor(self, name):
+        return self._vMetaByName.get(name, Missing)
+
+    def defVMeta(self, name, t, symtab):
+        if (meta := self._vMetaByName.get(name, Missing)) is not Missing:
+            if meta.t != t: raise NotYetImplemented("Can't merge or redefine the types of values yet")
+            return meta
+        self.slotFor(name)
+        self._vMetaByName[name] = meta = VMeta(t, symtab)
+        return meta
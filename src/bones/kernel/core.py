@@ -7,56 +7,76 @@
 # License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
 # **********************************************************************************************************************
 
-import itertools, sys, collections, builtins
+import itertools, sys, collections, builtins, importlib, asyncio, threading
+from time import perf_counter
 
 from bones import jones
 
 from bones.core.sentinels import Missing, Void
 from bones.core.errors import ProgrammerError, handlersByErrSiteId, ErrSite, NotYetImplemented
 from bones.core.context import context
-from bones.kernel.errors import BonesIncompatibleTypesError, BonesModuleImportError
+from bones.kernel.errors import BonesIncompatibleTypesError, BonesModuleImportError, BonesScopeAccessError
 from bones.kernel import lex
 from bones.kernel import parse_phrase, parse_groups
 from bones.kernel.tc import TcReport
 from coppertop.dm.pp import PP
 from bones.ts.select import Family
-from bones.kernel._core import LOCAL_SCOPE, SCRATCH_CTX, GLOBAL_CTX
+from bones.kernel._core import LOCAL_SCOPE, CONTEXT_SCOPE, SCRATCH_CTX, GLOBAL_CTX
 from bones.ts.metatypes import BType
 from bones.lang.types import unary, litnum, litint, litsyms, littxt
 from bones.kernel.sym_manager import SymManager
+from bones.kernel.monomorph import Specialiser
+from bones.kernel.uniqueness import markMayMutate
+from bones.kernel.optimise import foldConstants, eliminateCommonSubexpressions, hoistInvariants
+from bones.kernel.tailcalls import markTailCalls
 from bones.kernel.symbol_table import SymbolTable
 from bones.kernel.stack_manager import StackManager, bframe
 from bones.kernel.globals_manager import GlobalsManager
 from bones.kernel.code_manager import CodeManager
 from bones.kernel.contextual_scope_manager import ContextualScopeManager
-from bones.kernel.tc_interpreter import TCInterpreter
+from bones.kernel.tc_interpreter import TCInterpreter, InstrumentedTCInterpreter, StacklessTCInterpreter, TraceHooks
 
 
 
 pace_res = collections.namedtuple('pace_res', 'tokens, types, result, error')
 
+# parsing and analysis push settings onto bones.core.context, which is process global, so kernels on different threads
+# (or in apace's executor) take turns at it. Execution doesn't take the lock - see apace
+_parseLock = threading.RLock()
+
 
 class BonesKernel:
 
     __slots__ = [
         'sm',
         'stackManager', 'globalsManager', 'codeManager', 'contextualScopeManager', 'parsers', 'symbolManager',
-        'ctxs', 'modByPath', 'styleByName', 'srcById', 'linesById', 'nextSrcId', 'infercache', 'tcrunner',
-        'scratch', 'litdateCons', 'litsymCons', 'littupCons', 'litstructCons', 'litframeCons',
+        'ctxs', 'modByPath', 'unloadedModPaths', 'fnByNameByModPath', 'styleByName', 'srcById',
+        'linesById', 'nextSrcId', 'infercache', 'tcrunner', 'tcrunnerClass', 'specialiser', '_asyncLock',
+        'scratch', 'litdateCons', 'litsymCons', 'littupCons', 'litstructCons', 'litframeCons', 'litnumarrayCons',
+        'profiler',
     ]
 
-    def __init__(self, *, litdateCons, litsymCons, littupCons, litstructCons, litframeCons):
+    def __init__(self, *, litdateCons, litsymCons, littupCons, litstructCons, litframeCons, litnumarrayCons=Missing,
+                 symbolSnapshot=Missing, stackless=False,
+                 maxSpecialisations=0, symbolManager=Missing):
 
-        self.sm = PythonStorageManager()
+        self.contextualScopeManager = ContextualScopeManager()
+        self.sm = PythonStorageManager(self.contextualScopeManager)
         self.stackManager = StackManager()
         self.globalsManager = GlobalsManager()
         self.codeManager = CodeManager()
-        self.contextualScopeManager = ContextualScopeManager()
         self.parsers = Parsers(self)
-        self.symbolManager = SymManager()
+        # a snapshot saves re-interning a large symbol universe on startup - see SymManager.save - and a pool of
+        # processes can share one universe - see SharedSymManager
+        if symbolManager is not Missing:
+            self.symbolManager = symbolManager
+        else:
+            self.symbolManager = SymManager() if symbolSnapshot is Missing else SymManager.fromSnapshot(symbolSnapshot)
 
         self.ctxs = {}
         self.modByPath = {}
+        self.unloadedModPaths = set()       # imported on first reference - see modForPath
+        self.fnByNameByModPath = {}
         self.styleByName = {}
         self.srcById = {}
         self.linesById = {}
@@ -67,13 +87,21 @@ class BonesKernel:
         self.littupCons = littupCons
         self.litstructCons = litstructCons
         self.litframeCons = litframeCons
+        # if given, tuple literals of just numbers are built directly - see parse_phrase.parseNumArray
+        self.litnumarrayCons = litnumarrayCons
         self.tcrunner = Missing
+        # the stackless interpreter doesn't use the python stack for calls between bones fns
+        self.tcrunnerClass = StacklessTCInterpreter if stackless else TCInterpreter
+        # opt in - tcfuncs are specialised by arg types, keeping at most maxSpecialisations per fn - see monomorph
+        self.specialiser = Specialiser(maxSpecialisations) if maxSpecialisations else Missing
         self.scratch = Missing
+        self.profiler = Missing
+        self._asyncLock = Missing               # created on first apace as it must belong to the running loop
 
         self.ctxs[GLOBAL_CTX] = SymbolTable(self, Missing, Missing, Missing, Missing, GLOBAL_CTX)
         self.ctxs[SCRATCH_CTX] = scratchCtx = SymbolTable(self, Missing, Missing, Missing, self.ctxs[GLOBAL_CTX], SCRATCH_CTX)
         self.scratch = scratchCtx
-        self.tcrunner = TCInterpreter(self, scratchCtx)
+        self.tcrunner = self.tcrunnerClass(self, scratchCtx)
         self.sm.frameForSymTab(self.ctxs[GLOBAL_CTX])
         self.sm.frameForSymTab(self.ctxs[SCRATCH_CTX])
 
@@ -90,32 +118,65 @@ class BonesKernel:
             print(src[s1:s2], file=sys.stderr)
 
     def pace(self, src, stopAtLine=Missing):
+        tokens, snippetTc, typesReport, grammarError = self._parseAndAnalyse(src, stopAtLine)
+        answer = self._execute(snippetTc) if self._shouldExecute(grammarError) else Void
+        return pace_res(tokens, typesReport, answer, grammarError)
+
+    async def apace(self, src, stopAtLine=Missing, executor=None):
+        # parsing and analysis run in executor (None for the loop's default thread pool) and execution runs on the event
+        # loop yielding between phrases (and before each call if stackless), so one loop can serve sessions on several
+        # kernels. Calls on the same kernel are serialised, and parsing is serialised across kernels (see _parseLock).
+        # N.B. execution isn't, as every session executes on the loop's thread where a lock can't tell them apart, so
+        # apace is unsafe if python fns push settings onto context - they would interleave with another kernel's parse
+        if self._asyncLock is Missing: self._asyncLock = asyncio.Lock()
+        async with self._asyncLock:
+            loop = asyncio.get_running_loop()
+            tokens, snippetTc, typesReport, grammarError = await loop.run_in_executor(
+                executor, self._parseAndAnalyse, src, stopAtLine
+            )
+            answer = (await self._aexecute(snippetTc)) if self._shouldExecute(grammarError) else Void
+            return pace_res(tokens, typesReport, answer, grammarError)
+
+    def _parseAndAnalyse(self, src, stopAtLine):
+        with _parseLock:
+            return self._parseAndAnalyseExclusively(src, stopAtLine)
+
+    def _parseAndAnalyseExclusively(self, src, stopAtLine):
         srcId = next(self.nextSrcId)
         self.srcById[srcId] = src
 
         '' >> PP
 
+        prof = self.profiler
+        if prof is not Missing: tPhase = perf_counter()
+
         # parse
-        tokens, lines = lex.lexBonesSrc(srcId, src)
+        lexWorkers = 0 if context.lexWorkers is Missing else context.lexWorkers
+        if lexWorkers:
+            tokens, lines = lex.lexBonesSrcParallel(srcId, src, lexWorkers)
+        else:
+            tokens, lines = lex.lexBonesSrcAuto(srcId, src)
+        if prof is not Missing: tPhase = prof.notePhase('lex', tPhase)
         self.linesById[srcId] = lines
         if context.showSrc:
             for line in lines[1:]:
                 f'{line.l:>3}:  {line.src}' >> PP
             '' >> PP
 
+        if prof is not Missing: tPhase = perf_counter()
         snippet = parse_groups.parseStructure(tokens, self.scratch, src)
+        if prof is not Missing: tPhase = prof.notePhase('group', tPhase)
 
         if context.showGroups:
             snippet.PPGroup >> PP
             '' >> PP
 
+        if prof is not Missing: tPhase = perf_counter()
         snippetTc = parse_phrase.parseSnippet(snippet, self.scratch, self)
-        if context.showTc:
-            tcReport = TcReport()
-            snippetTc.PPTC(1, tcReport)
-            for i, line in enumerate(tcReport):
-                f'{i + 1:>3} {line.node.id:>3}  ' + '  ' * (line.depth - 1) + line.pp >> PP
-            '' >> PP
+        if prof is not Missing: tPhase = prof.notePhase('phrase', tPhase)
+        # opt in - purity is only declared (@pure) not checked by the type system yet - see optimise.py
+        optimise = False if context.optimise is Missing else context.optimise
+        if optimise: foldConstants(snippetTc, self)
 
         # analyse
         grammarError = Missing
@@ -123,6 +184,7 @@ class BonesKernel:
         typesReport = []
 
         analyse = False if context.analyse is Missing else context.analyse
+        if prof is not Missing: tPhase = perf_counter()
         if analyse:
             from bones.lang.infer import Simplifier, visit, InferenceLogger
             with context(actions=[], kernel=self, tt=(InferenceLogger(log=False) if context.tt is Missing else context.tt), infercache=self.infercache):
@@ -142,6 +204,26 @@ class BonesKernel:
                         grammarError = ex
                         break
                 '' >> context.tt
+            if prof is not Missing: tPhase = prof.notePhase('analyse', tPhase)
+
+        # rewrites the inferrer needn't know about - the nodes and temps they add only have to be executed
+        if optimise:
+            optimiseReport = []
+            eliminateCommonSubexpressions(snippetTc, optimiseReport)
+            hoistInvariants(snippetTc, optimiseReport)
+            if context.showOptimise and optimiseReport:
+                for line in optimiseReport:
+                    line >> PP
+                '' >> PP
+        inPlace = True if context.inPlace is Missing else context.inPlace
+        if inPlace: markMayMutate(snippetTc)
+        markTailCalls(snippetTc)
+        if context.showTc:
+            tcReport = TcReport()
+            snippetTc.PPTC(1, tcReport)
+            for i, line in enumerate(tcReport):
+                f'{i + 1:>3} {line.node.id:>3}  ' + '  ' * (line.depth - 1) + line.pp >> PP
+            '' >> PP
 
         if context.showTypes:
             for n, t in typesReport:
@@ -154,54 +236,100 @@ class BonesKernel:
                 f'{name:<{COL1_WIDTH}} {v}' >> PP
             '' >> PP
 
-        # compile
+        return tokens, snippetTc, typesReport, grammarError
 
-
-        # execute
+    def _shouldExecute(self, grammarError):
         run = True if context.run is Missing else context.run
-        if run and not grammarError:
+        return run and not grammarError
+
+    def _execute(self, snippetTc):
+        prof = self.profiler
+        tcrunner = self.tcrunner
+        if context.traceTcExec and not isinstance(tcrunner, InstrumentedTCInterpreter):
+            self.instrument(TraceHooks())
+        if prof is not Missing: tPhase = perf_counter()
+        try:
             answer = self.tcrunner.executeTc(snippetTc)
-        else:
-            answer = Void
-
-        return pace_res(tokens, typesReport, answer, grammarError)
-
-
+        finally:
+            self.tcrunner = tcrunner
+        if prof is not Missing: prof.notePhase('execute', tPhase)
+        return answer
+
+    async def _aexecute(self, snippetTc):
+        prof = self.profiler
+        tcrunner = self.tcrunner
+        if context.traceTcExec and not isinstance(tcrunner, InstrumentedTCInterpreter):
+            self.instrument(TraceHooks())
+        if prof is not Missing: tPhase = perf_counter()
+        try:
+            answer = await self.tcrunner.aexecuteTc(snippetTc)
+        finally:
+            self.tcrunner = tcrunner
+        if prof is not Missing: prof.notePhase('execute', tPhase)
+        return answer
+
+    def startProfiling(self, nodes=True):
+        # times each PACE phase and, if nodes is True, each tc node executed - answers the Profiler
+        from bones.kernel.profiler import Profiler, ProfilingHooks
+        self.profiler = Profiler(nodes)
+        if nodes:
+            self.instrument(ProfilingHooks(self.profiler))
+        return self.profiler
+
+    def stopProfiling(self):
+        prof = self.profiler
+        self.profiler = Missing
+        if prof.nodes: self.uninstrument()
+        return prof
+
+    def instrument(self, hooks):
+        # swap in an interpreter that calls out to hooks (see TcHooks) - the plain interpreter has no checks
+        self.tcrunner = InstrumentedTCInterpreter(self, self.scratch, hooks)
+
+    def uninstrument(self):
+        self.tcrunner = self.tcrunnerClass(self, self.scratch)
 
     def loadModules(self, paths):
         # i.e. searches PYTHON_PATH and BONES_PATH for bones/ex/ and load core.py or core.b
+        # the python import is deferred until something is imported from the module (or one of its parents)
         for path in paths:
-            root = __import__(path)
             names = path.split(".")
-            modPath = names[0]
-            mod = root
-            if modPath not in self.modByPath:
-                self.modByPath[modPath] = mod
-            for name in names[1:]:
-                modPath = modPath + '.' + name if modPath else name
-                mod = getattr(mod, name)
+            for i in range(1, len(names) + 1):
+                modPath = '.'.join(names[:i])
                 if modPath not in self.modByPath:
-                    self.modByPath[modPath] = mod
-
-
+                    self.unloadedModPaths.add(modPath)
+
+    def modForPath(self, path):
+        if (mod := self.modByPath.get(path, Missing)) is Missing and path in self.unloadedModPaths:
+            self.modByPath[path] = mod = importlib.import_module(path)
+            self.unloadedModPaths.discard(path)
+        return mod
+
+    def fnByNameForMod(self, path, mod):
+        # the jones fns in mod by their bones name (which can differ from the python name), built once per module
+        if (fnByName := self.fnByNameByModPath.get(path, Missing)) is Missing:
+            fnByName = {}
+            attrs = vars(mod)
+            for thingName in sorted(attrs):
+                thing = attrs[thingName]
+                if isinstance(thing, jones._fn):
+                    fnByName.setdefault(thing.name, thing)
+            self.fnByNameByModPath[path] = fnByName
+        return fnByName
+
+    def _importee(self, path, mod, name):
+        if (importee := getattr(mod, name, Missing)) is Missing:
+            importee = self.fnByNameForMod(path, mod).get(name, Missing)
+        return importee
 
     def importSymbols(self, path, names, symtab):
-        if (mod := self.modByPath.get(path, Missing)) is Missing:
+        # not cached across kernel starts - the symtab is bound to the live tvfuncs so the module must be imported and
+        # its overloads walked anyway, and checking a snapshot of names and styles costs what rebuilding them does
+        if (mod := self.modForPath(path)) is Missing:
             raise BonesModuleImportError(f"Can't import {names} because '{path}' has not been loaded.", ErrSite("Module not loaded"))
         for name in names:
-            importee = Missing
-            if hasattr(mod, name):
-                importee = getattr(mod, name)
-            else:
-                # TODO keep functions by fnname by modname.
-                for thingName in dir(mod):
-                    thing = getattr(mod, thingName)
-                    if isinstance(thing, jones._fn):
-                        if thing.name == name:
-                            importee = thing
-                            break
-                if importee is Missing:
-                    raise BonesModuleImportError(f"Can't find '{name}' in {path}", ErrSite("Can't find name"))
+            if (importee := self._importee(path, mod, name)) is Missing:
+                raise BonesModuleImportError(f"Can't find '{name}' in {path}", ErrSite("Can't find name"))
             if isinstance(importee, BType):
                 if symtab.hasT(name):
                     # OPEN: check that it's the same type else we need type namespaces implementing to handle this
@@ -245,22 +373,11 @@ class BonesKernel:
 
     def importValues(self, path, names, symtab):
         nvs = {}
-        if (mod := self.modByPath.get(path, Missing)) is Missing:
+        if (mod := self.modForPath(path)) is Missing:
             raise BonesModuleImportError(f"Can't import {names} because '{path}' has not been loaded.", ErrSite("Module not loaded"))
         for name in names:
-            importee = Missing
-            if hasattr(mod, name):
-                importee = getattr(mod, name)
-            else:
-                # TODO keep functions by fnname by modname.
-                for thingName in dir(mod):
-                    thing = getattr(mod, thingName)
-                    if isinstance(thing, jones._fn):
-                        if thing.name == name:
-                            importee = thing
-                            break
-                if importee is Missing:
-                    raise BonesModuleImportError(f"Can't find '{name}' in {path}", ErrSite("Can't find name"))
+            if (importee := self._importee(path, mod, name)) is Missing:
+                raise BonesModuleImportError(f"Can't find '{name}' in {path}", ErrSite("Can't find name"))
 
             if isinstance(importee, (BType, jones._fn)):
                 pass
@@ -276,58 +393,111 @@ class BonesKernel:
         return nvs
 
 
+class _ThreadStack(threading.local):
+    def __init__(self):
+        self.frames = []
+        self.signal = Missing           # the value of a ^^ while it unwinds
+
+
 class PythonStorageManager:
-    __slots__ = ('syms', '_holderByModPathByName', '_frameBySymTab', 'stack')
+    # module level frames are shared by all threads, the stack of function frames is per thread so a kernel can be used
+    # from several threads (each with its own call stack)
+    __slots__ = ('syms', '_holderByModPathByName', '_frameBySymTab', '_local', 'csm')
 
-    def __init__(self):
+    def __init__(self, csm):
         self._holderByModPathByName = {}
         self._frameBySymTab = {}
-        self.stack = []
+        self._local = _ThreadStack()
+        self.csm = csm
+
+    @property
+    def stack(self):
+        return self._local.frames
 
     def frameForSymTab(self, symtab):
         if (frame := self._frameBySymTab.get(symtab, Missing)) is Missing:
             self._frameBySymTab[symtab] = frame = bframe(symtab, Missing)
         return frame
 
-    def blockframeForSymTab(self, symtab, parent, argnames, ):
-        self.symtab, k.sm.stack[-1], self.argnames, self._tArgs, k.sm.frameForSymTab(self.symtab)
-
-    def pushFrame(self, symtab):
-        if self.stack:
-            current = self.stack[-1]
+    def pushFrame(self, symtab, ctx=Missing):
+        # a fn sees its caller's context unless given one (e.g. the context a tail calling fn had got to)
+        stack = self._local.frames
+        if stack:
+            current = stack[-1]
         else:
             current = self.frameForSymTab(symtab)
-        self.stack.append(frame := bframe(symtab, current))
+        frame = bframe(symtab, current)
+        frame.ctx = self._ctx(stack) if ctx is Missing else ctx
+        stack.append(frame)
         return frame
 
     def popFrame(self):
-        self.stack = self.stack[:-1]
+        return self._local.frames.pop()
 
     def bind(self, symtab, scope, name, value):
-        if scope == LOCAL_SCOPE and self.stack:
-            frame = self.stack[-1]
+        stack = self._local.frames
+        if scope == CONTEXT_SCOPE:
+            # a new context for the rest of this fn and its callees - the caller's is untouched
+            ctx = self._ctx(stack).set(self.csm.slotFor(name), value)
+            if stack and stack[-1].ctx is not Missing:
+                stack[-1].ctx = ctx
+            else:
+                self.csm.root = ctx
+            return
+        if scope == LOCAL_SCOPE and stack:
+            frame = stack[-1]
         else:
             frame = self.frameForSymTab(symtab)
         frame[name] = value
 
     def getValue(self, symtab, scope, name):
-        if scope == LOCAL_SCOPE and self.stack:
-            frame = self.stack[-1]
+        stack = self._local.frames
+        if scope == CONTEXT_SCOPE:
+            if (value := self._ctx(stack).get(self.csm.slotFor(name))) is Missing:
+                raise BonesScopeAccessError(f'_.{name} has not been set in this context', ErrSite("context name not set"))
+            return value
+        if scope == LOCAL_SCOPE and stack:
+            frame = stack[-1]
         else:
             frame = self.frameForSymTab(symtab)
         return frame[name]
 
+    def _ctx(self, stack):
+        # module frames (e.g. pushed for a block run at the top level) use the root context
+        if stack and (ctx := stack[-1].ctx) is not Missing: return ctx
+        return self.csm.root
+
     def getReturn(self, symtab, scope, name):
-        if scope == LOCAL_SCOPE and self.stack:
-            frame = self.stack[-1]
+        stack = self._local.frames
+        if scope == LOCAL_SCOPE and stack:
+            frame = stack[-1]
         else:
             frame = self.frameForSymTab(symtab)
         return frame.values.get(name, Missing)
 
+    def takeReturn(self, symtab, scope, name):
+        stack = self._local.frames
+        if scope == LOCAL_SCOPE and stack:
+            frame = stack[-1]
+        else:
+            frame = self.frameForSymTab(symtab)
+        return frame.values.pop(name, Missing)
+
+    def signal(self, value):
+        self._local.signal = value
+
+    def takeSignal(self):
+        value, self._local.signal = self._local.signal, Missing
+        return value
+
+    def isSignalling(self):
+        return self._local.signal is not Missing
+
     def getOverload(self, symtab, scope, name, numargs):
         # check local frame first (as the function may have been passed as an argument)
         if scope == LOCAL_SCOPE:
-            frame = self.stack[-1] if self.stack else self.frameForSymTab(symtab)
+            stack = self._local.frames
+            frame = stack[-1] if stack else self.frameForSymTab(symtab)
         else:
             raise NotImplementedError()
         if (ov := frame.values.get(name, Missing)) is Missing:
@@ -387,5 +557,6 @@ class Parsers:
 handlersByErrSiteId.update({
     ('bones.kernel.core', Missing, 'importSymbols', "Can't find name") : '...',
     ('bones.kernel.core', Missing, 'importSymbols', "Module not loaded") : '...',
+    ('bones.kernel.core', Missing, 'getValue', "context name not set") : '...',
 })
 
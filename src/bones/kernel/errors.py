@@ -48,3 +48,12 @@ class BonesModuleLoadError(BonesError): pass                # load tool.kit
 class BonesModuleImportError(BonesError): pass              # e.g. from tools.bag import x - x doesn't exist
 
 class BonesScopeAccessError(BonesError): pass               # e.g. trying to get from or set in the wrong scope
+
+class BonesRemoteError(BonesError): pass                    # raised in a forked kernel - see kernel_pool
+
+class BonesReturnError(BonesError): pass                    # ^ in a block whose fn has already returned
+
+class BonesSignalError(BonesError):                         # a ^^ that reached the top of a pace
+    def __init__(self, msg, errSite, value):
+        super().__init__(msg, errSite)
+        self.value = value
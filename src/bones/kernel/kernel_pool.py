@@ -0,0 +1,162 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# A fork server for pre-warmed kernels. The parent builds one kernel, warms it (loads libraries, imports symbols, paces
+# any prelude) and then forks a copy-on-write child per request or per connection, so per request startup is just the
+# cost of a fork. Children are isolated - nothing one does is seen by the parent or any other child.
+#
+#   pool = KernelPool(newKernel, lambda k: k.pace(prelude))
+#   pool.pace('1 + 2')                  # one shot, in a fresh child
+#   pool.serve('/tmp/bones.sock')       # or serve sessions over a unix socket, one child per connection
+#
+#   client = KernelClient('/tmp/bones.sock')
+#   client.pace('a: 1')
+#   client.pace('a + 1')                # a session keeps its kernel between requests
+#
+# messages are a u64 length followed by the payload - requests are the utf-8 source text (never unpickled, so a
+# connecting process can only send bones), replies are a pickle of ('ok', value) or ('error', typeName, msg, traceback).
+# Values that can't be pickled are replied as their repr. POSIX only (needs fork).
+
+import os, socket, stat, struct, pickle, traceback, signal
+
+from bones.core.sentinels import Missing
+from bones.core.errors import ErrSite, handlersByErrSiteId
+from bones.kernel.errors import BonesRemoteError
+
+
+_LEN = struct.Struct('<Q')
+
+
+class KernelPool:
+
+    __slots__ = ['k']
+
+    def __init__(self, newKernel, warmup=Missing):
+        self.k = newKernel()
+        if warmup is not Missing: warmup(self.k)
+
+    def pace(self, src):
+        # runs src in a forked copy of the warm kernel
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            try:
+                os.close(r)
+                with os.fdopen(w, 'wb') as f:
+                    _send(f, _paceReply(self.k, src))
+            finally:
+                os._exit(0)
+        os.close(w)
+        with os.fdopen(r, 'rb') as f:
+            reply = _recv(f)
+        os.waitpid(pid, 0)
+        return _unwrap(reply)
+
+    def serve(self, path):
+        # serves forever - one forked kernel per connection which lives for the length of the session
+        # a socket left by an earlier server is replaced, anything else at path is left for bind to complain about
+        if os.path.lexists(path) and stat.S_ISSOCK(os.lstat(path).st_mode): os.unlink(path)
+        # sessions are reaped as they end rather than when the next connection arrives - only sessions, as the child of
+        # a pace on another thread is waited for by that pace
+        sessionPids = set()
+        prior = signal.signal(signal.SIGCHLD, lambda signum, frame: _reapSessions(sessionPids))
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+                server.bind(path)
+                server.listen()
+                while True:
+                    conn, _ = server.accept()
+                    pid = os.fork()
+                    if pid == 0:
+                        try:
+                            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+                            server.close()
+                            with conn, conn.makefile('rwb') as f:
+                                while (src := _recv(f)) is not Missing:
+                                    _send(f, _paceReply(self.k, src))
+                        finally:
+                            os._exit(0)
+                    conn.close()
+                    sessionPids.add(pid)
+                    _reapSessions(sessionPids)          # in case it ended before it was added
+        finally:
+            signal.signal(signal.SIGCHLD, prior)
+
+
+class KernelClient:
+
+    __slots__ = ['_sock', '_f']
+
+    def __init__(self, path):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._f = self._sock.makefile('rwb')
+
+    def pace(self, src):
+        _send(self._f, src.encode('utf-8'))
+        return _unwrap(_recv(self._f))
+
+    def close(self):
+        self._f.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def _paceReply(k, src):
+    try:
+        value = k.pace(src if isinstance(src, str) else src.decode('utf-8'))
+    except Exception as ex:
+        return pickle.dumps(('error', type(ex).__name__, str(ex), traceback.format_exc()))
+    try:
+        return pickle.dumps(('ok', value))
+    except Exception:
+        return pickle.dumps(('ok', repr(value)))
+
+
+def _unwrap(reply):
+    if reply is Missing:
+        raise BonesRemoteError('Kernel process exited without replying', ErrSite('no reply'))
+    reply = pickle.loads(reply)
+    if reply[0] == 'ok': return reply[1]
+    _, typeName, msg, tb = reply
+    raise BonesRemoteError(f'{typeName}: {msg}\n\n{tb}', ErrSite('remote error'))
+
+
+def _send(f, payload):
+    f.write(_LEN.pack(len(payload)))
+    f.write(payload)
+    f.flush()
+
+
+def _recv(f):
+    # answers the payload or Missing at end of stream
+    header = f.read(_LEN.size)
+    if len(header) < _LEN.size: return Missing
+    n, = _LEN.unpack(header)
+    payload = f.read(n)
+    return payload if len(payload) == n else Missing
+
+
+def _reapSessions(pids):
+    for pid in list(pids):
+        try:
+            if os.waitpid(pid, os.WNOHANG)[0] == pid: pids.discard(pid)
+        except ChildProcessError:
+            pids.discard(pid)
+
+
+handlersByErrSiteId.update({
+    ('bones.kernel.kernel_pool', Missing, '_unwrap', 'no reply') : '...',
+    ('bones.kernel.kernel_pool', Missing, '_unwrap', 'remote error') : '...',
+})
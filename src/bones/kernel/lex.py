@@ -648,6 +648,94 @@ def lexBonesSrc(srcId, src):
     return tokens, lines
 
 
+def lexBonesSrcAuto(srcId, src):
+    # the native lexer (see lex_native) when it's built and can handle src, otherwise lexBonesSrc
+    from bones.kernel.lex_native import lexBonesSrcNative
+    answer = lexBonesSrcNative(srcId, src)
+    return lexBonesSrc(srcId, src) if answer is Missing else answer
+
+
+
+# PARALLEL LEXING
+# lexing is context free apart from the multiline tokens (TEXT, BREAKOUT, the comments) and the little merge state
+# machine above which never merges across a LINE_BREAK. So a source can be split at the start of any line that begins at
+# indent 0 (and that isn't inside a TEXT), each chunk lexed independently and the results shifted back into place. The
+# split scanner is deliberately conservative - anything it isn't sure about causes a fall back to lexBonesSrc.
+
+PARALLEL_LEX_MIN_CHARS = 1 << 16        # below this the process pool costs more than it saves
+_CHUNKS_PER_WORKER = 4
+_TEXT_RE = re.compile(r'(\")(([\S\s]*?[^\\](\\\\)*))\1')
+_UNSAFE_TO_SPLIT = ('/-', '/!', "'{[", '""')
+_ABSOLUTE_C1_TAGS = (BIND_RIGHT, SYM, SYMS, L_BRACE_BRACKET, L_PAREN_BRACKET)     # c1 is set to s1 in lexBonesSrc
+
+
+def _phraseStarts(src):
+    # answers the offsets of lines starting at indent 0 outside of TEXT, or Missing if the source can't be split safely
+    for unsafe in _UNSAFE_TO_SPLIT:
+        if unsafe in src: return Missing
+    starts, pos, n = [], 0, len(src)
+    while pos < n:
+        c = src[pos]
+        if c == '"':
+            match = _TEXT_RE.match(src, pos)
+            if not match: return Missing
+            pos = match.end()
+        elif c == '/' and src.startswith('//', pos):
+            eol = src.find('\n', pos)
+            eol = n if eol < 0 else eol
+            if '"' in src[pos:eol]: return Missing        # could be part of a SYMBOLIC_NAME rather than a comment
+            pos = eol
+        elif c == '\n':
+            pos += 1
+            if pos < n and src[pos] not in ' \t\n': starts.append(pos)
+        else:
+            pos += 1
+    return starts
+
+
+def _lexChunk(srcId, chunk):
+    try:
+        return lexBonesSrcAuto(srcId, chunk)
+    except Exception:
+        return Missing
+
+
+def lexBonesSrcParallel(srcId, src, workers):
+    # answers the same tokens and lines as lexBonesSrc
+    if workers < 2 or len(src) < PARALLEL_LEX_MIN_CHARS or (starts := _phraseStarts(src)) is Missing or not starts:
+        return lexBonesSrc(srcId, src)
+
+    # pick roughly evenly sized chunks from the available split points
+    target = len(src) // (workers * _CHUNKS_PER_WORKER) + 1
+    bounds, prior = [0], 0
+    for start in starts:
+        if start - prior >= target:
+            bounds.append(start)
+            prior = start
+    bounds.append(len(src))
+    if len(bounds) < 3: return lexBonesSrc(srcId, src)
+
+    from concurrent.futures import ProcessPoolExecutor
+    chunks = [src[s1:s2] for s1, s2 in zip(bounds[:-1], bounds[1:])]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_lexChunk, [srcId] * len(chunks), chunks))
+    if any(res is Missing for res in results):
+        return lexBonesSrc(srcId, src)      # so the error is reported against the whole source
+
+    tokens = [Token(srcId, '', START, 0, 0, 0, 0, 0, 0, 0, 0)]
+    lines = ['START']
+    for i, (chunkTokens, chunkLines) in enumerate(results):
+        dS, dL, dT = bounds[i], len(lines) - 1, len(tokens) - 1
+        isLast = i == len(results) - 1
+        # a non final chunk ends with a '\n' so its last (empty) line is really the first line of the next chunk
+        for line in (chunkLines[1:] if isLast else chunkLines[1:-1]):
+            lines.append(Line(line.l + dL, line.s1 + dS, line.s2 + dS, line.src))
+        for tok in chunkTokens[1:]:
+            c1 = tok.c1 + dS if tok.tag in _ABSOLUTE_C1_TAGS else tok.c1
+            tokens.append(Token(srcId, tok.src, tok.tag, tok.indent, tok.t + dT, tok.l1 + dL, tok.l2 + dL, c1, tok.c2, tok.s1 + dS, tok.s2 + dS))
+    return tokens, lines
+
+
 handlersByErrSiteId.update({
     ('bones.kernel.lex', Missing, 'lexBonesSrc', 'illegal tag') : '...',
     ('bones.kernel.lex', Missing, 'lexBonesSrc', 'no match') : '...',
@@ -0,0 +1,124 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+import sys
+if hasattr(sys, '_TRACE_IMPORTS') and sys._TRACE_IMPORTS: print(__name__)
+
+
+# Optional accelerated lexing via rainbow/src/bl/lex.c (loaded with ctypes). lex.lexBonesSrc remains the reference - the
+# native lexer handles ASCII source without breakouts or conditional comments and for anything else (including errors)
+# we defer to the python lexer.
+#
+#   cd rainbow/src/bl && cc -O2 -shared -fPIC -o libbllex.so lex.c
+#
+# set BONES_LEX_LIB to the path of the library to use one built elsewhere, or to '' to turn the native path off
+
+import os, ctypes
+
+from bones.core.sentinels import Missing
+from bones.kernel import lex
+from bones.kernel.lex import Token, Line, START, KEYWORD_OR_BIND_LEFT, BIND_RIGHT, R_PAREN_COLON, COLON_L_PAREN, SYM, \
+    SYMS, L_BRACE_BRACKET, L_PAREN_BRACKET
+
+
+_REC_SIZE = 8       # tag, s1, s2, l1, l2, c1, c2, indent
+
+# the order of the rule enum in lex.c
+_C_TAG_NAMES = (
+    'LEADING_SPACES', 'WHITE_BREAK', 'BREAKOUT', 'INLINE_COMMENT', 'CONDITIONAL_COMMENT', 'LINE_COMMENT',
+    'LINE_BREAK', 'TEXT', 'SYMS', 'SYM',
+    'GLOBALTIMESTAMP_SS', 'GLOBALTIMESTAMP_S', 'GLOBALTIMESTAMP_M', 'LOCALTIMESTAMP_SS', 'LOCALTIMESTAMP_S',
+    'LOCALTIMESTAMP_M', 'DATE', 'GLOBALTIME_SS', 'GLOBALTIME_S', 'GLOBALTIME_M', 'LOCALTIME_SS', 'LOCALTIME_S',
+    'LOCALTIME_M', 'DECIMAL', 'INTEGER',
+    'R_ANGLE', 'SIGNAL', 'RETURN', 'L_ANGLE_COLON',
+    'GLOBAL_BIND_LEFT', 'GLOBAL_NAME', 'GLOBAL_BIND_RIGHT', 'CONTEXT_BIND_LEFT', 'CONTEXT_NAME', 'CONTEXT_BIND_RIGHT',
+    'MODULE_VALUE_NAME', 'PARENT_VALUE_NAME', 'NAME',
+    'L_PAREN_BRACKET', 'L_PAREN', 'R_PAREN', 'L_BRACKET_BRACKET', 'L_BRACKET', 'R_BRACKET', 'L_BRACE_BRACE_BRACKET',
+    'L_BRACE_BRACKET', 'L_BRACE_BRACE', 'R_BRACE_BRACE', 'L_BRACE', 'R_BRACE',
+    'CONTINUATION', 'SYMBOLIC_NAME', 'ILLEGAL_MANY_DOTS', 'ELLIPSES', 'ILLEGAL_TWO_DOTS', 'DOT', 'COMMA', 'SEMI_COLON',
+    'COLON',
+    'KEYWORD_OR_BIND_LEFT', 'BIND_RIGHT', 'R_PAREN_COLON', 'COLON_L_PAREN',
+)
+
+_DEFAULT_LIB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'rainbow', 'src', 'bl', 'libbllex.so')
+
+_lib = Missing          # Missing until first use, then the loaded library or None
+
+
+def _loadLib():
+    global _lib
+    path = os.environ.get('BONES_LEX_LIB', _DEFAULT_LIB_PATH)
+    _lib = None
+    if not path or not os.path.exists(path): return None
+    try:
+        lib = ctypes.CDLL(path)
+    except OSError:
+        return None
+    lib.bl_lex_num_tags.restype = ctypes.c_int
+    lib.bl_lex_num_tags.argtypes = []
+    if lib.bl_lex_num_tags() != len(_C_TAG_NAMES): return None       # stale build
+    lib.bl_lex_set_tags.restype = None
+    lib.bl_lex_set_tags.argtypes = [ctypes.POINTER(ctypes.c_int32)]
+    lib.bl_lex.restype = ctypes.c_long
+    lib.bl_lex.argtypes = [
+        ctypes.c_char_p, ctypes.c_long, ctypes.POINTER(ctypes.c_int32), ctypes.c_long, ctypes.POINTER(ctypes.c_int32),
+        ctypes.c_long
+    ]
+    lib.bl_lex_set_tags((ctypes.c_int32 * len(_C_TAG_NAMES))(*[getattr(lex, name) for name in _C_TAG_NAMES]))
+    _lib = lib
+    return lib
+
+
+def isAvailable():
+    return (_loadLib() if _lib is Missing else _lib) is not None
+
+
+def linesFor(src):
+    # the same Lines as lex.lexBonesSrc
+    lines, s1 = ['START'], 0
+    for l, text in enumerate(src.split('\n'), 1):
+        lines.append(Line(l, s1, s1 + len(text), text))
+        s1 += len(text) + 1
+    return lines
+
+
+def lexBonesSrcNative(srcId, src):
+    # answers the same tokens and lines as lex.lexBonesSrc, or Missing if the native lexer can't be used for src
+    lib = _loadLib() if _lib is Missing else _lib
+    if lib is None or not src.isascii(): return Missing
+    lines = linesFor(src)
+    lineEnds = (ctypes.c_int32 * len(lines))(0, *[line.s2 for line in lines[1:]])
+    capacity = len(src)                 # every token consumes at least one character
+    buf = (ctypes.c_int32 * (capacity * _REC_SIZE))()
+    num = lib.bl_lex(src.encode('ascii'), len(src), buf, capacity, lineEnds, len(lines) - 1)
+    if num < 0: return Missing
+
+    tokens = [Token(srcId, '', START, 0, 0, 0, 0, 0, 0, 0, 0)]
+    append = tokens.append
+    recs = buf[:num * _REC_SIZE]
+    for t, i in enumerate(range(0, num * _REC_SIZE, _REC_SIZE), 1):
+        tag, s1, s2, l1, l2, c1, c2, indent = recs[i:i + _REC_SIZE]
+        if tag in _SPECIAL_TAGS:
+            text = _srcForSpecial(tag, src, s1, s2)
+            if tag == BIND_RIGHT: t += 1        # lexBonesSrc uses len(tokens) at the time of the merge
+        else:
+            text = src[s1:s2]
+        append(Token(srcId, text, tag, indent, t, l1, l2, c1, c2, s1, s2))
+    return tokens, lines
+
+
+_SPECIAL_TAGS = frozenset((KEYWORD_OR_BIND_LEFT, BIND_RIGHT, R_PAREN_COLON, COLON_L_PAREN, SYM, SYMS, L_BRACE_BRACKET, L_PAREN_BRACKET))
+
+def _srcForSpecial(tag, src, s1, s2):
+    if tag == KEYWORD_OR_BIND_LEFT: return src[s1:s2 - 1]         # merged tokens keep the src of the first
+    if tag in (R_PAREN_COLON, COLON_L_PAREN): return src[s1]
+    if tag == SYM: return src[s1 + 1:s2]
+    if tag == SYMS: return src[s1:s2].split('`')[1:]
+    if tag in (L_BRACE_BRACKET, L_PAREN_BRACKET): return ''.join(src[s1:s2].split())
+    return src[s1:s2]
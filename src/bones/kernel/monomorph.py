@@ -0,0 +1,86 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Specialisation of tcfuncs by the types of their args, i.e. monomorphisation without a compiler. A call of a tcfunc
+# runs its body with the _Specialisation for the fn and its arg types in the frame (blocks in the fn share it). Each call
+# site in a specialisation remembers the overload, the arg types, the fn and the schemaVars (tByT) it last selected so
+# while a site sees the same types - in a specialisation the usual case - Overload.selectFunction isn't run again and
+# the return of a python fn, having been checked on the first call, isn't re-checked.
+#
+# A site's selection is only reused if the overload is the same object and the arg types are equal, so a specialisation
+# made for one set of types is never wrong for another, just slower. Each fn keeps at most maxPerFn specialisations,
+# dropping the least recently used, and binding any fn clears them all as the best selection may have changed. Kernel
+# threads (e.g. blocks run by parallel.py) share the specialiser so the LRU is only touched under its lock.
+#
+# Each call of a tcfunc, and each call site in one, pays for typing its args so whether specialisation wins depends on
+# the script (measure with bench/bench_specialise.py). It is off unless asked for:
+#
+#   k = BonesKernel(..., maxSpecialisations=8)      # the default, 0, turns specialisation off
+
+import threading
+from collections import OrderedDict
+
+from bones.core.sentinels import Missing
+from bones.ts.select import _typeOf
+
+
+class Specialiser:
+    __slots__ = ['maxPerFn', '_specsByFnId', 'numMade', 'numEvicted', '_lock']
+
+    def __init__(self, maxPerFn):
+        self.maxPerFn = maxPerFn
+        self._specsByFnId = {}
+        self.numMade = 0
+        self.numEvicted = 0
+        self._lock = threading.Lock()
+
+    def specFor(self, fn, args):
+        tArgs = tuple(_typeOf(arg) for arg in args)
+        with self._lock:
+            if (specs := self._specsByFnId.get(fn.id, Missing)) is Missing:
+                self._specsByFnId[fn.id] = specs = OrderedDict()
+            if (spec := specs.get(tArgs, Missing)) is not Missing:
+                specs.move_to_end(tArgs)
+                return spec
+            specs[tArgs] = spec = _Specialisation(fn, tArgs)
+            self.numMade += 1
+            if len(specs) > self.maxPerFn:
+                specs.popitem(last=False)
+                self.numEvicted += 1
+            return spec
+
+    def invalidate(self):
+        with self._lock:
+            self._specsByFnId.clear()
+
+    def __repr__(self):
+        with self._lock:
+            num = sum(len(specs) for specs in self._specsByFnId.values())
+        return f'Specialiser({num} specs, {self.numMade} made, {self.numEvicted} evicted)'
+
+
+class _Specialisation:
+    __slots__ = ['fn', 'tArgs', '_siteById']
+
+    def __init__(self, fn, tArgs):
+        self.fn = fn
+        self.tArgs = tArgs
+        self._siteById = {}             # tcapply id -> (ov, arg types, fn, schemaVars)
+
+    def select(self, n, ov, numargs, args, runner):
+        # answers fn, schemaVars, checkRet
+        ts = tuple(_typeOf(arg) for arg in args)
+        if (site := self._siteById.get(n.id, Missing)) is not Missing and site[0] is ov and site[1] == ts:
+            return site[2], site[3], False
+        fn, schemaVars = runner.selectFn(ov, numargs, args)
+        self._siteById[n.id] = (ov, ts, fn, schemaVars)
+        return fn, schemaVars, True
+
+    def __repr__(self):
+        return f'_Specialisation({self.fn.symtab.path}, {self.tArgs}, {len(self._siteById)} sites)'
@@ -0,0 +1,404 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Constant folding - runs after parsing and before analysis, replacing
+#   - tuple and struct literals whose elements are all literals, e.g. the rho matrix in canon/test_suite/PCA sim.b
+#   - calls to python fns marked @pure (see parallel.py) whose args are all literals
+# with a tcconst holding the value computed now, so executing one is just answering the value. Folding is bottom up so
+# nested literals and calls fold into a single node. Anything that raises is left to raise when run (i.e. where the
+# user expects).
+#
+# A fold sees the overloads as they are when the snippet is parsed - like the rest of the kernel it assumes a pure fn
+# isn't later given a more specific overload for the same literal types.
+#
+# Then, after analysis (so the inferrer never sees their temps) and before the uniqueness and tail call passes, common
+# subexpression elimination within each fn body and loop invariant hoisting within each fn body and the snippet:
+#   - a pure call computed again later in the same sequence, none of the names it reads having been rebound in between,
+#     is bound to a temp the first time and the later ones read the temp
+#   - a pure call in a block given to each, collect, etc (LOOP_FNS) that reads no name bound in the block is wrapped in
+#     a tconce so it is computed on first use (so nothing is computed if the block never runs) and kept until the call
+#     running the block is next run
+# Only calls whose args are local names, literals or such calls are considered (purity as parallel.isPureExpr) and
+# neither they nor any bones fn they may call may read a name from outside its own frame (e.g. ..m or _..g) - such a
+# value can change between two evaluations without a bind the passes can see. Names bound in any block in the fn are
+# never relied on as a block may be run by whatever it is passed to. The reports list what was moved (shown with
+# context.showOptimise).
+#
+# All of it is off unless context.optimise is True - until purity comes from the type system a wrongly marked @pure fn
+# would be folded or reused silently.
+
+import itertools
+from bones.core.sentinels import Missing
+from bones.lang.types import _tvfunc, TBI
+from bones.ts.select import Overload
+from bones.kernel._core import LOCAL_SCOPE
+from bones.kernel.tc import tcnode, tcsnippet, tcapply, tcbindval, tcgetval, tcblock, tcfunc, tcbindfn, tcreturn, \
+    tccoerce, tcpartialcheck, tclit, tcconst, tclittup, tclitstruct, tchoist, tconce
+from bones.kernel.tc_interpreter import TCInterpreter
+from bones.kernel.parallel import isPureExpr
+
+
+LOOP_FNS = {'each', 'collect', 'select', 'reject', 'detect', 'inject', 'do'}   # assumed to only run a block while running
+
+_tempSeed = itertools.count(start=1)
+
+
+def foldConstants(snippet, k):
+    # answers the number of nodes folded
+    folder = _Folder(k)
+    if isinstance(snippet, tcsnippet):
+        folder.sequence(snippet.nodes)
+        return folder.numFolded
+    folder.node(snippet)
+    return folder.numFolded
+
+
+class _Folder:
+
+    def __init__(self, k):
+        self.k = k
+        self.numFolded = 0
+        self.seen = set()
+
+    def sequence(self, nodes):
+        for i, n in enumerate(nodes):
+            nodes[i] = self.node(n)
+
+    def node(self, n):
+        # answers n or the tcconst replacing it
+        if not isinstance(n, tcnode) or isinstance(n, tclit): return n
+        if n.id in self.seen: return n
+        self.seen.add(n.id)
+        if isinstance(n, tclittup):
+            return self.tup(n)
+        if isinstance(n, tclitstruct):
+            return self.struct(n)
+        if isinstance(n, tcapply):
+            n.argnodes[:] = [self.node(a) for a in n.argnodes]
+            return self.apply(n)
+        if isinstance(n, (tcbindval, tcreturn)):
+            n.vnode = self.node(n.vnode)
+        elif isinstance(n, (tccoerce, tcpartialcheck)):
+            n.lhnode = self.node(n.lhnode)
+        elif isinstance(n, tcbindfn):
+            self.node(n.fnode)
+        elif isinstance(n, tcblock):
+            if n.body: self.sequence(n.body)
+        return n
+
+    def tup(self, n):
+        elems = [self.node(e) for e in n.tv._v]
+        if all(isinstance(e, tclit) for e in elems):
+            return self.fold(n, lambda: self.k.littupCons(n.tOut, [e.tv for e in elems]))
+        if any(e is not o for e, o in zip(elems, n.tv._v)) and (t := getattr(n.tv, '_t', Missing)) is not Missing:
+            n.tv = self.k.littupCons(t, elems)         # keep the elements that did fold
+        return n
+
+    def struct(self, n):
+        kvs = {name: self.node(v) for name, v in n.tv._kvs()}
+        if all(isinstance(v, tclit) for v in kvs.values()):
+            return self.fold(n, lambda: self.k.litstructCons(n.tOut, {name: v.tv for name, v in kvs.items()}))
+        if any(kvs[name] is not v for name, v in n.tv._kvs()):
+            n.tv = self.k.litstructCons(n.tv._t, kvs)
+        return n
+
+    def apply(self, n):
+        if not all(isinstance(a, tclit) for a in n.argnodes): return n
+        fn, schemaVars = self.pureFnFor(n, [a.tv for a in n.argnodes])
+        if fn is Missing: return n
+        # called unbound so an instrumented runner doesn't see the call
+        return self.fold(n, lambda: TCInterpreter.callFn(self.k.tcrunner, fn, [a.tv for a in n.argnodes], schemaVars))
+
+    def pureFnFor(self, n, args):
+        # as parallel._isPureCallee - a name that may hold a value (e.g. a fn passed in) could be anything
+        fnnode, symtab = n.fnnode, n.symtab
+        name = getattr(fnnode, 'name', Missing)
+        if name is Missing or getattr(fnnode, 'scope', Missing) != LOCAL_SCOPE or symtab.hasV(name): return Missing, Missing
+        try:
+            fnMeta = symtab.fMetaForGet(name, LOCAL_SCOPE)
+            if fnMeta is Missing: return Missing, Missing
+            ov = fnMeta.symtab.getOverload(name, len(args))
+            if not isinstance(ov, Overload): return Missing, Missing
+            fn, schemaVars = self.k.tcrunner.selectFn(ov, len(args), args)
+        except Exception:
+            return Missing, Missing
+        if isinstance(fn, _tvfunc) and getattr(fn._v, 'bonesPure', False): return fn, schemaVars
+        return Missing, Missing
+
+    def fold(self, n, compute):
+        try:
+            v = compute()
+        except Exception:
+            return n
+        self.numFolded += 1
+        return tcconst(n.tok1, n.tok2, n.symtab, v, n)
+
+
+def eliminateCommonSubexpressions(snippet, report):
+    # answers the number of calls replaced by a read of a temp
+    cse = _CSE(report)
+    # not the snippet itself - its temps would be left bound in the module's frame
+    for frame in _frames(snippet)[1:]:
+        cse.sequence(frame.body, frame)
+    return cse.numReplaced
+
+
+def hoistInvariants(snippet, report):
+    # answers the number of calls hoisted
+    hoister = _Hoister(report)
+    for frame in _frames(snippet):
+        frame.body[:] = [hoister.node(n, frame) for n in frame.body]
+    return hoister.numHoisted
+
+
+class _Frame:
+    # a sequence that runs in its own frame - the snippet or a fn body - with the blocks in it
+    __slots__ = ['body', 'localNames', 'volatile']
+
+    def __init__(self, body, argnames):
+        self.body = body
+        self.localNames = set(argnames) | _bindsIn(body)       # names that may hold fns other than those in the symtab
+        self.volatile = set()                                   # bound in a block so could change at any time
+        for n in _inFrame(body):
+            if isinstance(n, tcblock): self.volatile |= _bindsIn(n.body or ())
+
+    def keyOf(self, n):
+        # answers (key, names read) if n is a pure call tree of local names and literals, else Missing
+        if (kn := _keyAndNames(n)) is Missing: return Missing
+        if any(n.symtab.hasV(name) for name in _calleesIn(n)): return Missing         # e.g. a fn in a module value
+        if not isPureExpr(n, self.localNames) or not _readsOnlyLocals([n], set()): return Missing
+        return kn
+
+
+class _Available:
+    __slots__ = ['node', 'names', 'pp', 'temp', 'uses']
+
+    def __init__(self, node, names):
+        self.node = node
+        self.names = names
+        self.pp = _pp(node)
+        self.temp = Missing
+        self.uses = 1
+
+
+class _CSE:
+
+    def __init__(self, report):
+        self.report = report
+        self.numReplaced = 0
+
+    def sequence(self, nodes, frame):
+        available, plan = {}, {}
+        for phrase in nodes:
+            boundHere = _bindsIn([phrase])
+            # a bind inside the phrase could happen before a later read in it so only reuse values it can't affect
+            nested = _bindsIn([phrase.vnode]) if isinstance(phrase, tcbindval) else boundHere
+            self.scan(phrase, available, plan, not nested, nested | frame.volatile, frame)
+            for key in [key for key, entry in available.items() if entry.names & boundHere]:
+                del available[key]
+            for n in _inFrame([phrase]):
+                if isinstance(n, tcblock) and not isinstance(n, tcfunc) and n.body: self.sequence(n.body, frame)
+        if plan:
+            nodes[:] = [self.rewrite(n, plan) for n in nodes]
+            for entry in {id(e): e for e in plan.values()}.values():
+                self.report.append(f'{_line(entry.node)}: {entry.pp} computed once as {entry.temp} ({entry.uses} uses)')
+
+    def scan(self, n, available, plan, register, excluded, frame):
+        # in evaluation order, not into blocks
+        if isinstance(n, tcapply):
+            kn = frame.keyOf(n)
+            ok = kn is not Missing and not (kn[1] & excluded)
+            if ok and (entry := available.get(kn[0], Missing)) is not Missing:
+                if entry.temp is Missing:
+                    entry.temp = f'__cse{next(_tempSeed)}__'
+                    entry.node.symtab.defVMeta(entry.temp, TBI, LOCAL_SCOPE)
+                    plan[entry.node.id] = entry
+                entry.uses += 1
+                plan[n.id] = entry
+                return
+            for arg in n.argnodes:
+                self.scan(arg, available, plan, register, excluded, frame)
+            if ok and register: available[kn[0]] = _Available(n, kn[1])
+        elif isinstance(n, (tcbindval, tcreturn, tchoist)):
+            self.scan(n.vnode, available, plan, register, excluded, frame)
+        elif isinstance(n, (tccoerce, tcpartialcheck)):
+            self.scan(n.lhnode, available, plan, register, excluded, frame)
+
+    def rewrite(self, n, plan):
+        entry = plan.get(n.id, Missing) if isinstance(n, tcapply) else Missing
+        if entry is not Missing and entry.node is not n:
+            self.numReplaced += 1
+            return _getTemp(n, entry.temp, entry.node.symtab)
+        if isinstance(n, tcapply):
+            n.argnodes[:] = [self.rewrite(arg, plan) for arg in n.argnodes]
+        elif isinstance(n, (tcbindval, tcreturn, tchoist)):
+            n.vnode = self.rewrite(n.vnode, plan)
+        elif isinstance(n, (tccoerce, tcpartialcheck)):
+            n.lhnode = self.rewrite(n.lhnode, plan)
+        if entry is not Missing:
+            return tcbindval(n.tok1, n.tok2, n.symtab, n, LOCAL_SCOPE, entry.temp, [])
+        return n
+
+
+class _Hoister:
+
+    def __init__(self, report):
+        self.report = report
+        self.numHoisted = 0
+
+    def node(self, n, frame):
+        # answers n or a tchoist wrapping it, inner loops first
+        if isinstance(n, tcapply):
+            n.argnodes[:] = [self.node(arg, frame) for arg in n.argnodes]
+            if getattr(n.fnnode, 'name', Missing) in LOOP_FNS:
+                names = []
+                for arg in n.argnodes:
+                    if isinstance(arg, tcblock) and not isinstance(arg, tcfunc) and arg.body:
+                        names.extend(self.fromBlock(arg, frame))
+                if names: return tchoist(n, names)
+        elif isinstance(n, tcblock) and not isinstance(n, tcfunc):
+            if n.body: n.body[:] = [self.node(phrase, frame) for phrase in n.body]
+        elif isinstance(n, (tcbindval, tcreturn)):
+            n.vnode = self.node(n.vnode, frame)
+        elif isinstance(n, (tccoerce, tcpartialcheck)):
+            n.lhnode = self.node(n.lhnode, frame)
+        return n
+
+    def fromBlock(self, block, frame):
+        inside = set(block.argnames) | _bindsIn(block.body) | frame.volatile
+        nameByKey = {}
+        block.body[:] = [self.invariants(phrase, inside, nameByKey, frame) for phrase in block.body]
+        return list(nameByKey.values())
+
+    def invariants(self, n, inside, nameByKey, frame):
+        if isinstance(n, tcapply):
+            if (kn := frame.keyOf(n)) is not Missing and not (kn[1] & inside):
+                if (name := nameByKey.get(kn[0], Missing)) is Missing:
+                    nameByKey[kn[0]] = name = f'__once{next(_tempSeed)}__'
+                    n.symtab.defVMeta(name, TBI, LOCAL_SCOPE)
+                    self.report.append(f'{_line(n)}: {_pp(n)} hoisted out of its block as {name}')
+                self.numHoisted += 1
+                return tconce(n, name)
+            n.argnodes[:] = [self.invariants(arg, inside, nameByKey, frame) for arg in n.argnodes]
+        elif isinstance(n, (tcbindval, tcreturn)):
+            n.vnode = self.invariants(n.vnode, inside, nameByKey, frame)
+        elif isinstance(n, (tccoerce, tcpartialcheck)):
+            n.lhnode = self.invariants(n.lhnode, inside, nameByKey, frame)
+        return n
+
+
+def _frames(snippet):
+    nodes = snippet.nodes if isinstance(snippet, tcsnippet) else [snippet]
+    frames, seen, stack = [_Frame(nodes, ())], set(), list(nodes)
+    while stack:
+        n = stack.pop()
+        if not isinstance(n, tcnode) or n.id in seen: continue
+        seen.add(n.id)
+        if isinstance(n, tcfunc) and n.body: frames.append(_Frame(n.body, n.argnames))
+        stack.extend(_children(n))
+    return frames
+
+
+def _children(n):
+    for attr in ('vnode', 'lhnode', 'fnode'):
+        if isinstance(child := getattr(n, attr, Missing), tcnode): yield child
+    if isinstance(n, tcapply): yield from n.argnodes
+    if isinstance(n, tcblock) and n.body: yield from n.body
+    if isinstance(n, tclittup): yield from (e for e in n.tv._v if isinstance(e, tcnode))
+    if isinstance(n, tclitstruct): yield from (v for _, v in n.tv._kvs() if isinstance(v, tcnode))
+
+
+def _inFrame(nodes):
+    # nodes and everything under them that runs in the same frame, i.e. not in fns
+    stack = list(nodes)
+    while stack:
+        n = stack.pop()
+        if not isinstance(n, tcnode): continue
+        yield n
+        if not isinstance(n, tcfunc): stack.extend(_children(n))
+
+
+def _bindsIn(nodes):
+    return {n.name for n in _inFrame(nodes) if isinstance(n, tcbindval) and n.scope == LOCAL_SCOPE}
+
+
+def _keyAndNames(n):
+    if isinstance(n, tcgetval):
+        if n.scope != LOCAL_SCOPE or n.accessors: return Missing
+        return ('get', n.name), {n.name}
+    if isinstance(n, tclit):
+        try:
+            return ('lit', type(n.tv), n.tv, hash(n.tv)), set()
+        except TypeError:
+            return ('lit', id(n.tv)), set()
+    if isinstance(n, tcapply):
+        name = getattr(n.fnnode, 'name', Missing)
+        if name is Missing or getattr(n.fnnode, 'scope', Missing) != LOCAL_SCOPE: return Missing
+        keys, names = [], set()
+        for arg in n.argnodes:
+            if (kn := _keyAndNames(arg)) is Missing: return Missing
+            keys.append(kn[0])
+            names |= kn[1]
+        return ('app', name, tuple(keys)), names
+    return Missing
+
+
+def _readsOnlyLocals(nodes, seen):
+    # True if nodes, and the bones fns they may call, only read names local to the frame each runs in
+    for n in _walk(nodes):
+        if isinstance(n, tcgetval) and n.scope != LOCAL_SCOPE: return False
+        if isinstance(n, tcapply):
+            for fn in _bonesCallees(n):
+                if fn.id in seen: continue
+                seen.add(fn.id)
+                if not _readsOnlyLocals(fn.body or (), seen): return False
+    return True
+
+
+def _walk(nodes):
+    # nodes and everything under them, fns included
+    stack = list(nodes)
+    while stack:
+        n = stack.pop()
+        if not isinstance(n, tcnode): continue
+        yield n
+        stack.extend(_children(n))
+
+
+def _bonesCallees(n):
+    # the tcfuncs and tcblocks n may call, as parallel._isPureCallee finds them
+    name = getattr(n.fnnode, 'name', Missing)
+    if name is Missing or (fnMeta := n.symtab.fMetaForGet(name, n.fnnode.scope)) is Missing: return []
+    ov = fnMeta.symtab.getOverload(name, len(n.argnodes))
+    if isinstance(ov, tcblock): return [ov]
+    if isinstance(ov, Overload): return [fn for _, fn in ov.items() if isinstance(fn, tcblock)]
+    return []
+
+
+def _calleesIn(n):
+    if isinstance(n, tcapply):
+        yield n.fnnode.name
+        for arg in n.argnodes: yield from _calleesIn(arg)
+
+
+def _getTemp(n, name, symtab):
+    get = tcgetval(n.tok1, symtab, LOCAL_SCOPE, name, [])
+    get.tOut = n.tOut
+    return get
+
+
+def _pp(n):
+    if isinstance(n, tcgetval): return n.name
+    if isinstance(n, tclit): return repr(n.tv)
+    if isinstance(n, tcapply): return f'{n.fnnode.name}({", ".join(_pp(arg) for arg in n.argnodes)})'
+    return '?'
+
+
+def _line(n):
+    return getattr(n.tok1, 'l1', '?')
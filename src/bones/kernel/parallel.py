@@ -0,0 +1,158 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Parallel strategies for the higher order fns (each, collect, select, ...) - the libraries that define those call pmap
+# / pselect with the fn they were given and, if the fn is a bones fn that isPure proves effect free, the sequence is
+# chunked across a thread pool and the results concatenated in order. Anything else runs serially.
+#
+#   with context(parallelWorkers=8, parallelMinChunk=1000):
+#       k.pace('A each {[row:vector] ...}')
+#
+# python fns are opaque so are only considered pure if marked with @pure. Threads rather than processes as tc nodes
+# reference their kernel and can't be shipped to another process - each thread has its own call stack (see
+# PythonStorageManager) so concurrent calls of a fn don't interfere. Scaling is limited by the GIL on standard builds
+# so this mostly pays off when the work is in GIL releasing python fns (e.g. numpy) or on free-threaded builds.
+
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
+from bones.core.sentinels import Missing
+from bones.core.context import context
+from bones.lang.types import _tvfunc
+from bones.kernel._core import LOCAL_SCOPE, CONTEXT_SCOPE, UNWIND
+from bones.kernel.tc import tcnode, tcblock, tcfunc, tcapply, tcbindval, tcgetval, tcgetfamily, tcgetoverload, tclit, \
+    tclitbtype, tclittup, tclitstruct, tccoerce, tcpartialcheck
+from bones.kernel.tc_interpreter import blockctx, InstrumentedTCInterpreter
+
+
+DEFAULT_MIN_CHUNK = 1024
+_CHUNKS_PER_WORKER = 4
+_PURE_LEAVES = (tclit, tclitbtype, tcgetval, tcgetfamily, tcgetoverload)
+
+_poolByNumWorkers = {}
+
+
+def pure(pyfn):
+    # marks a python fn as free of side effects so bones fns calling it can be parallelised
+    pyfn.bonesPure = True
+    return pyfn
+
+
+def isPure(fn):
+    # True if calling fn can't be observed other than by its result, i.e. no binds outside its own frame, no loads or
+    # imports, and only calls fns that are themselves pure
+    return _isPureFn(fn, {})
+
+
+def isPureExpr(n, localNames):
+    # True if evaluating n has no effect other than answering its value - localNames are names that may hold fns other
+    # than those in the symtab
+    return _isPureNode(n, localNames, False, {})
+
+
+def _isPureFn(fn, inProgress):
+    if isinstance(fn, _tvfunc):
+        return getattr(fn._v, 'bonesPure', False)
+    if not isinstance(fn, tcblock):
+        return getattr(fn, 'bonesPure', False)
+    if (answer := inProgress.get(fn.id, Missing)) is not Missing:
+        return answer               # recursion is assumed pure unless the rest of the body says otherwise
+    inProgress[fn.id] = True
+    # a tcblock (not a tcfunc) shares the enclosing frame so any bind would be visible outside
+    canBind = isinstance(fn, tcfunc)
+    # names that may hold fns other than those in the symtab, e.g. a fn passed in could be anything
+    localNames = set(fn.argnames).union(n.name for n in fn.body if isinstance(n, tcbindval))
+    answer = all(_isPureNode(n, localNames, canBind, inProgress) for n in fn.body)
+    inProgress[fn.id] = answer
+    return answer
+
+
+def _isPureNode(n, localNames, canBind, inProgress):
+    if isinstance(n, tcgetval) and n.scope == CONTEXT_SCOPE:
+        return False                # worker threads have their own stacks so wouldn't see the caller's context
+    if isinstance(n, _PURE_LEAVES):
+        return True
+    if isinstance(n, tcapply):
+        return all(_isPureNode(a, localNames, canBind, inProgress) for a in n.argnodes) \
+            and _isPureCallee(n, localNames, inProgress)
+    if isinstance(n, tcbindval):
+        return canBind and n.scope == LOCAL_SCOPE and not n.accessors \
+            and _isPureNode(n.vnode, localNames, canBind, inProgress)
+    if isinstance(n, (tccoerce, tcpartialcheck)):
+        return _isPureNode(n.lhnode, localNames, canBind, inProgress)
+    if isinstance(n, tclittup):
+        return all(_isPureNode(e, localNames, canBind, inProgress) for e in n.tv._v)
+    if isinstance(n, tclitstruct):
+        return all(_isPureNode(v, localNames, canBind, inProgress) for _, v in n.tv._kvs())
+    if isinstance(n, tcblock):
+        return True                 # creating a fn has no effect, calling it is checked at the call site
+    return False                    # tcbindfn, tcload, tcfromimport and anything new
+
+
+def _isPureCallee(n, localNames, inProgress):
+    fnnode = n.fnnode
+    name = getattr(fnnode, 'name', Missing)
+    if name is Missing or name in localNames: return False
+    fnMeta = n.symtab.fMetaForGet(name, fnnode.scope)
+    if fnMeta is Missing: return False
+    ov = fnMeta.symtab.getOverload(name, len(n.argnodes))
+    if ov is Missing: return False
+    if isinstance(ov, tcblock): return _isPureFn(ov, inProgress)
+    return all(_isPureFn(fn, inProgress) for _, fn in ov.items())
+
+
+def pmap(fn, xs):
+    # [fn(x) for x in xs] in parallel when it's worthwhile and safe
+    xs = xs if isinstance(xs, (list, tuple)) else list(xs)
+    if (chunks := _chunksFor(fn, xs)) is Missing:
+        answer = []
+        for x in xs:
+            if (r := fn(x)) is UNWIND: return r         # a ^ in fn - stop and pass it on
+            answer.append(r)
+        return answer
+    results = _pool().map(lambda chunk: [fn(x) for x in chunk], chunks)
+    return list(itertools.chain.from_iterable(results))
+
+
+def pselect(fn, xs):
+    # [x for x in xs if fn(x)] in parallel when it's worthwhile and safe
+    xs = xs if isinstance(xs, (list, tuple)) else list(xs)
+    if (chunks := _chunksFor(fn, xs)) is Missing:
+        answer = []
+        for x in xs:
+            if (r := fn(x)) is UNWIND: return r
+            if r: answer.append(x)
+        return answer
+    results = _pool().map(lambda chunk: [x for x in chunk if fn(x)], chunks)
+    return list(itertools.chain.from_iterable(results))
+
+
+def _chunksFor(fn, xs):
+    workers = 0 if context.parallelWorkers is Missing else context.parallelWorkers
+    minChunk = DEFAULT_MIN_CHUNK if context.parallelMinChunk is Missing else context.parallelMinChunk
+    if workers < 2 or len(xs) < 2 * minChunk: return Missing
+    # blocks arrive evaluated - concurrent calls are safe as each call holds its args in its own bblockframe on the
+    # calling thread's stack, and a pure block binds nothing in the frame it shares
+    node = fn.block if isinstance(fn, blockctx) else fn
+    if isinstance(node, tcnode) and _isInstrumented(node): return Missing   # hooks keep per call state
+    if not isPure(node): return Missing
+    size = max(minChunk, -(-len(xs) // (workers * _CHUNKS_PER_WORKER)))
+    chunks = [xs[i:i + size] for i in range(0, len(xs), size)]
+    return chunks if len(chunks) > 1 else Missing
+
+
+def _isInstrumented(fn):
+    return isinstance(fn.symtab.kernel.tcrunner, InstrumentedTCInterpreter)
+
+
+def _pool():
+    workers = context.parallelWorkers
+    if (pool := _poolByNumWorkers.get(workers, Missing)) is Missing:
+        _poolByNumWorkers[workers] = pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bones')
+    return pool
@@ -296,6 +296,9 @@ ERR_ON_EMPTY_NONE_OK = 4
 CAUGHT = True
 NOT_CAUGHT = False
 
+# set to True to type check every element added to the phrase and token lists - useful when changing the grouper
+VALIDATE_GROUPS = False
+
 def PPDebug(token):
     if token.tag == BREAKOUT: return "{BO}"
     if token.tag == LINE_BREAK: return r'\n'
@@ -317,35 +320,24 @@ def PPCloser(tokenTag):
 def parseStructure(tokens, symtab, src, TRACE=False):
     stack = _Stack()
     currentG = stack.push(SnippetGrp(Missing, Missing, symtab))   # this one obviously doesn't need catching!!
-    openers = {
-        L_PAREN : catchLParen,
-        L_BRACKET : catchLBracket,
-        L_ANGLE_COLON : catchLAngleColon,
-        L_BRACE : catchLBrace,
-        L_BRACKET_BRACKET : catchLBracketBracket,
-        L_BRACE_BRACKET : catchLBraceBracket,
-        L_BRACE_BRACE : catchLBraceBrace,
-        L_BRACE_BRACE_BRACKET : catchLBraceBraceBracket,
-        COLON_L_PAREN : catchColonLParen,
-        L_PAREN_BRACKET : catchLParenBracket,
-    }
-    closers = (R_PAREN, R_BRACKET, R_ANGLE, R_BRACE, R_BRACE_BRACE, R_PAREN_COLON)
     traceGroupCount = itertools.count()
     traceGroups = {}
 
     # for all of the tokens in the stream
-    for token in tokens[1:]:
-        opener = openers.get(token.tag, Missing)
-        isCloser = token.tag in closers
-        isNormal = (not opener and not isCloser) or (token.tag == R_ANGLE and not isinstance(currentG, TypelangGrp))
+    for token in itertools.islice(tokens, 1, None):
+        tag = token.tag
+        action = _structureActions[_TYPELANG_STATE if isinstance(currentG, TypelangGrp) else _NORMAL_STATE][tag]
+        opener = _openerByTag[tag] if action & _OPEN else Missing
+        isCloser = action & _CLOSE
+        isNormal = action & _CONSUME
+        # only load, from and KEYWORD_OR_BIND_LEFT can interrupt a group so decide up front which catcher (if any) applies
+        interrupter = _interruptersByName.get(token.src, Missing) if tag == NAME else _interruptersByTag.get(tag, Missing)
 
         # find a consumer for the token
         consumer = Missing
         while consumer is Missing:
-            if currentG._isInteruptable:
-                consumer = catchLoad(token, currentG, stack)
-                if consumer is Missing: consumer = catchFromImport(token, currentG, stack)
-                if consumer is Missing: consumer = catchKeyword(token, currentG, stack)
+            if interrupter is not Missing and currentG._isInteruptable:
+                consumer = interrupter(token, currentG, stack)
                 if consumer:
                     if TRACE:
                         f"{currentG.PPDebug} != {PPDebug(token)} .1" >> PP
@@ -426,6 +418,42 @@ def parseStructure(tokens, symtab, src, TRACE=False):
 
 
 
+# _Group._consumeToken's dispatch - token tag -> action (plus the scope and name offset for symtab notes)
+_C_APPEND = 0
+_C_NOTE_GET = 1
+_C_NOTE_SET = 2
+_C_IGNORE = 3
+_C_LINE_BREAK = 4
+_C_CONTINUATION = 5
+_C_DOT = 6
+_C_COMMA = 7
+_C_SEMI_COLON = 8
+_C_BIND_LEFT = 9
+
+_consumeActionByTag = [_C_APPEND] * len(prettyNameByTag)
+_scopeByTag = [Missing] * len(prettyNameByTag)
+_nameStartByTag = [0] * len(prettyNameByTag)
+for _tag in (LINE_COMMENT, INLINE_COMMENT, BREAKOUT): _consumeActionByTag[_tag] = _C_IGNORE
+_consumeActionByTag[LINE_BREAK] = _C_LINE_BREAK
+_consumeActionByTag[CONTINUATION] = _C_CONTINUATION
+_consumeActionByTag[DOT] = _C_DOT
+_consumeActionByTag[COMMA] = _C_COMMA
+_consumeActionByTag[SEMI_COLON] = _C_SEMI_COLON
+_consumeActionByTag[KEYWORD_OR_BIND_LEFT] = _C_BIND_LEFT
+for _tag, _scope in ((BIND_RIGHT, LOCAL_SCOPE), (CONTEXT_BIND_RIGHT, CONTEXT_SCOPE), (GLOBAL_BIND_RIGHT, GLOBAL_SCOPE)):
+    _consumeActionByTag[_tag] = _C_NOTE_SET
+    _scopeByTag[_tag] = _scope
+for _tag, _scope, _start in (
+    (NAME, LOCAL_SCOPE, 0), (PARENT_VALUE_NAME, PARENT_SCOPE, 1), (MODULE_VALUE_NAME, MODULE_SCOPE, 2),
+    (CONTEXT_NAME, CONTEXT_SCOPE, 2), (GLOBAL_NAME, GLOBAL_SCOPE, 3),
+):
+    _consumeActionByTag[_tag] = _C_NOTE_GET
+    _scopeByTag[_tag] = _scope
+    _nameStartByTag[_tag] = _start
+_consumeActionByTag, _scopeByTag, _nameStartByTag = tuple(_consumeActionByTag), tuple(_scopeByTag), tuple(_nameStartByTag)
+del _tag, _scope, _start
+
+
 # _Group serves a two fold propose -
 #   1) provide the behaviour of the current sink of tokens,
 #   2) abstract base class of all groups,
@@ -468,14 +496,30 @@ class _Group:
 
         if not isinstance(tokenOrGroup, Token):
             self._appendToken(tokenOrGroup, indent)
+            return self
 
-        elif tokenOrGroup.tag in (LINE_COMMENT, INLINE_COMMENT, BREAKOUT):
-            pass
+        tag = tokenOrGroup.tag
+        action = _consumeActionByTag[tag]
 
-        elif tokenOrGroup.tag is CONTINUATION:
-            self._phraseIndent = Missing
+        if action is _C_APPEND:
+            self._appendToken(tokenOrGroup, indent)
 
-        elif tokenOrGroup.tag is LINE_BREAK:
+        elif action is _C_NOTE_GET:                                 # name, .name, ..name, _.name, _..name
+            self.symtab.noteGets(tokenOrGroup.src[_nameStartByTag[tag]:], _scopeByTag[tag])
+            self._appendToken(tokenOrGroup, indent)
+
+        elif action is _C_NOTE_SET:
+            # check we are NOT at start of phrase
+            if not self._tokens:
+                msg = f'":{tokenOrGroup.src}" (AssignRight) is not allowed at start of phrase ({tokenOrGroup.l1}:{tokenOrGroup.l2})'
+                raise BonesGroupingError(msg, ErrSite(self.__class__, "assign right"), self, tokenOrGroup)
+            self.symtab.noteSets(tokenOrGroup.src, _scopeByTag[tag])
+            self._appendToken(tokenOrGroup, indent)
+
+        elif action is _C_IGNORE:
+            pass
+
+        elif action is _C_LINE_BREAK:
             if self._phraseIndent is Missing:
                 self._phraseState = SUGGESTED_BY_LINE_BREAK   # current needed by tuples not sure why SECTION_END was wanted
             elif indent > self._phraseIndent:
@@ -483,74 +527,29 @@ class _Group:
             else:
                 self._phraseState = SUGGESTED_BY_LINE_BREAK     # current needed by snippet not sure why SECTION_END was wanted
 
-        elif tokenOrGroup.tag is DOT:
+        elif action is _C_CONTINUATION:
+            self._phraseIndent = Missing
+
+        elif action is _C_DOT:
             self._phraseState = SECTION_END
             self._dotEncountered(tokenOrGroup)
 
-        elif tokenOrGroup.tag is COMMA:
+        elif action is _C_COMMA:
             self._phraseState = SECTION_END
             self._commaEncountered(tokenOrGroup)
 
-        elif tokenOrGroup.tag is SEMI_COLON:
+        elif action is _C_SEMI_COLON:
             self._phraseState = SECTION_END
             self._semicolonEncountered(tokenOrGroup)
 
-        elif tokenOrGroup.tag is KEYWORD_OR_BIND_LEFT:
-            if len(self._tokens) == 0:
-                tokenOrGroup = toAssignLeft(tokenOrGroup)
-                self._appendToken(tokenOrGroup, indent)
-            else:
-                # from x.y.z import ifTrue:ifFalse: turns the interuption off so this is valid
-                # raise ProgrammerError("Should be handled by the keyword catcher?")
-                tokenOrGroup = toAssignLeft(tokenOrGroup)
-                self._appendToken(tokenOrGroup, indent)
-
-        elif tokenOrGroup.tag is BIND_RIGHT:
-            # check we are NOT at start of phrase
-            if not self._tokens:
-                msg = f'":{tokenOrGroup.src}" (AssignRight) is not allowed at start of phrase ({tokenOrGroup.l1}:{tokenOrGroup.l2})'
-                raise BonesGroupingError(msg, ErrSite(self.__class__, "assign right"), self, tokenOrGroup)
-            self.symtab.noteSets(tokenOrGroup.src, LOCAL_SCOPE)
-            self._appendToken(tokenOrGroup, indent)
-
-        elif tokenOrGroup.tag is CONTEXT_BIND_RIGHT:
-            # check we are NOT at start of phrase
-            if not self._tokens:
-                msg = f'":{tokenOrGroup.src}" (AssignRight) is not allowed at start of phrase ({tokenOrGroup.l1}:{tokenOrGroup.l2})'
-                raise BonesGroupingError(msg, ErrSite(self.__class__, "assign right"), self, tokenOrGroup)
-            self.symtab.noteSets(tokenOrGroup.src, CONTEXT_SCOPE)
-            self._appendToken(tokenOrGroup, indent)
-
-        elif tokenOrGroup.tag is GLOBAL_BIND_RIGHT:
-            # check we are NOT at start of phrase
-            if not self._tokens:
-                msg = f'":{tokenOrGroup.src}" (AssignRight) is not allowed at start of phrase ({tokenOrGroup.l1}:{tokenOrGroup.l2})'
-                raise BonesGroupingError(msg, ErrSite(self.__class__, "assign right"), self, tokenOrGroup)
-            self.symtab.noteSets(tokenOrGroup.src, GLOBAL_SCOPE)
-            self._appendToken(tokenOrGroup, indent)
-
-        elif tokenOrGroup.tag is NAME:
-            self.symtab.noteGets(tokenOrGroup.src, LOCAL_SCOPE)
-            self._appendToken(tokenOrGroup, indent)
-
-        elif tokenOrGroup.tag is PARENT_VALUE_NAME:                 # .name
-            self.symtab.noteGets(tokenOrGroup.src[1:], PARENT_SCOPE)
-            self._appendToken(tokenOrGroup, indent)
-
-        elif tokenOrGroup.tag is MODULE_VALUE_NAME:                 # ..name
-            self.symtab.noteGets(tokenOrGroup.src[2:], MODULE_SCOPE)
-            self._appendToken(tokenOrGroup, indent)
-
-        elif tokenOrGroup.tag is CONTEXT_NAME:                      # _.name
-            self.symtab.noteGets(tokenOrGroup.src[2:], CONTEXT_SCOPE)
-            self._appendToken(tokenOrGroup, indent)
-
-        elif tokenOrGroup.tag is GLOBAL_NAME:
-            self.symtab.noteGets(tokenOrGroup.src[3:], GLOBAL_SCOPE)         # _..name
+        elif action is _C_BIND_LEFT:
+            # a keyword not caught by catchKeyword, e.g. at the start of a phrase, or interruption is turned off as in
+            # from x.y.z import ifTrue:ifFalse:
+            tokenOrGroup = toAssignLeft(tokenOrGroup)
             self._appendToken(tokenOrGroup, indent)
 
         else:
-            self._appendToken(tokenOrGroup, indent)
+            raise ProgrammerError()
 
         return self
 
@@ -991,7 +990,7 @@ def _processAssigmentsInPhrase(phrase, exactlyOneNameInPhrase, group, tokenOrGro
                             symtab.defVMeta(varName, TBI, LOCAL_SCOPE)
                         
                 elif each.tag == CONTEXT_BIND_RIGHT:
-                    varName = each.src[5:]
+                    varName = each.src[3:]
                     numNames += 1
                     if isinstance(prior, FuncOrStructGrp):
                         _checkStyle(prior, varName, symtab)
@@ -2160,22 +2159,20 @@ def _getId():
 
 # these are typed collections that guard against the wrong thing being added
 class _GuardedList(list):
-    def __init__(self, sep, isTypeErrorFn):
-        self._sep = sep
-        self._isTypeError = isTypeErrorFn
-        super().__init__()
+    # subclasses define _sep and _isTypeError at the class level so creating a list (which happens a lot) is cheap
+    _sep = ' '
     def sep(self, sep):
         self._sep = sep + ' '
         return self
     def __lshift__(self, other):   # self << other
-        if self._isTypeError(other):
-            raise TypeError()
-        self.append(other)
+        if VALIDATE_GROUPS and self._isTypeError(other): raise TypeError()
+        list.append(self, other)
         return self
     def __add__(self, other):
-        for e in other:
-            if self._isTypeError(e): raise TypeError()
-            self.append(e)
+        if VALIDATE_GROUPS:
+            for e in other:
+                if self._isTypeError(e): raise TypeError()
+        self.extend(other)
         return self
     @property
     def first(self):
@@ -2195,58 +2192,55 @@ class _GuardedList(list):
         pps = [('' if e is Missing else e.PPTC(depth+1)) for e in self]
         return self._sep.join(pps)
     def append(self, other):
-        if self._isTypeError(other): raise TypeError()
+        if VALIDATE_GROUPS and self._isTypeError(other): raise TypeError()
         return super().append(other)
 
 class _TokensGL(_GuardedList):
-    def __init__(self):
-        super().__init__(
-            ' ',
-            lambda x: not isinstance(x, (Token, _Group))
-        )
+    _sep = ' '
+    @staticmethod
+    def _isTypeError(x):
+        return not isinstance(x, (Token, _Group))
 
 class _DotOrCommaSepGL(_GuardedList):
     def __init__(self, sep):
-        super().__init__(
-            sep + ' ',
-            lambda x: not (
-                isinstance(x, (_TokensGL, tcnode)) or
-                x is Missing or
-                (isinstance(x, Token) and x.tag is NULL)
-            )
+        super().__init__()
+        self._sep = sep + ' '
+    @staticmethod
+    def _isTypeError(x):
+        return not (
+            isinstance(x, (_TokensGL, tcnode)) or
+            x is Missing or
+            (isinstance(x, Token) and x.tag is NULL)
         )
 
 class SemiColonSepCommaSep(_GuardedList):
-    def __init__(self):
-        super().__init__(
-            '; ',
-            lambda x: not (
-                isinstance(x, _DotOrCommaSepGL) or
-                x is Missing or
-                (isinstance(x, Token) and x.tag is NULL)
-            )
+    _sep = '; '
+    @staticmethod
+    def _isTypeError(x):
+        return not (
+            isinstance(x, _DotOrCommaSepGL) or
+            x is Missing or
+            (isinstance(x, Token) and x.tag is NULL)
         )
 
 class _CommaSepDotSepGL(_GuardedList):
-    def __init__(self):
-        super().__init__(
-            ', ',
-            lambda x: not (
-                isinstance(x, _DotOrCommaSepGL) or
-                x is Missing or
-                (isinstance(x, Token) and x.tag is NULL)
-            )
+    _sep = ', '
+    @staticmethod
+    def _isTypeError(x):
+        return not (
+            isinstance(x, _DotOrCommaSepGL) or
+            x is Missing or
+            (isinstance(x, Token) and x.tag is NULL)
         )
 
 class _SemiColonSepCommaSepDotSepGL(_GuardedList):
-    def __init__(self):
-        super().__init__(
-            '; ',
-            lambda x: not (
-                isinstance(x, _CommaSepDotSepGL) or
-                x is Missing or
-                (isinstance(x, Token) and x.tag is NULL)
-            )
+    _sep = '; '
+    @staticmethod
+    def _isTypeError(x):
+        return not (
+            isinstance(x, _CommaSepDotSepGL) or
+            x is Missing or
+            (isinstance(x, Token) and x.tag is NULL)
         )
 
 
@@ -2268,7 +2262,7 @@ def toAssignRight(t):
 def toContextAssignRight(t):
     assert t.tag == CONTEXT_BIND_LEFT
     return Token(
-        t.srcId, t.src, CONTEXT_BIND_RIGHT, t.indent,
+        t.srcId, ':'+t.src[:-1], CONTEXT_BIND_RIGHT, t.indent,
         t.t, t.l1, t.l2, t.c1, t.c2, t.s1, t.s2
     )
 
@@ -2280,6 +2274,44 @@ def toGlobalAssignRight(t):
     )
 
 
+# parseStructure's dispatch - (group state x token tag) -> action bits, where the state is whether we are inside a
+# type language group (in which a lone > closes rather than being consumed as a name)
+_CONSUME = 1
+_CLOSE = 2
+_OPEN = 4
+
+_NORMAL_STATE = 0
+_TYPELANG_STATE = 1
+
+_openerByTag = [Missing] * len(prettyNameByTag)
+_openerByTag[L_PAREN] = catchLParen
+_openerByTag[L_BRACKET] = catchLBracket
+_openerByTag[L_ANGLE_COLON] = catchLAngleColon
+_openerByTag[L_BRACE] = catchLBrace
+_openerByTag[L_BRACKET_BRACKET] = catchLBracketBracket
+_openerByTag[L_BRACE_BRACKET] = catchLBraceBracket
+_openerByTag[L_BRACE_BRACE] = catchLBraceBrace
+_openerByTag[L_BRACE_BRACE_BRACKET] = catchLBraceBraceBracket
+_openerByTag[COLON_L_PAREN] = catchColonLParen
+_openerByTag[L_PAREN_BRACKET] = catchLParenBracket
+_openerByTag = tuple(_openerByTag)
+
+def _buildStructureActions(state):
+    actions = [_CONSUME] * len(prettyNameByTag)
+    for tag, opener in enumerate(_openerByTag):
+        if opener is not Missing: actions[tag] = _OPEN
+    for tag in (R_PAREN, R_BRACKET, R_ANGLE, R_BRACE, R_BRACE_BRACE, R_PAREN_COLON):
+        actions[tag] = _CLOSE
+    if state == _NORMAL_STATE:
+        actions[R_ANGLE] = _CONSUME | _CLOSE
+    return tuple(actions)
+
+_structureActions = (_buildStructureActions(_NORMAL_STATE), _buildStructureActions(_TYPELANG_STATE))
+
+_interruptersByName = {'load': catchLoad, 'from': catchFromImport}
+_interruptersByTag = {KEYWORD_OR_BIND_LEFT: catchKeyword}
+
+
 class _Stack:
     def __init__(self):
         self._list = []
@@ -2287,7 +2319,7 @@ class _Stack:
         self._list.append(x)
         return x
     def pop(self):
-        self._list = self._list[0:-1]
+        self._list.pop()
     @property
     def current(self):
         return self._list[-1]
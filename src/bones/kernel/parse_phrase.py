@@ -8,6 +8,7 @@
 # **********************************************************************************************************************
 
 import sys
+from array import array
 
 import bones.lang.types
 
@@ -15,7 +16,7 @@ if hasattr(sys, '_TRACE_IMPORTS') and sys._TRACE_IMPORTS: print(__name__)
 
 
 from coppertop.pipe import nullary, unary, binary, ternary
-from bones.core.errors import ProgrammerError, NotYetImplemented, PathNotTested, ErrSite
+from bones.core.errors import ProgrammerError, NotYetImplemented, PathNotTested, ErrSite, handlersByErrSiteId
 from bones.core.sentinels import Missing
 from bones.core.context import context
 from bones.kernel._core import RET_VAR_NAME
@@ -29,7 +30,7 @@ from bones.kernel.lex import Token, prettyNameByTag, \
     NAME, SYMBOLIC_NAME, BIND_RIGHT, BIND_LEFT, \
     PARENT_VALUE_NAME, \
     CONTEXT_NAME, CONTEXT_BIND_RIGHT, \
-    GLOBAL_NAME, GLOBAL_BIND_RIGHT, KEYWORD_OR_BIND_LEFT, ELLIPSES
+    GLOBAL_NAME, GLOBAL_BIND_RIGHT, KEYWORD_OR_BIND_LEFT, ELLIPSES, RETURN, SIGNAL
 from bones.kernel.parse_groups import \
     LoadGrp, FromImportGrp, \
     FuncOrStructGrp, TupParenOrDestructureGrp, BlockGrp, \
@@ -37,7 +38,7 @@ from bones.kernel.parse_groups import \
     FrameGrp, _SemiColonSepCommaSepDotSepGL, SemiColonSepCommaSep, _DotOrCommaSepGL, _CommaSepDotSepGL
 from bones.kernel.symbol_table import VMeta, FnMeta, fnSymTab, blockSymTab
 from bones.kernel.tc import tclit, tcvoidphrase, tcbindval, tcgetval, tcgetoverload, tcsnippet, tcapply, tcfunc, tcload, tcfromimport, \
-    tcbindfn, tcgetfamily, tcassumedfunc, tclitstruct, tclittup, tclitframe, tcblock, tclitbtype
+    tcbindfn, tcgetfamily, tcassumedfunc, tclitstruct, tclittup, tclitframe, tcblock, tclitbtype, tcreturn, tcconst
 from bones.ts.metatypes import BTTuple, BTStruct
 from bones.kernel._core import LOCAL_SCOPE, PARENT_SCOPE, CONTEXT_SCOPE, GLOBAL_SCOPE
 from bones.lang.types import TBI, littup
@@ -109,6 +110,34 @@ def parseTupParenOrDestructureGroup(group, symtab, k):
         raise ProgrammerError()
 
 
+def parseNumArray(group, k):
+    # a tuple literal of just numbers, e.g. (1.00, 0.95; 0.95, 1.00), goes straight from the lexed tokens into one row
+    # major buffer - array('q') if every element is an INTEGER else array('d') - which k.litnumarrayCons(tElem, shape,
+    # buf) turns into a value, e.g. lambda tElem, shape, buf: np.frombuffer(buf).reshape(shape). Answers Missing if the
+    # group isn't such a literal, e.g. an element is -1 or 1 + 1, or the rows differ in length
+    rows = list(group.grid)
+    if len(rows) > 1 and all(phrase is Missing for phrase in rows[-1]): rows.pop()          # a trailing ;
+    srcs, allInts, numCols = [], True, len(rows[0])
+    for row in rows:
+        if len(row) != numCols: return Missing
+        for phrase in row:
+            if phrase is Missing or len(phrase) != 1 or not isinstance(phrase[0], Token): return Missing
+            if (tag := phrase[0].tag) == DECIMAL:
+                allInts = False
+            elif tag != INTEGER:
+                return Missing
+            srcs.append(phrase[0].src)
+    try:
+        if allInts:
+            buf, tElem = array('q', [int(src) for src in srcs]), bones.lang.types.litint
+        else:
+            buf, tElem = array('d', [float(src) for src in srcs]), bones.lang.types.litnum
+    except (ValueError, OverflowError):
+        return Missing          # leave anything unusual to the parsers
+    shape = (len(rows), numCols) if group.tupleType == TUPLE_2D else (len(srcs),)
+    return k.litnumarrayCons(tElem, shape, buf)
+
+
 def snippetOrTc(phrases):
     if isinstance(phrases, list):
         if len(phrases) == 1:
@@ -302,6 +331,12 @@ def parseSingle(t, symtab, k):
                 return tcgetval(t.tok1, meta.symtab, LOCAL_SCOPE, name, accessors).setTOut(meta.t)
             else:
                 return tcgetfamily(t.tok1, meta.symtab, name, LOCAL_SCOPE)
+        elif tag == CONTEXT_NAME:
+            name = t.src[2:]
+            meta = symtab.vMetaForGet(name, CONTEXT_SCOPE)
+            if meta is Missing: raise BonesPhraseError(f"unknown context name - {name}")
+            symtab.noteGets(name, CONTEXT_SCOPE)
+            return tcgetval(t.tok1, meta.symtab, CONTEXT_SCOPE, name, []).setTOut(meta.t)
         elif tag == INTEGER:
             return tclit(t.tok1, symtab, k.parsers.parseLitInt(t.src))
         elif tag == DECIMAL:
@@ -340,7 +375,9 @@ def parsePhrase(tokens, symtab, k):
 
     tcnode = Missing
 
-    tokens = _queue(tokens[1:] if isinstance(tokens[0], Token) and tokens[0].tag == START else tokens)
+    start = 1 if isinstance(tokens[0], Token) and tokens[0].tag == START else 0
+    # a slice of a caller's stream (e.g. the tail after ^) is already a cursor of its own so is advanced not wrapped
+    tokens = tokens >> start if isinstance(tokens, _TokenStream) else _TokenStream(tokens, start)
 
     while tokens:
         t = tokens[0]
@@ -399,10 +436,12 @@ def parsePhrase(tokens, symtab, k):
                 raise NotYetImplemented()
 
             elif tag == CONTEXT_NAME:
-                name = t.src
-                meta = symtab.fOrVMetaForGet(name, CONTEXT_NAME)
+                name = t.src[2:]
+                meta = symtab.vMetaForGet(name, CONTEXT_SCOPE)
                 if meta is Missing: raise BonesPhraseError(f"unknown context name - {name}")
-                raise NotYetImplemented()
+                symtab.noteGets(name, CONTEXT_SCOPE)
+                tcnode = tcgetval(t.tok1, meta.symtab, CONTEXT_SCOPE, name, []).setTOut(meta.t)
+                tokens >> 1
 
             elif tag == GLOBAL_NAME:
                 name = t.src
@@ -438,9 +477,13 @@ def parsePhrase(tokens, symtab, k):
                     tokens >> 1
 
             elif tag == CONTEXT_BIND_RIGHT:
-                name = t.src
-                meta = symtab.fOrVMetaForBind(name, CONTEXT_SCOPE)
-                raise NotYetImplemented()
+                name = t.src[3:]
+                if isinstance(tcnode, (tcfunc, tcblock)):
+                    raise NotYetImplemented("Contextual fns")
+                symtab.defVMeta(name, TBI, CONTEXT_SCOPE)
+                tcnode = tcnode[0] if isinstance(tcnode, list) else tcnode
+                tcnode = tcbindval(t.tok1, t.tok2, symtab, tcnode, CONTEXT_SCOPE, name, [])
+                tokens >> 1
 
             elif tag == GLOBAL_BIND_RIGHT:
                 name = t.src
@@ -490,6 +533,14 @@ def parsePhrase(tokens, symtab, k):
             elif tag == NULL:
                 return tcvoidphrase(t.tok1, t.tok2, symtab)
 
+            elif tag in (RETURN, SIGNAL):
+                # ^ expr / ^^ expr - the rest of the phrase is the value
+                if tcnode is not Missing:
+                    raise BonesPhraseError(f"{t.PPGroup} must start a phrase", ErrSite("return not at start"))
+                vnode = parsePhrase(tokens[1:], symtab, k) if len(tokens) > 1 else tcvoidphrase(t.tok1, t.tok2, symtab)
+                tcnode = tcreturn(t.tok1, t.tok2, symtab, vnode, tag == SIGNAL)
+                tokens >> len(tokens)
+
             else:
                 raise ProgrammerError()
 
@@ -538,7 +589,11 @@ def parsePhrase(tokens, symtab, k):
                     tokens >> numConsumed
 
             elif isinstance(t, TupParenOrDestructureGrp):
-                if tcnode is Missing:
+                if tcnode is Missing and k.litnumarrayCons is not Missing and t.tupleType in (TUPLE_2D, TUPLE_0_EMPTY) \
+                        and (tv := parseNumArray(t, k)) is not Missing:
+                    tcnode = tcconst(t.tok1, t.tok2, symtab, tv)
+                    tokens >> 1
+                elif tcnode is Missing:
                     if t.tupleType == DESTRUCTURE:
                         raise NotYetImplemented('TupParenOrDestructureGrp.tupleType == DESTRUCTURE')
                     if t.tupleType == TUPLE_OR_PAREN:
@@ -658,10 +713,34 @@ def _inDictionaryOrder(x):
         return (o - 65) * 2 + 1
 
 
-class _queue(list):
-    # could make more efficient by creating a view into tokens rather than copying?
-    def __rshift__(self, other):    # self >> other
-        for i in range(other):
-            self.pop(0)
+class _TokenStream:
+    # a cursor into tokens - advancing (self >> n), lookahead and slicing are O(1) and never copy tokens
+    __slots__ = ['_tokens', '_i', '_end']
+    def __init__(self, tokens, i=0, end=Missing):
+        self._tokens = tokens
+        self._i = i
+        self._end = len(tokens) if end is Missing else end
+    def __rshift__(self, n):    # self >> n
+        self._i = min(self._i + n, self._end)
         return self
-
+    def __len__(self):
+        return self._end - self._i
+    def __bool__(self):
+        return self._i < self._end
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._end - self._i)
+            if step != 1: raise ProgrammerError('_TokenStream only supports contiguous slices')
+            return _TokenStream(self._tokens, self._i + start, self._i + max(start, stop))
+        if index < 0: index += self._end - self._i
+        if index < 0 or self._i + index >= self._end: raise IndexError(index)
+        return self._tokens[self._i + index]
+    def __iter__(self):
+        tokens = self._tokens
+        for i in range(self._i, self._end):
+            yield tokens[i]
+
+
+handlersByErrSiteId.update({
+    ('bones.kernel.parse_phrase', Missing, 'parsePhrase', 'return not at start') : '...',
+})
@@ -0,0 +1,479 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Persistent collections for bones values - since values are immutable an update answers a new collection that shares
+# all but O(log n) of its structure with the old one, so join, prependTo, drop, take and struct updates in recursive
+# algorithms (e.g. canon/dm/algos/partitions.b) don't copy.
+#
+#   PSeq - a balanced (AVL) tree of chunks of up to 32 elements. Index, update, append, prepend, join (concatenation)
+#          and slicing are all O(log n). Like an RRB vector join of two sequences doesn't copy either.
+#   PMap - a hash array mapped trie (HAMT) of 32 way nodes. get, set and without are O(log32 n). Iteration is in
+#          insertion order (as a struct's fields are) so keys remember when they were first set.
+#
+# ptup and pstruct wrap them with a bones type, and littupCons / litstructCons can be handed to the kernel so literal
+# tuples and structs are built persistent from the start:
+#
+#   k = BonesKernel(littupCons=persistent.littupCons, litstructCons=persistent.litstructCons, ...)
+
+from bones.core.sentinels import Missing
+
+
+_CHUNK = 32
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_MASK = 0xFFFFFFFF
+
+
+# **********************************************************************************************************************
+# PSeq
+# **********************************************************************************************************************
+
+class _Leaf:
+    __slots__ = ['items']
+    height = 0
+    def __init__(self, items):
+        self.items = items                  # a tuple of at most _CHUNK elements
+    @property
+    def size(self):
+        return len(self.items)
+
+
+class _Branch:
+    __slots__ = ['left', 'right', 'size', 'height']
+    def __init__(self, left, right):
+        self.left = left
+        self.right = right
+        self.size = left.size + right.size
+        self.height = 1 + max(left.height, right.height)
+
+
+_EMPTY_LEAF = _Leaf(())
+
+
+class PSeq:
+
+    __slots__ = ['_root']
+
+    def __init__(self, xs=()):
+        if isinstance(xs, PSeq):
+            self._root = xs._root
+            return
+        xs = tuple(xs)
+        nodes = [_Leaf(xs[i:i + _CHUNK]) for i in range(0, len(xs), _CHUNK)] or [_EMPTY_LEAF]
+        while len(nodes) > 1:
+            # pairing neighbours bottom up gives a tree whose heights differ by at most one
+            paired = [_Branch(nodes[i], nodes[i + 1]) for i in range(0, len(nodes) - 1, 2)]
+            if len(nodes) % 2: paired[-1] = _concat(paired[-1], nodes[-1])
+            nodes = paired
+        self._root = nodes[0]
+
+    @classmethod
+    def _fromRoot(cls, root):
+        answer = cls.__new__(cls)
+        answer._root = root
+        return answer
+
+    def __len__(self):
+        return self._root.size
+
+    def __iter__(self):
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, _Leaf):
+                yield from node.items
+            else:
+                stack.append(node.right)
+                stack.append(node.left)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(len(self))
+            if step != 1: return PSeq(tuple(self)[i])
+            return self._slice(start, stop)
+        node = self._root
+        i = self._index(i)
+        while not isinstance(node, _Leaf):
+            if i < node.left.size:
+                node = node.left
+            else:
+                i -= node.left.size
+                node = node.right
+        return node.items[i]
+
+    def set(self, i, x):
+        return PSeq._fromRoot(_setAt(self._root, self._index(i), x))
+
+    def append(self, x):
+        return PSeq._fromRoot(_concat(self._root, _Leaf((x,))))
+
+    def prepend(self, x):
+        return PSeq._fromRoot(_concat(_Leaf((x,)), self._root))
+
+    def join(self, other):
+        other = other if isinstance(other, PSeq) else PSeq(other)
+        return PSeq._fromRoot(_concat(self._root, other._root))
+
+    def take(self, n):
+        return self[:n] if n >= 0 else self[n:]
+
+    def drop(self, n):
+        return self[n:] if n >= 0 else self[:n]
+
+    def _slice(self, start, stop):
+        if start >= stop: return PSeq()
+        if start == 0 and stop == len(self): return self
+        return PSeq._fromRoot(_slice(self._root, start, stop))
+
+    def _index(self, i):
+        n = len(self)
+        if i < 0: i += n
+        if not 0 <= i < n: raise IndexError(f'index {i} out of range for PSeq of length {n}')
+        return i
+
+    def __add__(self, other):
+        return self.join(other)
+
+    def __eq__(self, other):
+        if not isinstance(other, (PSeq, tuple, list)): return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return f'PSeq({list(self)!r})'
+
+
+def _concat(a, b):
+    if a.size == 0: return b
+    if b.size == 0: return a
+    if isinstance(a, _Leaf) and isinstance(b, _Leaf):
+        if a.size + b.size <= _CHUNK: return _Leaf(a.items + b.items)
+        return _Branch(a, b)
+    # descend the facing spine so small pieces end up merged into the neighbouring leaf rather than hanging off the top
+    if a.height > b.height + 1 or (isinstance(b, _Leaf) and isinstance(a, _Branch)):
+        return _balance(a.left, _concat(a.right, b))
+    if b.height > a.height + 1 or (isinstance(a, _Leaf) and isinstance(b, _Branch)):
+        return _balance(_concat(a, b.left), b.right)
+    return _Branch(a, b)
+
+
+def _balance(l, r):
+    # l and r differ in height by at most 2 - single or double AVL rotation as needed
+    if l.height > r.height + 1:
+        if l.left.height >= l.right.height:
+            return _Branch(l.left, _Branch(l.right, r))
+        return _Branch(_Branch(l.left, l.right.left), _Branch(l.right.right, r))
+    if r.height > l.height + 1:
+        if r.right.height >= r.left.height:
+            return _Branch(_Branch(l, r.left), r.right)
+        return _Branch(_Branch(l, r.left.left), _Branch(r.left.right, r.right))
+    return _Branch(l, r)
+
+
+def _slice(node, start, stop):
+    if start == 0 and stop == node.size: return node
+    if isinstance(node, _Leaf): return _Leaf(node.items[start:stop])
+    mid = node.left.size
+    if stop <= mid: return _slice(node.left, start, stop)
+    if start >= mid: return _slice(node.right, start - mid, stop - mid)
+    return _concat(_slice(node.left, start, mid), _slice(node.right, 0, stop - mid))
+
+
+def _setAt(node, i, x):
+    if isinstance(node, _Leaf): return _Leaf(node.items[:i] + (x,) + node.items[i + 1:])
+    if i < node.left.size: return _Branch(_setAt(node.left, i, x), node.right)
+    return _Branch(node.left, _setAt(node.right, i - node.left.size, x))
+
+
+# **********************************************************************************************************************
+# PMap
+# **********************************************************************************************************************
+
+class _Entry:
+    __slots__ = ['h', 'key', 'value', 'seq']
+    def __init__(self, h, key, value, seq):
+        self.h = h
+        self.key = key
+        self.value = value
+        self.seq = seq                      # insertion order
+
+
+class _BitmapNode:
+    __slots__ = ['bitmap', 'array']
+    def __init__(self, bitmap, array):
+        self.bitmap = bitmap
+        self.array = array                  # a tuple of _Entry or child nodes, one per set bit
+
+
+class _CollisionNode:
+    __slots__ = ['h', 'entries']
+    def __init__(self, h, entries):
+        self.h = h
+        self.entries = entries
+
+
+_EMPTY_NODE = _BitmapNode(0, ())
+
+
+class PMap:
+
+    __slots__ = ['_root', '_count', '_nextSeq']
+
+    def __init__(self, kvs=()):
+        self._root, self._count, self._nextSeq = _EMPTY_NODE, 0, 0
+        if isinstance(kvs, PMap):
+            self._root, self._count, self._nextSeq = kvs._root, kvs._count, kvs._nextSeq
+            return
+        for k, v in (kvs.items() if hasattr(kvs, 'items') else kvs):
+            self._root, added = _assoc(self._root, 0, _hash(k), k, v, self._nextSeq)
+            if added:
+                self._count += 1
+                self._nextSeq += 1
+
+    @classmethod
+    def _fromParts(cls, root, count, nextSeq):
+        answer = cls.__new__(cls)
+        answer._root, answer._count, answer._nextSeq = root, count, nextSeq
+        return answer
+
+    def get(self, key, default=Missing):
+        h = _hash(key)
+        node, shift = self._root, 0
+        while True:
+            if isinstance(node, _CollisionNode):
+                for e in node.entries:
+                    if e.key == key: return e.value
+                return default
+            bit = 1 << ((h >> shift) & _MASK)
+            if not node.bitmap & bit: return default
+            child = node.array[_popcount(node.bitmap & (bit - 1))]
+            if isinstance(child, _Entry):
+                return child.value if child.h == h and child.key == key else default
+            node, shift = child, shift + _BITS
+
+    def set(self, key, value):
+        root, added = _assoc(self._root, 0, _hash(key), key, value, self._nextSeq)
+        if added: return PMap._fromParts(root, self._count + 1, self._nextSeq + 1)
+        return PMap._fromParts(root, self._count, self._nextSeq)
+
+    def update(self, kvs):
+        answer = self
+        for k, v in (kvs.items() if hasattr(kvs, 'items') else kvs):
+            answer = answer.set(k, v)
+        return answer
+
+    def without(self, key):
+        root, removed = _dissoc(self._root, 0, _hash(key), key)
+        if not removed: return self
+        if root is Missing: root = _EMPTY_NODE
+        elif isinstance(root, _Entry): root = _BitmapNode(1 << (root.h & _MASK), (root,))
+        return PMap._fromParts(root, self._count - 1, self._nextSeq)
+
+    def __getitem__(self, key):
+        if (v := self.get(key)) is Missing: raise KeyError(key)
+        return v
+
+    def __contains__(self, key):
+        return self.get(key) is not Missing
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return (e.key for e in self._entries())
+
+    def keys(self):
+        return [e.key for e in self._entries()]
+
+    def values(self):
+        return [e.value for e in self._entries()]
+
+    def items(self):
+        return [(e.key, e.value) for e in self._entries()]
+
+    def _entries(self):
+        entries = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, _CollisionNode):
+                entries.extend(node.entries)
+            else:
+                for child in node.array:
+                    if isinstance(child, _Entry): entries.append(child)
+                    else: stack.append(child)
+        entries.sort(key=lambda e: e.seq)
+        return entries
+
+    def __eq__(self, other):
+        if not isinstance(other, (PMap, dict)): return NotImplemented
+        return len(self) == len(other) and all(other.get(k, Missing) == v for k, v in self.items())
+
+    def __hash__(self):
+        return hash(frozenset(self.items()))
+
+    def __repr__(self):
+        return f'PMap({dict(self.items())!r})'
+
+
+def _hash(key):
+    return hash(key) & _HASH_MASK
+
+
+def _popcount(x):
+    return bin(x).count('1')
+
+
+def _assoc(node, shift, h, key, value, seq):
+    # answers (node, added)
+    if isinstance(node, _CollisionNode):
+        if h == node.h:
+            for i, e in enumerate(node.entries):
+                if e.key == key:
+                    entries = node.entries[:i] + (_Entry(h, key, value, e.seq),) + node.entries[i + 1:]
+                    return _CollisionNode(h, entries), False
+            return _CollisionNode(h, node.entries + (_Entry(h, key, value, seq),)), True
+        node = _BitmapNode(1 << ((node.h >> shift) & _MASK), (node,))
+    bit = 1 << ((h >> shift) & _MASK)
+    i = _popcount(node.bitmap & (bit - 1))
+    array = node.array
+    if not node.bitmap & bit:
+        return _BitmapNode(node.bitmap | bit, array[:i] + (_Entry(h, key, value, seq),) + array[i:]), True
+    child = array[i]
+    if isinstance(child, _Entry):
+        if child.h == h and child.key == key:
+            if child.value is value: return node, False
+            newChild, added = _Entry(h, key, value, child.seq), False
+        else:
+            newChild, added = _pair(shift + _BITS, child, _Entry(h, key, value, seq)), True
+    else:
+        newChild, added = _assoc(child, shift + _BITS, h, key, value, seq)
+    return _BitmapNode(node.bitmap, array[:i] + (newChild,) + array[i + 1:]), added
+
+
+def _pair(shift, e1, e2):
+    if e1.h == e2.h: return _CollisionNode(e1.h, (e1, e2))
+    b1, b2 = (e1.h >> shift) & _MASK, (e2.h >> shift) & _MASK
+    if b1 == b2: return _BitmapNode(1 << b1, (_pair(shift + _BITS, e1, e2),))
+    return _BitmapNode((1 << b1) | (1 << b2), (e1, e2) if b1 < b2 else (e2, e1))
+
+
+def _dissoc(node, shift, h, key):
+    # answers (node, removed) where node may be Missing if empty or a lone _Entry to be pulled up into the parent
+    if isinstance(node, _CollisionNode):
+        entries = tuple(e for e in node.entries if e.key != key)
+        if len(entries) == len(node.entries): return node, False
+        return (entries[0] if len(entries) == 1 else _CollisionNode(h, entries)), True
+    bit = 1 << ((h >> shift) & _MASK)
+    if not node.bitmap & bit: return node, False
+    i = _popcount(node.bitmap & (bit - 1))
+    array = node.array
+    child = array[i]
+    if isinstance(child, _Entry):
+        if not (child.h == h and child.key == key): return node, False
+        newChild = Missing
+    else:
+        newChild, removed = _dissoc(child, shift + _BITS, h, key)
+        if not removed: return node, False
+    if newChild is Missing:
+        if len(array) == 1: return Missing, True
+        array = array[:i] + array[i + 1:]
+        if len(array) == 1 and isinstance(array[0], _Entry) and shift > 0: return array[0], True
+        return _BitmapNode(node.bitmap & ~bit, array), True
+    if len(array) == 1 and isinstance(newChild, _Entry) and shift > 0: return newChild, True
+    return _BitmapNode(node.bitmap, array[:i] + (newChild,) + array[i + 1:]), True
+
+
+# **********************************************************************************************************************
+# typed values
+# **********************************************************************************************************************
+
+class ptup:
+
+    __slots__ = ['_t', '_v']
+
+    def __init__(self, t, xs):
+        self._t = t
+        self._v = xs if isinstance(xs, PSeq) else PSeq(xs)
+
+    def __len__(self):
+        return len(self._v)
+
+    def __iter__(self):
+        return iter(self._v)
+
+    def __getitem__(self, i):
+        return self._v[i]
+
+    def __eq__(self, other):
+        if not isinstance(other, ptup): return NotImplemented
+        return self._v == other._v
+
+    def __hash__(self):
+        return hash(self._v)
+
+    def __repr__(self):
+        return f'({", ".join(repr(x) for x in self._v)})'
+
+
+class pstruct:
+
+    __slots__ = ['_t', '_m']
+
+    def __init__(self, t, kvs):
+        self._t = t
+        self._m = kvs if isinstance(kvs, PMap) else PMap(kvs)
+
+    def _kvs(self):
+        return self._m.items()
+
+    def _update(self, kvs, t=Missing):
+        # answers a new struct sharing structure with this one
+        return pstruct(self._t if t is Missing else t, self._m.update(kvs))
+
+    def __getattr__(self, name):
+        # only called for names that aren't slots - _m can be unset, e.g. while copy or pickle probe a new instance
+        try:
+            m = object.__getattribute__(self, '_m')
+        except AttributeError:
+            raise AttributeError(name) from None
+        if (v := m.get(name)) is Missing: raise AttributeError(name)
+        return v
+
+    def __reduce__(self):
+        return (pstruct, (self._t, self._m))
+
+    def __getitem__(self, name):
+        return self._m[name]
+
+    def __contains__(self, name):
+        return name in self._m
+
+    def __len__(self):
+        return len(self._m)
+
+    def __eq__(self, other):
+        if not isinstance(other, pstruct): return NotImplemented
+        return self._m == other._m
+
+    def __hash__(self):
+        return hash(self._m)
+
+    def __repr__(self):
+        return f'({", ".join(f"{k}={v!r}" for k, v in self._m.items())})'
+
+
+def littupCons(t, vs):
+    return ptup(t, vs)
+
+
+def litstructCons(t, kvs):
+    return pstruct(t, kvs)
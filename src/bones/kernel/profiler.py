@@ -0,0 +1,118 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# PACE phase timings and per tc node timings
+#
+#   prof = k.startProfiling()
+#   k.pace(src)
+#   k.stopProfiling()
+#   prof.report() >> PP
+#   prof.writeCollapsed('bones.folded')        # e.g. flamegraph.pl bones.folded > bones.svg
+
+from time import perf_counter
+
+from bones.core.sentinels import Missing
+from bones.kernel.tc import tcapply, tcbindval, tcgetval, tcgetfamily
+from bones.kernel.tc_interpreter import TcHooks
+
+
+PHASES = ('lex', 'group', 'phrase', 'analyse', 'execute')
+
+
+class NodeStats:
+    __slots__ = ['id', 'label', 'srcId', 'line', 'count', 'incl', 'excl']
+    def __init__(self, id, label, srcId, line):
+        self.id = id
+        self.label = label
+        self.srcId = srcId
+        self.line = line
+        self.count = 0
+        self.incl = 0.0
+        self.excl = 0.0
+
+
+class Profiler:
+
+    def __init__(self, nodes=True):
+        self.nodes = nodes
+        self.phaseTimes = dict.fromkeys(PHASES, 0.0)
+        self.phaseCounts = dict.fromkeys(PHASES, 0)
+        self.statsById = {}
+        self.timeByStack = {}       # (label, label, ...) -> exclusive time
+
+    def notePhase(self, phase, t1):
+        # answers the current time so calls can be chained through the phases of pace
+        t2 = perf_counter()
+        self.phaseTimes[phase] += t2 - t1
+        self.phaseCounts[phase] += 1
+        return t2
+
+    def statsFor(self, n):
+        stats = self.statsById.get(n.id, Missing)
+        if stats is Missing:
+            tok1 = n.tok1
+            srcId, line = (Missing, Missing) if tok1 is Missing or tok1 is None else (tok1.srcId, tok1.l1)
+            self.statsById[n.id] = stats = NodeStats(n.id, _labelFor(n), srcId, line)
+        return stats
+
+    def report(self, sortBy='excl', limit=30):
+        lines = ['phase        count      time (s)']
+        for phase in PHASES:
+            lines.append(f'{phase:<10} {self.phaseCounts[phase]:>7} {self.phaseTimes[phase]:>13.6f}')
+        if self.statsById:
+            lines.append('')
+            lines.append(f'{"node":>6} {"line":>5} {"count":>9} {"incl (s)":>12} {"excl (s)":>12}  label')
+            allStats = sorted(self.statsById.values(), key=lambda s: getattr(s, sortBy), reverse=sortBy != 'line')
+            for s in allStats[:limit]:
+                line = '' if s.line is Missing else s.line
+                lines.append(f'{s.id:>6} {line:>5} {s.count:>9} {s.incl:>12.6f} {s.excl:>12.6f}  {s.label}')
+        return '\n'.join(lines)
+
+    def collapsedStacks(self):
+        # one line per stack in the format used by flamegraph.pl / speedscope, counts are in microseconds
+        return [f'{";".join(stack)} {round(t * 1_000_000)}' for stack, t in self.timeByStack.items() if t > 0]
+
+    def writeCollapsed(self, path):
+        with open(path, 'w') as f:
+            for line in self.collapsedStacks():
+                f.write(line + '\n')
+
+
+class ProfilingHooks(TcHooks):
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self._stack = []            # [stats, childTime, t1] per node being executed
+        self._labels = []
+
+    def onEnterNode(self, n):
+        stats = self.profiler.statsFor(n)
+        self._labels.append(stats.label if stats.line is Missing else f'{stats.label} @{stats.line}')
+        self._stack.append([stats, 0.0, perf_counter()])
+
+    def onExitNode(self, n, answer):
+        stats, childTime, t1 = self._stack.pop()
+        incl = perf_counter() - t1
+        excl = incl - childTime
+        stats.count += 1
+        stats.incl += incl
+        stats.excl += excl
+        stack = tuple(self._labels)
+        self.profiler.timeByStack[stack] = self.profiler.timeByStack.get(stack, 0.0) + excl
+        self._labels.pop()
+        if self._stack: self._stack[-1][1] += incl
+
+
+def _labelFor(n):
+    name = type(n).__name__
+    if isinstance(n, tcapply):
+        return f'{name} {getattr(n.fnnode, "name", "")}'
+    if isinstance(n, (tcbindval, tcgetval, tcgetfamily)):
+        return f'{name} {n.name}'
+    return name
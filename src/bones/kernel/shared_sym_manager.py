@@ -0,0 +1,187 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# A symbol universe held in shared memory so that every process in a pool agrees on the id of each string. Syms can
+# then be compared, hashed and shipped between workers as plain u32 ids (e.g. a column of syms is just a buffer of ids).
+#
+# segment layout (all little endian)
+#   header      - magic, maxSyms, tableSize, heapSize, count, heapUsed
+#   offsets     - (maxSyms + 1) x u64 byte offset of each string in the heap, indexed by id
+#   table       - tableSize x u32 open addressing hash table of id + 1 (0 is empty), linear probing
+#   heap        - utf-8 encoded strings
+#
+# writers serialise on a multiprocessing lock and append only - the string bytes, then its offset, then the table slot,
+# and lastly count is published. readers take no lock - a table slot is only ever written once, after the bytes it
+# refers to, so a reader that finds a slot can safely read the string. count is only needed to bound iteration.
+# capacity is fixed at creation - resizing would mean remapping the segment in every attached process.
+#
+#   ssm = SharedSymManager.create(multiprocessing.Lock())        # in the parent, then pickle it to each worker
+#   k = BonesKernel(..., symbolManager=ssm)
+
+import struct, zlib, array, weakref
+from multiprocessing import shared_memory
+
+from bones.core.sentinels import Missing
+from bones.core.errors import ProgrammerError
+from bones.kernel.sym_manager import Sym
+
+
+_MAGIC = 0x4253484D        # 'BSHM'
+_HEADER = struct.Struct('<IIIQQQ')
+_COUNT_OFFSET = 4 + 4 + 4 + 8
+_HEAP_USED_OFFSET = _COUNT_OFFSET + 8
+_U64 = struct.Struct('<Q')
+
+
+class SharedSymManager:
+
+    __slots__ = ['_shm', '_lock', '_owner', '_maxSyms', '_tableSize', '_heapSize', '_offsets', '_table', '_heapStart', '_symById', '_idByString', '_strings', '_release', '__weakref__']
+
+    def __init__(self, shm, lock, owner):
+        magic, maxSyms, tableSize, heapSize, count, heapUsed = _HEADER.unpack_from(shm.buf, 0)
+        if magic != _MAGIC: raise ProgrammerError(f'{shm.name} is not a bones shared symbol segment')
+        self._shm = shm
+        self._lock = lock
+        self._owner = owner
+        self._maxSyms = maxSyms
+        self._tableSize = tableSize
+        self._heapSize = heapSize
+        start = _HEADER.size
+        self._offsets = shm.buf[start:start + (maxSyms + 1) * 8].cast('Q')
+        start += (maxSyms + 1) * 8
+        self._table = shm.buf[start:start + tableSize * 4].cast('I')
+        start += tableSize * 4
+        self._heapStart = start
+        self._symById = {}                  # per process so that Sym identity (and hence equality) holds locally
+        self._idByString = {}
+        self._strings = _SharedStrings(self)
+        # the views must be released before the segment is closed - on close, collection or exit, whichever is first
+        self._release = weakref.finalize(self, _release, self._offsets, self._table, shm, owner)
+
+    @classmethod
+    def create(cls, lock, maxSyms=1 << 20, heapSize=1 << 24, name=None):
+        tableSize = 1
+        while tableSize < maxSyms * 2: tableSize <<= 1
+        size = _HEADER.size + (maxSyms + 1) * 8 + tableSize * 4 + heapSize
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _HEADER.pack_into(shm.buf, 0, _MAGIC, maxSyms, tableSize, heapSize, 0, 0)
+        return cls(shm, lock, True)
+
+    @classmethod
+    def attach(cls, name, lock):
+        return cls(shared_memory.SharedMemory(name=name), lock, False)
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def __reduce__(self):
+        # the lock can only be pickled when spawning a process, e.g. as a Pool initializer arg
+        return (SharedSymManager.attach, (self._shm.name, self._lock))
+
+    def __len__(self):
+        return _U64.unpack_from(self._shm.buf, _COUNT_OFFSET)[0]
+
+    def Sym(self, string):
+        id = self._idByString.get(string, Missing)
+        if id is Missing:
+            encoded = string.encode('utf-8')
+            h = zlib.crc32(encoded)                 # must be stable across processes so not hash()
+            id = self._find(encoded, h)
+            if id < 0:
+                with self._lock:
+                    id = self._find(encoded, h)
+                    if id < 0: id = self._append(encoded, h)
+            self._idByString[string] = id
+        return self.symForId(id)
+
+    def symForId(self, id):
+        sym = self._symById.get(id, Missing)
+        if sym is Missing:
+            self._symById[id] = sym = Sym(id, self)
+        return sym
+
+    def idsForSyms(self, syms):
+        # a column of syms as a u32 buffer that can be handed to another process (or copied into shared memory)
+        return array.array('I', [sym._id for sym in syms])
+
+    def symsForIds(self, ids):
+        # ids can be any u32 buffer, e.g. a memoryview over another shared memory block, so no copy is needed to read it
+        return [self.symForId(id) for id in ids]
+
+    def _bytesAt(self, id):
+        offsets, start = self._offsets, self._heapStart
+        return bytes(self._shm.buf[start + offsets[id]:start + offsets[id + 1]])
+
+    def _find(self, encoded, h):
+        table, mask = self._table, self._tableSize - 1
+        i = h & mask
+        while (slot := table[i]) != 0:
+            if self._bytesAt(slot - 1) == encoded: return slot - 1
+            i = (i + 1) & mask
+        return -1
+
+    def _append(self, encoded, h):
+        # caller holds the lock
+        buf = self._shm.buf
+        id = _U64.unpack_from(buf, _COUNT_OFFSET)[0]
+        heapUsed = _U64.unpack_from(buf, _HEAP_USED_OFFSET)[0]
+        if id >= self._maxSyms: raise ProgrammerError(f'Shared symbol table is full ({self._maxSyms} syms)')
+        if heapUsed + len(encoded) > self._heapSize: raise ProgrammerError(f'Shared symbol heap is full ({self._heapSize} bytes)')
+        start = self._heapStart + heapUsed
+        buf[start:start + len(encoded)] = encoded
+        self._offsets[id] = heapUsed
+        self._offsets[id + 1] = heapUsed + len(encoded)
+        _U64.pack_into(buf, _HEAP_USED_OFFSET, heapUsed + len(encoded))
+        table, mask = self._table, self._tableSize - 1
+        i = h & mask
+        while table[i] != 0: i = (i + 1) & mask
+        table[i] = id + 1
+        _U64.pack_into(buf, _COUNT_OFFSET, id + 1)     # publish last
+        return id
+
+    def _lt(self, a, b):
+        return self._strings[a._id] < self._strings[b._id]
+    def _gt(self, a, b):
+        return self._strings[a._id] > self._strings[b._id]
+    def _le(self, a, b):
+        return self._strings[a._id] <= self._strings[b._id]
+    def _ge(self, a, b):
+        return self._strings[a._id] >= self._strings[b._id]
+    def _cmp(self, a, b):
+        if a is b:
+            return 0
+        if self._strings[a._id] < self._strings[b._id]:
+            return -1
+        return 1
+
+    def close(self):
+        self._release()
+
+
+def _release(offsets, table, shm, owner):
+    offsets.release()
+    table.release()
+    shm.close()
+    if owner: shm.unlink()
+
+
+class _SharedStrings:
+    # list like view of the strings so Sym.__repr__ and __str__ work unchanged
+    __slots__ = ['_sm', '_cache']
+    def __init__(self, sm):
+        self._sm = sm
+        self._cache = {}
+    def __getitem__(self, id):
+        string = self._cache.get(id, Missing)
+        if string is Missing:
+            self._cache[id] = string = self._sm._bytesAt(id).decode('utf-8')
+        return string
+    def __len__(self):
+        return len(self._sm)
@@ -27,6 +27,8 @@ class bframe:
         self.symtab = symtab
         self.parent = parent
         self.values = {}
+        self.ctx = Missing          # the contextual scope - set by PythonStorageManager.pushFrame for fn frames
+        self.spec = Missing         # the specialisation of the fn running in it, if any - see monomorph
 
     def __setitem__(self, key, value):
         self.values[key] = value
@@ -45,31 +47,64 @@ class bframe:
         return f'bframe: [{self.depth}]{self.symtab.path}'
 
 
-class blockframe:
-    def __init__(self, symtab, parentFrame, argnames, lexicalParent):
-        self.symtab = symtab
-        self.parent = parentFrame
-        self.lexicalParent = lexicalParent
-        self.values = {}
+class bblockframe:
+    # a call of a block - its args are held here and every other name is the enclosing frame's (a block shares its fn's
+    # frame, see blockSymTab), so concurrent calls of a block, e.g. from several threads, each see their own args. It
+    # stands in for its own values dict so PythonStorageManager can treat it as any other frame
+    __slots__ = ['frame', 'args']
+
+    def __init__(self, frame, names, args):
+        self.frame = frame
+        self.args = dict(zip(names, args))
+
+    @property
+    def values(self):
+        return self
+
+    @property
+    def symtab(self):
+        return self.frame.symtab
+
+    @property
+    def parent(self):
+        return self.frame.parent
+
+    @property
+    def ctx(self):
+        return self.frame.ctx
+
+    @ctx.setter
+    def ctx(self, ctx):
+        self.frame.ctx = ctx            # _.name: x in a block updates the context of the fn it's in
+
+    @property
+    def spec(self):
+        return self.frame.spec
 
     def __setitem__(self, key, value):
-        if key in self.values:
-            raise RuntimeError(f'Not allowed to rebind argument {key} in block {self.symtab.path}')
-        if key not in self.lexicalParent.values:
-            raise RuntimeError(f'Not allowed to bind new name "{key}" in parent {self.parent.symtab.path}')
-        self.parent.values[key] = value
+        if key in self.args:
+            self.args[key] = value
+        else:
+            self.frame.values[key] = value
 
     def __getitem__(self, key):
-        if (v := self.values.get(key, Missing)) is Missing:
-            v = self.parent.values[key]
-        return v
+        args = self.args
+        return args[key] if key in args else self.frame.values[key]
 
     def __contains__(self, key):
-        return key in self.values
+        return key in self.args or key in self.frame.values
+
+    def get(self, key, default=None):
+        args = self.args
+        return args[key] if key in args else self.frame.values.get(key, default)
+
+    def pop(self, key, default=None):
+        args = self.args
+        return args.pop(key) if key in args else self.frame.values.pop(key, default)
 
     @property
     def depth(self):
-        return self.parent.depth + 1 if self.parent else 1
+        return self.frame.depth
 
     def __repr__(self):
-        return f'bframe: [{self.depth}]{self.symtab.path}'
\ No newline at end of file
+        return f'bblockframe: [{self.depth}]{self.symtab.path}'
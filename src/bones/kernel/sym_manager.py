@@ -7,7 +7,14 @@
 # License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
 # **********************************************************************************************************************
 
+import mmap, struct, os
 from bones.core.sentinels import Missing
+from bones.core.errors import ProgrammerError
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = Missing             # not POSIX - processes appending to the same snapshot must take turns themselves
 
 
 class Sym:
@@ -46,12 +53,22 @@ class SymManager:
         self._isSorted = False
         self._sortOrder = []
         self._toBeSorted = []
+        self._snap = Missing            # set when the manager is backed by a memory mapped snapshot
+        self._symById = Missing
+        self._numPersisted = 0          # number of syms already in the snapshot file (base + delta)
 
     def Sym(self, string):
         # if it exists return it
         sym = self._symByString.get(string, Missing)
         if sym is not Missing: return sym
 
+        # if it's in the snapshot materialise it (the snapshot holds the sorted order so this is a binary search)
+        if self._snap is not Missing:
+            id = self._snap.find(string)
+            if id >= 0:
+                self._symByString[string] = sym = self._symById[id] = Sym(id, self)
+                return sym
+
         # if it doesn't exist create it, add to the toBeSortedCollection and return it
         sym = Sym(len(self._strings), self)
         self._symByString[string] = sym
@@ -61,6 +78,8 @@ class SymManager:
         return sym
 
     def _sort(self):
+        if self._snap is not Missing:
+            return self._sortWithSnapshot()
         # I can come up with faster ways of doing this for my needs at the moment we'll just do it the easy way
         # e.g. sort the _toBeSorted then merge the two lists, could investigate how to sort large sets of strings
         # e.g. timsort, radix sort, etc
@@ -74,6 +93,22 @@ class SymManager:
         self._toBeSorted = []
         self._isSorted = True
 
+    def _sortWithSnapshot(self):
+        # the base syms are already sorted in the snapshot so we only need to slot the others in between them - see
+        # _SnapshotSortOrder for the ordering key
+        strings = self._strings
+        self._syms.extend(self._toBeSorted)
+        self._toBeSorted = []
+        others = sorted(self._syms, key=lambda x:strings[x._id])
+        rankById, priorGap, rank = {}, -1, 0
+        for sym in others:
+            gap = self._snap.insertionPoint(strings[sym._id])
+            rank = rank + 1 if gap == priorGap else 0
+            rankById[sym._id] = (gap, rank)
+            priorGap = gap
+        self._sortOrder = _SnapshotSortOrder(self._snap, rankById, len(others) + 1)
+        self._isSorted = True
+
     def _lt(self, a, b):
         if not self._isSorted: self._sort()
         return self._sortOrder[a._id] < self._sortOrder[b._id]
@@ -92,3 +127,216 @@ class SymManager:
         if self._sortOrder[a._id] < self._sortOrder[b._id]:
             return -1
         return 1
+
+
+    # snapshots
+    # a snapshot holds the strings, ids and sort order of a symbol universe so that a kernel (or a pool of workers) can
+    # memory map it on startup rather than re-interning every symbol. syms added after a snapshot is taken can be
+    # appended to the file's delta region (appendDelta), they are read eagerly on load and sorted in memory - save
+    # periodically to fold the delta back into the sorted base.
+
+    def save(self, path):
+        strings = [self._strings[id] for id in range(len(self._strings))]
+        _writeSnapshot(path, strings)
+        # a copy saved elsewhere leaves what's still to be appended to the mapped file unchanged
+        if self._snap is not Missing and os.path.realpath(path) == self._snap.path:
+            self._numPersisted = len(strings)
+            self._remap(path)
+
+    def _remap(self, path):
+        # the file we had mapped has been replaced by one holding every sym as base, ids unchanged, so map that instead
+        old, snap = self._snap, _Snapshot(path)
+        for sym in self._syms + self._toBeSorted:
+            self._symById[sym._id] = sym
+        self._snap = snap
+        self._strings = _SnapshotStrings(snap)
+        self._syms, self._toBeSorted = [], []
+        self._sortOrder = _SnapshotSortOrder(snap, {}, 1)
+        self._isSorted = True
+        old.close()
+
+    @classmethod
+    def fromSnapshot(cls, path):
+        sm = cls()
+        snap = _Snapshot(path)
+        sm._snap = snap
+        sm._symById = {}
+        sm._strings = _SnapshotStrings(snap)
+        sm._sortOrder = _SnapshotSortOrder(snap, {}, 1)
+        sm._isSorted = True
+        for string in snap.readDelta():
+            sm.Sym(string)
+        sm._numPersisted = len(sm._strings)
+        return sm
+
+    def appendDelta(self, path):
+        # append the syms created since the snapshot was loaded (or last appended to) to the file's delta region
+        if self._snap is Missing or os.path.realpath(path) != self._snap.path: raise ProgrammerError('Can only append to the snapshot this SymManager was loaded from')
+        strings = [self._strings[id] for id in range(self._numPersisted, len(self._strings))]
+        _appendDelta(path, strings)
+        self._numPersisted += len(strings)
+
+    def close(self):
+        if self._snap is not Missing:
+            # materialise everything we might still need before unmapping
+            self._strings = [self._strings[id] for id in range(len(self._strings))]
+            if not self._isSorted: self._sort()
+            self._sortOrder = [self._sortOrder[id] for id in range(len(self._strings))]
+            self._syms = [self._symById.get(id) or self._symByString.get(self._strings[id]) or Sym(id, self) for id in range(len(self._strings))]
+            for sym in self._syms:
+                self._symByString.setdefault(self._strings[sym._id], sym)
+            self._snap.close()
+            self._snap = Missing
+            self._symById = Missing
+
+
+
+# **********************************************************************************************************************
+# snapshot file format (all little endian)
+#   header      - magic, version, numBase, numDelta, heapSize
+#   offsets     - (numBase + 1) x u64 byte offset of each string in the heap, indexed by id
+#   sortedIds   - numBase x u32 ids in sort order
+#   positions   - numBase x u32 sort position of each id
+#   heap        - utf-8 encoded strings
+#   delta       - numDelta x {u32 length, utf-8 bytes} - appended in id order
+# utf-8 preserves code point order so the binary search can compare the encoded bytes directly
+# **********************************************************************************************************************
+
+_MAGIC = b'BSYM'
+_VERSION = 1
+_HEADER = struct.Struct('<4sIQQQ')      # magic, version, numBase, numDelta, heapSize
+_DELTA_LEN = struct.Struct('<I')
+
+
+def _writeSnapshot(path, strings):
+    encoded = [s.encode('utf-8') for s in strings]
+    numBase = len(encoded)
+    sortedIds = sorted(range(numBase), key=encoded.__getitem__)
+    positions = [0] * numBase
+    for position, id in enumerate(sortedIds):
+        positions[id] = position
+    offsets, offset = [], 0
+    for e in encoded:
+        offsets.append(offset)
+        offset += len(e)
+    offsets.append(offset)
+    # written aside and moved into place so a snapshot that is memory mapped (possibly by other processes) is never
+    # truncated under them - they keep the old file until they remap
+    tmp = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp, 'wb') as f:
+            f.write(_HEADER.pack(_MAGIC, _VERSION, numBase, 0, offset))
+            f.write(struct.pack(f'<{numBase + 1}Q', *offsets))
+            f.write(struct.pack(f'<{numBase}I', *sortedIds))
+            f.write(struct.pack(f'<{numBase}I', *positions))
+            f.write(b''.join(encoded))
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp): os.remove(tmp)
+        raise
+
+def _appendDelta(path, strings):
+    with open(path, 'r+b') as f:
+        # the header is read, updated and written back so other appenders are held off until the file is closed
+        if fcntl is not Missing: fcntl.flock(f, fcntl.LOCK_EX)
+        magic, version, numBase, numDelta, heapSize = _HEADER.unpack(f.read(_HEADER.size))
+        f.seek(0, os.SEEK_END)
+        for s in strings:
+            e = s.encode('utf-8')
+            f.write(_DELTA_LEN.pack(len(e)))
+            f.write(e)
+        f.seek(0)
+        f.write(_HEADER.pack(magic, version, numBase, numDelta + len(strings), heapSize))
+
+
+class _Snapshot:
+    __slots__ = ('path', '_f', '_mm', 'numBase', 'numDelta', '_offsets', '_sortedIds', '_positions', '_heap', '_deltaStart')
+
+    def __init__(self, path):
+        self.path = os.path.realpath(path)
+        self._f = open(path, 'rb')
+        self._mm = mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.numBase, self.numDelta, heapSize = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC or version != _VERSION: raise ProgrammerError(f'{path} is not a bones symbol snapshot')
+        n = self.numBase
+        view = memoryview(mm)
+        start = _HEADER.size
+        self._offsets = view[start:start + (n + 1) * 8].cast('Q')
+        start += (n + 1) * 8
+        self._sortedIds = view[start:start + n * 4].cast('I')
+        start += n * 4
+        self._positions = view[start:start + n * 4].cast('I')
+        start += n * 4
+        self._heap = start
+        self._deltaStart = start + heapSize
+
+    def bytesAt(self, id):
+        offsets = self._offsets
+        return self._mm[self._heap + offsets[id]:self._heap + offsets[id + 1]]
+
+    def string(self, id):
+        return self.bytesAt(id).decode('utf-8')
+
+    def position(self, id):
+        return self._positions[id]
+
+    def insertionPoint(self, string):
+        # number of base strings strictly less than string
+        target, sortedIds, lo, hi = string.encode('utf-8'), self._sortedIds, 0, self.numBase
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.bytesAt(sortedIds[mid]) < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, string):
+        i = self.insertionPoint(string)
+        if i < self.numBase and self.bytesAt(id := self._sortedIds[i]) == string.encode('utf-8'):
+            return id
+        return -1
+
+    def readDelta(self):
+        mm, pos, strings = self._mm, self._deltaStart, []
+        for _ in range(self.numDelta):
+            (n,) = _DELTA_LEN.unpack_from(mm, pos)
+            pos += _DELTA_LEN.size
+            strings.append(mm[pos:pos + n].decode('utf-8'))
+            pos += n
+        return strings
+
+    def close(self):
+        self._offsets.release(); self._sortedIds.release(); self._positions.release()
+        self._mm.close()
+        self._f.close()
+
+
+class _SnapshotStrings:
+    # list like view of the strings - ids below numBase come from the snapshot, the rest are held in memory
+    __slots__ = ('_snap', '_others')
+    def __init__(self, snap):
+        self._snap = snap
+        self._others = []
+    def __getitem__(self, id):
+        n = self._snap.numBase
+        return self._snap.string(id) if id < n else self._others[id - n]
+    def __len__(self):
+        return self._snap.numBase + len(self._others)
+    def append(self, string):
+        self._others.append(string)
+
+
+class _SnapshotSortOrder:
+    # sort key by id without materialising a position for every base sym - base position p maps to (2p + 1) * k and a
+    # sym inserted in the gap before base position g with rank r (amongst the other syms in that gap) maps to 2g * k + r
+    __slots__ = ('_snap', '_rankById', '_k')
+    def __init__(self, snap, rankById, k):
+        self._snap = snap
+        self._rankById = rankById
+        self._k = k
+    def __getitem__(self, id):
+        if id < self._snap.numBase:
+            return (2 * self._snap.position(id) + 1) * self._k
+        gap, rank = self._rankById[id]
+        return 2 * gap * self._k + rank
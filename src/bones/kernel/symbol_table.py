@@ -211,7 +211,7 @@ class SymbolTable:
         elif scope == MODULE_SCOPE:
             raise NotYetImplemented()
         elif scope == CONTEXT_SCOPE:
-            raise NotYetImplemented()
+            return self.kernel.contextualScopeManager.vMetaFor(name)
         elif scope == GLOBAL_SCOPE:
             m = self._globalSymTab.vMetaForGet(name, LOCAL_SCOPE)
             return m
@@ -227,7 +227,7 @@ class SymbolTable:
                 m = self._moduleSymTab.fMetaForGet(name, LOCAL_SCOPE)
             return m
         elif scope == CONTEXT_SCOPE:
-            raise NotYetImplemented()
+            return Missing          # OPEN: contextual fns
         else:
             raise ProgrammerError()
 
@@ -251,7 +251,7 @@ class SymbolTable:
                 raise ProgrammerError(f'{name} has already been inferred as an argname')
             return m
         elif scope == CONTEXT_SCOPE:
-            raise NotYetImplemented()
+            return self.kernel.contextualScopeManager.vMetaFor(name)
         elif scope == GLOBAL_SCOPE:
             m = self._globalSymTab.vMetaForGet(name, LOCAL_SCOPE)
             return m
@@ -265,7 +265,7 @@ class SymbolTable:
                 m = self._fnMetaByName.get(name, Missing)
             return m
         elif scope == CONTEXT_SCOPE:
-            raise NotYetImplemented()
+            return Missing          # OPEN: contextual fns
         else:
             raise ProgrammerError()
 
@@ -288,7 +288,8 @@ class SymbolTable:
             self._newVMetaByName[name] = meta
             return meta
         elif scope == CONTEXT_SCOPE:
-            raise NotYetImplemented()
+            # context names are shared by all modules so live in the kernel's contextual scope manager
+            return self.kernel.contextualScopeManager.defVMeta(name, t, self)
         elif scope == GLOBAL_SCOPE:
             if name in self._globalSymTab._vMetaByName or name in self._globalSymTab._newVMetaByName: raise NotYetImplemented("Can't merge or redefine the types of values yet")
             meta = VMeta(t, self._globalSymTab)
@@ -325,6 +326,7 @@ class SymbolTable:
         if name in self._vMetaByName or name in self._newVMetaByName: raise BonesScopeAccessError('A name can only refer to a value or an fn')
         overload = self.getOverload(name, fn.numargs)
         overload[fn.tArgs] = fn
+        if self.kernel.specialiser is not Missing: self.kernel.specialiser.invalidate()     # selections may be stale
         return overload
 
     def getOverload(self, name, numargs):
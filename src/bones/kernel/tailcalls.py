@@ -0,0 +1,49 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Marks calls in tail position of fn bodies - the last phrase, or the value of a ^ directly in the body (not in a block
+# as that returns from wherever the block happens to be called). When such a call selects a bones fn the interpreter
+# answers a TailCall instead of making it and the calling fn loops (see tcfunc.__call__), so tail recursion runs in
+# constant python stack.
+
+from bones.core.sentinels import Missing
+from bones.kernel.tc import tcnode, tcsnippet, tcapply, tcblock, tcfunc, tcreturn, tclittup, tclitstruct
+
+
+def markTailCalls(snippet):
+    # answers the number of call sites marked
+    numMarked = 0
+    for fn in _fnsIn(snippet.nodes if isinstance(snippet, tcsnippet) else [snippet]):
+        body = fn.body
+        if not body: continue
+        for n in body:
+            if isinstance(n, tcreturn) and not n.signal and isinstance(n.vnode, tcapply):
+                n.vnode.tail = True
+                numMarked += 1
+        if isinstance(last := body[-1], tcapply):
+            last.tail = True
+            numMarked += 1
+    return numMarked
+
+
+def _fnsIn(nodes):
+    fns, seen = [], set()
+    stack = list(nodes)
+    while stack:
+        n = stack.pop()
+        if not isinstance(n, tcnode) or n.id in seen: continue
+        seen.add(n.id)
+        if isinstance(n, tcfunc): fns.append(n)
+        for attr in ('vnode', 'lhnode', 'fnode'):
+            if (child := getattr(n, attr, Missing)) is not Missing: stack.append(child)
+        if isinstance(n, tcapply): stack.extend(n.argnodes)
+        if isinstance(n, tcblock): stack.extend(n.body or ())
+        if isinstance(n, tclittup): stack.extend(n.tv._v)
+        if isinstance(n, tclitstruct): stack.extend(v for _, v in n.tv._kvs())
+    return fns
@@ -8,7 +8,7 @@
 # **********************************************************************************************************************
 
 # tcsnippet - ordered list of nodes in same context
-# tcapply, tcblock, tcfunc
+# tcapply, tcblock, tcfunc, tcreturn, tchoist, tconce
 # tccoerce
 # tcpartialcheck
 # tcbindval, tcgetval, tcbindfn, tcgetfamily, tcgetoverload
@@ -20,16 +20,18 @@
 import sys
 if hasattr(sys, '_TRACE_IMPORTS') and sys._TRACE_IMPORTS: print(__name__)
 
-import itertools, collections
+import itertools, collections, contextvars
 from bones.core.sentinels import Missing
 from bones.core.errors import ProgrammerError, NotYetImplemented, handlersByErrSiteId
 from bones.ts.metatypes import BType, BTFn, BTTuple
 from bones.lang.types import void, TBI, nullary
-from bones.kernel._core import LOCAL_SCOPE, RET_VAR_NAME
+from bones.kernel._core import LOCAL_SCOPE, RET_VAR_NAME, UNWIND, TailCall
 
 _nodeseed = itertools.count(start=1)
 
-k = Missing
+# the kernel executing in the current thread / task, for python code called from bones that needs it - nodes themselves
+# get their kernel via their symtab so that several kernels can coexist in one process
+currentKernel = contextvars.ContextVar('currentKernel', default=Missing)
 
 
 
@@ -85,12 +87,14 @@ class tcsnippet(tcnode):
 # **********************************************************************************************************************
 
 class tcapply(tcnode):
-    __slots__ = ['fnnode', 'argnodes', '_tArgs']
+    __slots__ = ['fnnode', 'argnodes', '_tArgs', 'mayMutate', 'tail']
     def __init__(self, tok1, tok2, symtab, fnnode, argnodes):
         super().__init__(tok1, tok2, symtab)
         self.fnnode = fnnode
         self.argnodes = argnodes
         self._tArgs = BTTuple(*[n.tOut for n in argnodes])
+        self.mayMutate = ()         # indices of args whose values are dead after the call (see uniqueness.py)
+        self.tail = False           # in tail position of a fn body (see tailcalls.py)
     def PPTC(self, depth, report):
         report << TcReportLine(self, depth, f'app')
         self.fnnode.PPTC(depth + 1, report)
@@ -167,14 +171,23 @@ class tcfunc(tcblock):
         self.literalstyle = literalstyle
     def __call__(self, *args, **kwargs):
         # this allows the function to be called as a normal function from Python
-        frame = k.sm.pushFrame(self.symtab)
-        for name, arg in zip(self.argnames, args):
-            k.sm.bind(frame.symtab, LOCAL_SCOPE, name, arg)
-        for n2 in self.body:
-            val = k.tcrunner.ex(n2)
-        if (ret := k.sm.getReturn(frame.symtab, LOCAL_SCOPE, RET_VAR_NAME)) is Missing: ret = val
-        k.sm.popFrame()
-        return ret
+        k = self.symtab.kernel
+        if k.sm.isSignalling(): return UNWIND       # a ^^ from an earlier call that the python caller ignored
+        fn, ctx = self, Missing
+        while True:
+            frame = k.sm.pushFrame(fn.symtab, ctx)
+            if k.specialiser is not Missing: frame.spec = k.specialiser.specFor(fn, args)
+            for name, arg in zip(fn.argnames, args):
+                k.sm.bind(frame.symtab, LOCAL_SCOPE, name, arg)
+            for n2 in fn.body:
+                val = k.tcrunner.ex(n2)
+                if val is UNWIND: break
+            # a ^ here or in a block sharing this frame leaves the answer in the frame, otherwise if unwinding it's for
+            # an outer fn (or a ^^) so answer UNWIND to the caller
+            if (ret := k.sm.getReturn(frame.symtab, LOCAL_SCOPE, RET_VAR_NAME)) is Missing: ret = val
+            k.sm.popFrame()
+            if type(ret) is not TailCall: return ret
+            fn, args, ctx = ret.fn, ret.args, frame.ctx        # a tail call keeps any _.name: updates made so far
     def ppSig(self):
         nameTs = [f'{name}:{t}' for name, t in zip(self.argnames, self.tArgs)]
         return f'[{", ".join(nameTs)}] -> {self.tOut}'
@@ -183,6 +196,50 @@ class tcfunc(tcblock):
 class tcassumedfunc(tcfunc): pass
 
 
+class tcreturn(tcnode):
+    # ^ v answers v from the enclosing fn (from inside a block too), ^^ v signals v up to the pace
+    __slots__ = ['vnode', 'signal']
+    def __init__(self, tok1, tok2, symtab, vnode, signal):
+        super().__init__(tok1, tok2, symtab)
+        self.vnode = vnode
+        self.signal = signal
+        self.tOut = vnode.tOut
+    def PPTC(self, depth, report):
+        report << TcReportLine(self, depth, '^^' if self.signal else '^')
+        self.vnode.PPTC(depth + 1, report)
+    def __repr__(self):
+        return f'tcreturn: {"^^" if self.signal else "^"} {self.vnode}'
+
+
+class tchoist(tcnode):
+    # runs vnode having forgotten the loop invariants, names, computed by the tconces in its blocks (see optimise.py)
+    __slots__ = ['vnode', 'names']
+    def __init__(self, vnode, names):
+        super().__init__(vnode.tok1, vnode.tok2, vnode.symtab)
+        self.vnode = vnode
+        self.names = names
+        self.tOut = vnode.tOut
+    def PPTC(self, depth, report):
+        report << TcReportLine(self, depth, f'hoist {", ".join(self.names)}')
+        self.vnode.PPTC(depth + 1, report)
+    def __repr__(self):
+        return f'tchoist: {self.names} {self.vnode}'
+
+class tconce(tcnode):
+    # a loop invariant - vnode is evaluated on first use and the value bound to name until the enclosing tchoist reruns
+    __slots__ = ['vnode', 'name']
+    def __init__(self, vnode, name):
+        super().__init__(vnode.tok1, vnode.tok2, vnode.symtab)
+        self.vnode = vnode
+        self.name = name
+        self.tOut = vnode.tOut
+    def PPTC(self, depth, report):
+        report << TcReportLine(self, depth, f'once {self.name}')
+        self.vnode.PPTC(depth + 1, report)
+    def __repr__(self):
+        return f'tconce: {self.name} {self.vnode}'
+
+
 # **********************************************************************************************************************
 # type checking and coercion
 # **********************************************************************************************************************
@@ -315,6 +372,20 @@ class tclit(tcnode):
     def _t(self):
         return self.tOut
 
+class tcconst(tclit):
+    # a value computed before execution, by the constant folding pass (see optimise.py) or for a numeric tuple literal -
+    # node is the tree it replaced, if any. Unlike other literals the value may be mutable so is never updated in place
+    __slots__ = ['node']
+    def __init__(self, tok1, tok2, symtab, tv, node=Missing):
+        tcnode.__init__(self, tok1, tok2, symtab)
+        self.tOut = getattr(tv, '_t', TBI if node is Missing else node.tOut)
+        self.tv = tv
+        self.node = node
+    def PPTC(self, depth, report):
+        report << TcReportLine(self, depth, f'const {self.tv}')
+    def __repr__(self):
+        return f"tcconst: {self.nodepath} {self.tOut}"
+
 class tclittup(tcnode):
     __slots__ = ['tv']
     def __init__(self, tok1, tok2, symtab, tv):
@@ -7,18 +7,21 @@
 # License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
 # **********************************************************************************************************************
 
+import asyncio
+
 from bones.kernel.tc import tcload, tcfromimport, tcbindval, tcapply, tcgetval, tcfunc, tclit, tcbindfn, tcgetfamily, \
-    tcgetoverload, tclitstruct, tclittup, tclitbtype, tcblock
+    tcgetoverload, tclitstruct, tclittup, tclitbtype, tcblock, tcreturn, tchoist, tconce, currentKernel
 from bones.lang.types import _tvfunc
-from bones.kernel._core import MODULE_SCOPE
+from bones.kernel._core import MODULE_SCOPE, LOCAL_SCOPE, RET_VAR_NAME, UNWIND, TailCall
+from bones.kernel.errors import BonesReturnError, BonesSignalError
 from bones.kernel.symbol_table import Overload
+from bones.kernel.stack_manager import bblockframe
 from bones.core.sentinels import Missing, Void
-from bones.core.errors import NotYetImplemented, ProgrammerError
+from bones.core.errors import NotYetImplemented, ProgrammerError, ErrSite, handlersByErrSiteId
 from bones.core.utils import firstValue
 from bones.ts.metatypes import BTTuple, updateSchemaVarsWith, fitsWithin, BType, BTypeError
 from bones.core.context import context
 from bones.ts.select import _typeOf
-import bones.kernel.tc
 
 # implements stepping and pure execution interfaces
 
@@ -42,19 +45,18 @@ class NewTCInterpreter:
         self.sm = kernel.sm
 
     def executeTc(self, snippet):
-        bones.kernel.tc.k = self.k
-        answer = Void
-        for i, n in enumerate(snippet.nodes):
-            # context.tt  << i + 1
-            answer = self.ex(n)
-            if answer == None: answer = Void
-        bones.kernel.tc.k = Missing
+        token = currentKernel.set(self.k)
+        try:
+            answer = Void
+            for i, n in enumerate(snippet.nodes):
+                # context.tt  << i + 1
+                answer = self.ex(n)
+                if answer == None: answer = Void
+        finally:
+            currentKernel.reset(token)
         return answer
 
     def ex(self, n):
-        if context.traceTcExec:
-            print(f'Executing node: {n}')
-
         if isinstance(n, tcapply):
             # context.tt << f'tcapply {n}'
             sm = self.sm
@@ -152,8 +154,8 @@ class NewTCInterpreter:
             return n
 
         elif isinstance(n, tcblock):
-            raise NotYetImplemented(f"tcblock {n}")
-            return blockctx(n, self.sm.stack[-1])
+            stack = self.sm.stack
+            return blockctx(n, stack[-1] if stack else self.sm.frameForSymTab(n.symtab), self)
 
         elif isinstance(n, tcbindfn):
             # only needed to be done at parse time
@@ -183,62 +185,54 @@ class TCInterpreter:
         self.sm = kernel.sm
 
     def executeTc(self, snippet):
-        bones.kernel.tc.k = self.k
-        answer = Void
-        for i, n in enumerate(snippet.nodes):
-            # context.tt  << i + 1
-            answer = self.ex(n)
-            if answer == None: answer = Void
-        bones.kernel.tc.k = Missing
+        token = currentKernel.set(self.k)
+        try:
+            answer = Void
+            for i, n in enumerate(snippet.nodes):
+                # context.tt  << i + 1
+                answer = self.ex(n)
+                if answer is UNWIND: return self._unwound(n)
+                if answer == None: answer = Void
+        finally:
+            currentKernel.reset(token)
         return answer
 
-    def ex(self, n):
-        if context.traceTcExec:
-            print(f'Executing node: {n}')
+    async def aexecuteTc(self, snippet):
+        # as executeTc but yields to the event loop between phrases - each task has its own copy of currentKernel
+        token = currentKernel.set(self.k)
+        try:
+            answer = Void
+            for i, n in enumerate(snippet.nodes):
+                answer = self.ex(n)
+                if answer is UNWIND: return self._unwound(n)
+                if answer == None: answer = Void
+                await asyncio.sleep(0)
+        finally:
+            currentKernel.reset(token)
+        return answer
+
+    def _unwound(self, n):
+        # a ^ at the top level answers from the snippet, a ^^ that got this far becomes an exception
+        sm = self.sm
+        if (signal := sm.takeSignal()) is not Missing:
+            raise BonesSignalError(f'Unhandled signal - {signal!r}', ErrSite("unhandled signal"), signal)
+        if (ret := sm.takeReturn(n.symtab, LOCAL_SCOPE, RET_VAR_NAME)) is Missing:
+            raise BonesReturnError("^ from a block whose fn has already returned", ErrSite("dead return"))
+        return ret
 
+    def ex(self, n):
         if isinstance(n, tcapply):
             # context.tt << f'tcapply {n}'
             sm = self.sm
             numargs = len(n.argnodes)
             ov = sm.getOverload(n.symtab, n.fnnode.scope, n.fnnode.name, numargs)
-            args = [self.ex(argnode) for argnode in n.argnodes]
-            if isinstance(ov, list):
-                # the list thing needs sorting out
-                ov = ov[numargs]
-            if isinstance(ov, Overload):
-                fn, schemaVars, distance = ov.selectFunction(*[_typeOf(arg) for arg in args])
-            elif isinstance(ov, tcfunc):
-                fn = ov
-            else:
-                raise ProgrammerError()
-
-            if isinstance(fn, (tcfunc, tcblock)):
-                return self.ex(fn)(*args)
-
-            elif isinstance(fn, _tvfunc):
-                if fn.pass_tByT:
-                    ret = fn._v(*args, tByT=schemaVars)
-                else:
-                    ret = fn._v(*args)
-                if hasattr(ret, '_t'):
-                    if ret._t:
-                        # check the actual return type fits the declared return type
-                        if fn.tRet == py or fitsWithin(ret._t, fn.tRet):
-                            return ret
-                        else:
-                            return ret
-                            raise BTypeError(f"Return type mismatch: expected {fn.tRet}, got {ret._t}")
-                    else:
-                        return ret | fn.tRet
-                else:
-                    # use the coercer rather than impose construction with tv
-                    if fitsWithin(_typeOf(ret), fn.tRet):
-                        return ret
-                    else:
-                        return ret #| fn.tRet
-
-            else:
-                raise ProgrammerError(f"Unhandled  fn {{{type(fn)}}}")
+            args = []
+            for argnode in n.argnodes:
+                if (arg := self.ex(argnode)) is UNWIND: return arg
+                args.append(arg)
+            fn, schemaVars, checkRet = self.selectAt(n, ov, numargs, args)
+            if n.tail and type(fn) is tcfunc: return self.tailCall(fn, args)
+            return self.callFn(fn, args, schemaVars, n.mayMutate, checkRet)
 
         elif isinstance(n, tcbindval):
             # context.tt << f'tcbindval {n}'
@@ -246,6 +240,7 @@ class TCInterpreter:
                 raise NotYetImplemented()
             else:
                 val = self.ex(n.vnode)
+                if val is UNWIND: return val
                 self.sm.bind(n.symtab, n.scope, n.name, val)
                 return val
 
@@ -277,12 +272,16 @@ class TCInterpreter:
         elif isinstance(n, tclitstruct):
             kvs = {}
             for k, v in n.tv._kvs():
-                kvs[k] = self.ex(v)
+                if (v := self.ex(v)) is UNWIND: return v
+                kvs[k] = v
             answer = self.k.litstructCons(n.tOut, kvs)
             return answer
 
         elif isinstance(n, tclittup):
-            elems = [self.ex(e) for e in n.tv._v]
+            elems = []
+            for e in n.tv._v:
+                if (e := self.ex(e)) is UNWIND: return e
+                elems.append(e)
             answer = self.k.littupCons(n.tOut, elems)
             return answer
 
@@ -293,8 +292,31 @@ class TCInterpreter:
             return n
 
         elif isinstance(n, tcblock):
-            raise NotYetImplemented(f"tcblock {n}")
-            return blockctx(n, self.sm.stack[-1])
+            stack = self.sm.stack
+            return blockctx(n, stack[-1] if stack else self.sm.frameForSymTab(n.symtab), self)
+
+        elif isinstance(n, tcreturn):
+            val = self.ex(n.vnode)
+            if val is UNWIND: return val
+            if n.signal:
+                self.sm.signal(val)
+            else:
+                self.sm.bind(n.symtab, LOCAL_SCOPE, RET_VAR_NAME, val)
+            return UNWIND
+
+        elif isinstance(n, tconce):
+            if (val := self.sm.getReturn(n.symtab, LOCAL_SCOPE, n.name)) is Missing:
+                if (val := self.ex(n.vnode)) is UNWIND: return val
+                self.sm.bind(n.symtab, LOCAL_SCOPE, n.name, val)
+            return val
+
+        elif isinstance(n, tchoist):
+            # forget the invariants afterwards too so they aren't left bound in the frame (e.g. the module's)
+            try:
+                return self.ex(n.vnode)
+            finally:
+                for name in n.names:
+                    self.sm.takeReturn(n.symtab, LOCAL_SCOPE, name)
 
         elif isinstance(n, tcbindfn):
             # only needed to be done at parse time
@@ -313,26 +335,331 @@ class TCInterpreter:
         else:
             raise NotYetImplemented(f"Unhandled node {{{n}}}")
 
-# class blockctx:
-#     def __init__(self, tcblock, sm, enclosingFrame):
-#         self.block = block
-#         self.sm = sm
-#         self.parent = parentFrame
-#     def __call__(self, *args, **kwargs):
-#         # this allows the block to be called as a normal function from Python
-#         frame = self.sm.blockframe(self.symtab, k.sm.stack[-1], self.argnames, self._tArgs,
-#                           s               k.sm.frameForSymTab(self.symtab))
-#
-#         for name, arg in zip(self.argnames, args):
-#             k.sm.bind(frame.symtab, LOCAL_SCOPE, name, arg)
-#         for n in self.body:
-#             val = k.tcrunner.ex(n)
-#         if (ret := k.sm.getReturn(frame.symtab, LOCAL_SCOPE, RET_VAR_NAME)) is Missing: ret = val
-#         return ret
-#
-#     def __repr__(self):
-#         return f'blockctx({self.block}, {self.parent}, {self.argnames}, {self.tArgs}, {self.frame})'
+    def selectFn(self, ov, numargs, args):
+        if isinstance(ov, list):
+            # the list thing needs sorting out
+            ov = ov[numargs]
+        if isinstance(ov, Overload):
+            fn, schemaVars, distance = ov.selectFunction(*[_typeOf(arg) for arg in args])
+            return fn, schemaVars
+        elif isinstance(ov, (tcfunc, blockctx)):
+            return ov, Missing
+        else:
+            raise ProgrammerError()
+
+    def selectAt(self, n, ov, numargs, args):
+        # answers fn, schemaVars, checkRet - in a specialised fn the site's last selection if the arg types are the same
+        stack = self.sm.stack
+        if stack and (spec := stack[-1].spec) is not Missing:
+            return spec.select(n, ov, numargs, args, self)
+        fn, schemaVars = self.selectFn(ov, numargs, args)
+        return fn, schemaVars, True
+
+    def tailCall(self, fn, args):
+        return TailCall(fn, args)
+
+    def callFn(self, fn, args, schemaVars, mayMutate=(), checkRet=True):
+        if isinstance(fn, blockctx):
+            return fn(*args)
+
+        elif isinstance(fn, (tcfunc, tcblock)):
+            return self.ex(fn)(*args)
+
+        elif isinstance(fn, _tvfunc):
+            kwargs = {'mayMutate': mayMutate} if mayMutate and getattr(fn._v, 'bonesMayMutate', False) else {}
+            if fn.pass_tByT:
+                ret = fn._v(*args, tByT=schemaVars, **kwargs)
+            else:
+                ret = fn._v(*args, **kwargs)
+            if ret is UNWIND or _unwoundIn(args, self.sm): return UNWIND
+            if not checkRet:
+                # the same fn with the same arg types has already been checked at this site
+                return ret if getattr(ret, '_t', True) else ret | fn.tRet
+            if hasattr(ret, '_t'):
+                if ret._t:
+                    # check the actual return type fits the declared return type
+                    if fn.tRet == py or fitsWithin(ret._t, fn.tRet):
+                        return ret
+                    else:
+                        return ret
+                        raise BTypeError(f"Return type mismatch: expected {fn.tRet}, got {ret._t}")
+                else:
+                    return ret | fn.tRet
+            else:
+                # use the coercer rather than impose construction with tv
+                if fitsWithin(_typeOf(ret), fn.tRet):
+                    return ret
+                else:
+                    return ret #| fn.tRet
+
+        else:
+            raise ProgrammerError(f"Unhandled  fn {{{type(fn)}}}")
+
+
+class blockctx:
+    # a block evaluated in a frame - args are local, all other names are shared with the enclosing fn (see blockSymTab),
+    # so a call pushes just a bblockframe holding the args in front of the enclosing frame, and the blockctx itself is
+    # made once when the block is evaluated, not per call
+    __slots__ = ['block', 'frame', 'runner']
+
+    def __init__(self, block, frame, runner):
+        self.block = block
+        self.frame = frame
+        self.runner = runner
+
+    def __call__(self, *args):
+        block, frame, runner = self.block, self.frame, self.runner
+        names = block.argnames
+        if len(args) != len(names):
+            raise ProgrammerError(f'{block} takes {len(names)} args but was called with {len(args)}', ErrSite("num args"))
+        if _isUnwinding(frame, runner.sm): return UNWIND      # a ^ or ^^ from an earlier call that its caller ignored
+        stack = runner.sm.stack
+        stack.append(bblockframe(frame, names, args))
+        val = Void
+        try:
+            for n in block.body:
+                val = runner.ex(n)
+                if val is UNWIND: break
+        finally:
+            stack.pop()
+        return val
+
+    def __repr__(self):
+        return f'blockctx({self.block}, {self.frame})'
+
+
+# instrumentation - the plain TCInterpreter has no tracing checks at all, when tracing, profiling or debugging is wanted
+# the kernel swaps in an InstrumentedTCInterpreter that calls out to a TcHooks object
+
+class TcHooks:
+    # override as needed
+    def onEnterNode(self, n):
+        pass
+    def onExitNode(self, n, answer):
+        # answer is Missing if the node raised
+        pass
+    def onCall(self, fn, args):
+        pass
+    def onBind(self, n, val):
+        pass
+
+
+class TraceHooks(TcHooks):
+    def onEnterNode(self, n):
+        print(f'Executing node: {n}')
+
+
+class InstrumentedTCInterpreter(TCInterpreter):
+
+    def __init__(self, kernel, modulectx, hooks):
+        super().__init__(kernel, modulectx)
+        self.hooks = hooks
+
+    def ex(self, n):
+        hooks = self.hooks
+        hooks.onEnterNode(n)
+        answer = Missing
+        try:
+            answer = super().ex(n)
+            if isinstance(n, tcbindval): hooks.onBind(n, answer)
+            return answer
+        finally:
+            hooks.onExitNode(n, answer)
+
+    def tailCall(self, fn, args):
+        self.hooks.onCall(fn, args)
+        return super().tailCall(fn, args)
+
+    def callFn(self, fn, args, schemaVars, mayMutate=(), checkRet=True):
+        self.hooks.onCall(fn, args)
+        return super().callFn(fn, args, schemaVars, mayMutate, checkRet)
+
+
+# an interpreter whose calls from one bones fn to another don't recurse in python - tree code is evaluated by a loop over
+# an explicit stack of continuations so recursion depth is bounded by memory rather than the python stack. Python fns
+# that call back into bones (e.g. each given a block) still nest a python call per level. Selected with
+# BonesKernel(..., stackless=True)
+
+_EX, _APPLY, _NEXT, _LEAVE, _BIND, _RETURN, _TUP, _STRUCT = range(8)
+_LEAVES = (tcgetval, tclit, tcblock, tcgetfamily, tclitbtype)     # tcfunc is a tcblock
+
+
+def _anyUnwinding(xs):
+    for x in xs:
+        if x is UNWIND: return True
+    return False
+
+
+def _unwoundIn(args, sm):
+    # True if a block (or a fn) passed to a python fn did a ^ or ^^ that the python fn didn't pass on, e.g. each ignores
+    # the UNWIND from {[x] ^ x} and carries on with the next x
+    for arg in args:
+        if type(arg) is blockctx:
+            if _isUnwinding(arg.frame, sm): return True
+        elif isinstance(arg, tcfunc) and sm.isSignalling():
+            return True
+    return False
+
+
+def _isUnwinding(frame, sm):
+    return sm.isSignalling() or frame.values.get(RET_VAR_NAME, Missing) is not Missing
+
+
+class StacklessTCInterpreter(TCInterpreter):
+
+    def ex(self, n):
+        stack = self.sm.stack
+        depth = len(stack)
+        try:
+            return self._run(n)
+        except BaseException:
+            del stack[depth:]           # drop the frames of any fns that were running
+            raise
+
+    async def aexecuteTc(self, snippet):
+        # as TCInterpreter.aexecuteTc but also yields to the event loop before each call so one long phrase, e.g. a deep
+        # recursion, doesn't hold up the other sessions on the loop
+        token = currentKernel.set(self.k)
+        try:
+            answer = Void
+            for i, n in enumerate(snippet.nodes):
+                answer = await self._aex(n)
+                if answer is UNWIND: return self._unwound(n)
+                if answer == None: answer = Void
+        finally:
+            currentKernel.reset(token)
+        return answer
+
+    async def _aex(self, n):
+        stack = self.sm.stack
+        depth = len(stack)
+        steps = self._steps(n, True)
+        try:
+            while True:
+                try:
+                    next(steps)
+                except StopIteration as stop:
+                    return stop.value
+                await asyncio.sleep(0)
+        except BaseException:
+            del stack[depth:]           # drop the frames of any fns that were running, e.g. if the task is cancelled
+            raise
+
+    def _run(self, n):
+        try:
+            next(self._steps(n, False))
+        except StopIteration as stop:
+            return stop.value
+
+    def _steps(self, n, yielding):
+        # a generator answering n's value - if yielding it yields before each call, otherwise it runs to completion
+        sm = self.sm
+        vals, todo = [], [(_EX, n)]
+        while todo:
+            item = todo.pop()
+            op = item[0]
+
+            if op == _EX:
+                n = item[1]
+                if isinstance(n, _LEAVES):
+                    vals.append(TCInterpreter.ex(self, n))
+                elif isinstance(n, tcapply):
+                    todo.append((_APPLY, n))
+                    todo.extend((_EX, a) for a in reversed(n.argnodes))
+                elif isinstance(n, tcbindval) and not n.accessors:
+                    todo.append((_BIND, n))
+                    todo.append((_EX, n.vnode))
+                elif isinstance(n, tcreturn):
+                    todo.append((_RETURN, n))
+                    todo.append((_EX, n.vnode))
+                elif isinstance(n, tclittup):
+                    todo.append((_TUP, n))
+                    todo.extend((_EX, e) for e in reversed(n.tv._v))
+                elif isinstance(n, tclitstruct):
+                    kvs = n.tv._kvs()
+                    todo.append((_STRUCT, n, [k for k, _ in kvs]))
+                    todo.extend((_EX, v) for _, v in reversed(kvs))
+                else:
+                    vals.append(TCInterpreter.ex(self, n))     # leaves, and anything else recursively
+
+            elif op == _APPLY:
+                if yielding: yield
+                n = item[1]
+                numargs = len(n.argnodes)
+                args = vals[len(vals) - numargs:]
+                del vals[len(vals) - numargs:]
+                if _anyUnwinding(args):
+                    vals.append(UNWIND)
+                    continue
+                ov = sm.getOverload(n.symtab, n.fnnode.scope, n.fnnode.name, numargs)
+                fn, schemaVars, checkRet = self.selectAt(n, ov, numargs, args)
+                if type(fn) is tcfunc:
+                    if n.tail: vals.append(TailCall(fn, args))
+                    else: self._enter(fn, args, todo, vals)
+                else:
+                    vals.append(self.callFn(fn, args, schemaVars, n.mayMutate, checkRet))
+
+            elif op == _NEXT:
+                # the previous phrase's value is on vals - stop if it's unwinding else evaluate the next phrase
+                if vals[-1] is UNWIND: continue
+                vals.pop()
+                body, i = item[1], item[2]
+                if i + 1 < len(body): todo.append((_NEXT, body, i + 1))
+                todo.append((_EX, body[i]))
+
+            elif op == _LEAVE:
+                # as tcfunc.__call__
+                val = vals.pop()
+                if (ret := sm.getReturn(item[1], LOCAL_SCOPE, RET_VAR_NAME)) is Missing: ret = val
+                frame = sm.popFrame()
+                if type(ret) is TailCall:
+                    self._enter(ret.fn, ret.args, todo, vals, frame.ctx)
+                else:
+                    vals.append(ret)
+
+            elif op == _BIND:
+                n = item[1]
+                if (val := vals[-1]) is not UNWIND: sm.bind(n.symtab, n.scope, n.name, val)
+
+            elif op == _RETURN:
+                n = item[1]
+                if (val := vals.pop()) is not UNWIND:
+                    if n.signal: sm.signal(val)
+                    else: sm.bind(n.symtab, LOCAL_SCOPE, RET_VAR_NAME, val)
+                vals.append(UNWIND)
+
+            elif op == _TUP:
+                n = item[1]
+                num = len(n.tv._v)
+                elems = vals[len(vals) - num:]
+                del vals[len(vals) - num:]
+                vals.append(UNWIND if _anyUnwinding(elems) else self.k.littupCons(n.tOut, elems))
+
+            elif op == _STRUCT:
+                n, names = item[1], item[2]
+                vs = vals[len(vals) - len(names):]
+                del vals[len(vals) - len(names):]
+                vals.append(UNWIND if _anyUnwinding(vs) else self.k.litstructCons(n.tOut, dict(zip(names, vs))))
+
+        return vals.pop()
+
+    def _enter(self, fn, args, todo, vals, ctx=Missing):
+        frame = self.sm.pushFrame(fn.symtab, ctx)
+        if (specialiser := self.k.specialiser) is not Missing: frame.spec = specialiser.specFor(fn, args)
+        for name, arg in zip(fn.argnames, args):
+            frame[name] = arg
+        todo.append((_LEAVE, fn.symtab))
+        vals.append(Void)               # the value of the phrase before the first
+        if fn.body: todo.append((_NEXT, fn.body, 0))
+
+
 
 
 py = BType('py')
 
+
+handlersByErrSiteId.update({
+    ('bones.kernel.tc_interpreter', Missing, '__call__', 'num args') : '...',
+    ('bones.kernel.tc_interpreter', Missing, '_unwound', 'unhandled signal') : '...',
+    ('bones.kernel.tc_interpreter', Missing, '_unwound', 'dead return') : '...',
+})
@@ -0,0 +1,128 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Hand built tc trees for the kernel tests - the nodes are made without a parser so only the attributes the passes and
+# the interpreters read are set. Each Trees has its own symtab holding the fns its tests define:
+#
+#   t = Trees()
+#   t.pyfn('inc', lambda n: n + 1)
+#   t.fn('twice', ['n'], t.apply('inc', t.apply('inc', t.get('n'))))
+#   k, answer = t.pace(TCInterpreter, t.apply('twice', t.lit(1)))
+
+from bones.core.sentinels import Missing
+from bones.lang.types import _tvfunc
+from bones.kernel._core import LOCAL_SCOPE
+from bones.kernel.contextual_scope_manager import ContextualScopeManager
+from bones.kernel.core import PythonStorageManager
+from bones.kernel.persistent import ptup, pstruct
+from bones.kernel.symbol_table import Overload
+from bones.kernel.tc import tcsnippet, tcapply, tcbindval, tcgetval, tcblock, tcfunc, tclit, tclittup, tclitstruct, \
+    tcreturn
+from bones.kernel.tc_interpreter import py
+
+
+class PyFn(_tvfunc):
+    def __init__(self, pyfn):
+        self._v = pyfn
+        self.pass_tByT = False
+        self.tRet = py
+
+
+class Ov(Overload):
+    # an overload of one fn whatever the arg types
+    def __init__(self, fn):
+        self.fn = fn
+    def selectFunction(self, *ts):
+        return self.fn, Missing, 0
+    def items(self):
+        return [((), self.fn)]
+    def __len__(self):
+        return 1
+
+
+class SymTab:
+    path = 'test'
+    def __init__(self):
+        self.kernel = Missing
+        self.ovByName = {}
+        self.vnames = set()
+    @property
+    def symtab(self):
+        return self
+    def fMetaForGet(self, name, scope):
+        return self if name in self.ovByName else Missing
+    def getOverload(self, name, numargs):
+        return self.ovByName[name]
+    def hasV(self, name):
+        return name in self.vnames
+    def defVMeta(self, name, t, scope):
+        self.vnames.add(name)
+
+
+class Kernel:
+    def __init__(self, runnerClass):
+        self.specialiser = Missing
+        self.sm = PythonStorageManager(ContextualScopeManager())
+        self.tcrunner = runnerClass(self, Missing)
+        self.littupCons = lambda t, xs: ptup(t, xs)
+        self.litstructCons = lambda t, kvs: pstruct(t, kvs)
+
+
+class Trees:
+
+    def __init__(self):
+        self.st = SymTab()
+
+    def node(self, cls, **attrs):
+        n = object.__new__(cls)
+        n.id, n.symtab, n.tok1, n.tok2, n.tOut = id(n), self.st, None, None, Missing
+        for name, value in attrs.items(): setattr(n, name, value)
+        return n
+
+    def pyfn(self, name, pyfn):
+        fn = PyFn(pyfn)
+        self.st.ovByName[name] = Ov(fn)
+        return fn
+
+    def fn(self, name, argnames, *body):
+        self.st.ovByName[name] = fn = self.node(tcfunc, argnames=argnames, body=list(body))
+        return fn
+
+    def get(self, name, scope=LOCAL_SCOPE):
+        return self.node(tcgetval, name=name, scope=scope, accessors=[])
+
+    def apply(self, fnName, *args):
+        return self.node(tcapply, fnnode=self.get(fnName), argnodes=list(args), mayMutate=(), tail=False)
+
+    def bind(self, name, vnode, scope=LOCAL_SCOPE):
+        return self.node(tcbindval, name=name, scope=scope, accessors=[], vnode=vnode)
+
+    def lit(self, v):
+        return self.node(tclit, tv=v)
+
+    def tup(self, *elements):
+        return self.node(tclittup, tv=ptup('T', elements))
+
+    def struct(self, **fields):
+        return self.node(tclitstruct, tv=pstruct('S', fields))
+
+    def ret(self, vnode, signal=False):
+        return self.node(tcreturn, vnode=vnode, signal=signal)
+
+    def block(self, *body, argnames=()):
+        return self.node(tcblock, argnames=list(argnames), body=list(body))
+
+    def snippet(self, *nodes):
+        return self.node(tcsnippet, nodes=list(nodes))
+
+    def pace(self, runnerClass, *nodes, specialiser=Missing):
+        k = Kernel(runnerClass)
+        k.specialiser = specialiser
+        self.st.kernel = k
+        return k, k.tcrunner.executeTc(self.snippet(*nodes))
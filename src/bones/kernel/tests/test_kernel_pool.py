@@ -0,0 +1,101 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# KernelPool with a stand in kernel that answers what it has been asked so far and the pid it ran in. serve has to run
+# on a main thread (it sets a signal handler) so it's run in a forked child
+
+import os, socket, tempfile, time, signal
+
+from bones.kernel.kernel_pool import KernelPool, KernelClient, _reapSessions
+
+
+class _Kernel:
+    def __init__(self):
+        self.srcs = []
+    def pace(self, src):
+        self.srcs.append(src)
+        return list(self.srcs), os.getpid()
+
+
+def _serveInChild(path):
+    # answers the server's pid and its exit code if it stopped of its own accord within a second
+    pid = os.fork()
+    if pid == 0:
+        try:
+            KernelPool(_Kernel).serve(path)
+        except OSError:
+            os._exit(3)
+        finally:
+            os._exit(0)
+    for _ in range(100):
+        if (done := os.waitpid(pid, os.WNOHANG))[0] == pid: return pid, os.waitstatus_to_exitcode(done[1])
+        time.sleep(0.01)
+    return pid, None
+
+
+def _exitedChild():
+    if (pid := os.fork()) == 0: os._exit(0)
+    return pid
+
+
+def testPaceRunsInAForkedChild():
+    pool = KernelPool(_Kernel)
+    srcs, pid = pool.pace('a')
+    assert srcs == ['a'] and pid != os.getpid()
+    assert pool.pace('b')[0] == ['b']                    # each in a fresh copy of the warm kernel
+    assert pool.k.srcs == []
+
+
+def testServeReplacesAStaleSocket():
+    path = os.path.join(tempfile.mkdtemp(), 'bones.sock')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as stale:
+        stale.bind(path)
+    pid, exitCode = _serveInChild(path)
+    try:
+        assert exitCode is None
+        with KernelClient(path) as client:
+            assert client.pace('a')[0] == ['a']
+            assert client.pace('b')[0] == ['a', 'b']         # a session keeps its kernel
+    finally:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+
+
+def testServeLeavesAnythingElseAtItsPath():
+    path = os.path.join(tempfile.mkdtemp(), 'notes.txt')
+    with open(path, 'w') as f:
+        f.write('keep me')
+    pid, exitCode = _serveInChild(path)
+    if exitCode is None:
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+    assert exitCode == 3
+    with open(path) as f:
+        assert f.read() == 'keep me'
+
+
+def testOnlySessionsAreReaped():
+    session, other = _exitedChild(), _exitedChild()
+    time.sleep(0.1)
+    pids = {session}
+    _reapSessions(pids)
+    assert not pids
+    assert os.waitpid(other, 0)[0] == other              # still there for whoever started it
+
+
+def main():
+    testPaceRunsInAForkedChild()
+    testServeReplacesAStaleSocket()
+    testServeLeavesAnythingElseAtItsPath()
+    testOnlySessionsAreReaped()
+    print('pass')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# The Specialiser's LRU and call site cache, and specialised fns run by both interpreters over hand built trees (see
+# harness.py)
+
+from bones.core.sentinels import Missing
+from bones.kernel.monomorph import Specialiser
+from bones.kernel.tc_interpreter import TCInterpreter, StacklessTCInterpreter
+from bones.kernel.tests.harness import Trees
+
+
+class _Fn:
+    def __init__(self, id):
+        self.id = id
+
+
+class _Site:
+    def __init__(self, id):
+        self.id = id
+
+
+class _Runner:
+    # counts the selections the site cache didn't answer
+    def __init__(self):
+        self.numSelected = 0
+    def selectFn(self, ov, numargs, args):
+        self.numSelected += 1
+        return (ov, len(args)), Missing
+
+
+def testLeastRecentlyUsedIsEvicted():
+    s, f = Specialiser(2), _Fn(1)
+    ints, strs = s.specFor(f, [1]), s.specFor(f, ['a'])
+    assert s.specFor(f, [2]) is ints                # same types, so the same specialisation
+    floats = s.specFor(f, [1.5])                    # strs is the least recently used
+    assert (s.numMade, s.numEvicted) == (3, 1)
+    assert s.specFor(f, [3]) is ints and s.specFor(f, [2.5]) is floats
+    assert s.specFor(f, ['b']) is not strs
+    assert (s.numMade, s.numEvicted) == (4, 2)
+
+
+def testSpecialisationsAreKeptPerFn():
+    s = Specialiser(1)
+    f, g = _Fn(1), _Fn(2)
+    spec = s.specFor(f, [1])
+    s.specFor(g, ['a'])
+    assert s.specFor(f, [1]) is spec and s.numEvicted == 0
+
+
+def testInvalidateDropsEverySpecialisation():
+    s, f = Specialiser(4), _Fn(1)
+    spec = s.specFor(f, [1])
+    s.invalidate()
+    assert s.specFor(f, [1]) is not spec
+
+
+def testSiteReusesASelectionOnlyForTheSameOverloadAndTypes():
+    spec, runner, n = Specialiser(4).specFor(_Fn(1), []), _Runner(), _Site(7)
+    ov1, ov2 = object(), object()
+    assert spec.select(n, ov1, 1, [1], runner) == ((ov1, 1), Missing, True)
+    assert spec.select(n, ov1, 1, [2], runner) == ((ov1, 1), Missing, False)
+    assert runner.numSelected == 1
+    assert spec.select(n, ov1, 1, ['a'], runner)[2] and runner.numSelected == 2
+    assert spec.select(n, ov2, 1, ['a'], runner) == ((ov2, 1), Missing, True)
+    assert spec.select(_Site(8), ov2, 1, ['a'], runner)[2] and runner.numSelected == 4
+
+
+def testSpecialisedFnsAnswerTheSame():
+    # twice(n): inc(inc(n))
+    t = Trees()
+    t.pyfn('inc', lambda n: n + 1)
+    t.fn('twice', ['n'], t.apply('inc', t.apply('inc', t.get('n'))))
+    for runnerClass in (TCInterpreter, StacklessTCInterpreter):
+        s = Specialiser(2)
+        for n in (1, 2, 1.5):
+            k, answer = t.pace(runnerClass, t.apply('twice', t.lit(n)), specialiser=s)
+            assert answer == n + 2 and not k.sm.stack, runnerClass
+        assert (s.numMade, s.numEvicted) == (2, 0), runnerClass
+
+
+def main():
+    testLeastRecentlyUsedIsEvicted()
+    testSpecialisationsAreKeptPerFn()
+    testInvalidateDropsEverySpecialisation()
+    testSiteReusesASelectionOnlyForTheSameOverloadAndTypes()
+    testSpecialisedFnsAnswerTheSame()
+    print('pass')
+
+
+if __name__ == '__main__':
+    main()
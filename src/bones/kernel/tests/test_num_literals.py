@@ -0,0 +1,68 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# parseNumArray over tuple groups straight from the lexer and grouper
+
+from bones.core.sentinels import Missing
+from bones.kernel import lex, parse_groups
+from bones.kernel.parse_groups import TupParenOrDestructureGrp
+from bones.kernel.parse_phrase import parseNumArray
+from bones.kernel.symbol_table import SymbolTable
+from bones.lang.types import unary
+
+
+class _Kernel:
+    # grouping only needs the style registry, parseNumArray only the constructor
+    def styleForName(self, name):
+        return unary
+    def litnumarrayCons(self, tElem, shape, buf):
+        return shape, buf.typecode, list(buf)
+
+
+def _numArray(src):
+    k = _Kernel()
+    tokens, lines = lex.lexBonesSrc(1, src)
+    globalCtx = SymbolTable(k, Missing, Missing, Missing, Missing, 'global')
+    scratch = SymbolTable(k, Missing, Missing, Missing, globalCtx, 'scratch')
+    group = parse_groups.parseStructure(tokens, scratch, src).phrases[0][0]
+    assert isinstance(group, TupParenOrDestructureGrp), src
+    return parseNumArray(group, k)
+
+
+def testIntegersGoIntoAnIntBuffer():
+    assert _numArray('(1, 2, 3)') == ((3,), 'q', [1, 2, 3])
+
+
+def testRowsMakeA2DArray():
+    assert _numArray('(1.0, 0.95; 0.95, 1.0)') == ((2, 2), 'd', [1.0, 0.95, 0.95, 1.0])
+    assert _numArray('(1.0, 0.95;\n 0.95, 1.0)') == ((2, 2), 'd', [1.0, 0.95, 0.95, 1.0])
+    assert _numArray('(1, 2.5; 3, 4)') == ((2, 2), 'd', [1.0, 2.5, 3.0, 4.0])
+    assert _numArray('(1; 2; 3)') == ((3, 1), 'q', [1, 2, 3])
+
+
+def testATrailingSemicolonIsIgnored():
+    assert _numArray('(1, 2; 3, 4;)') == ((2, 2), 'q', [1, 2, 3, 4])
+
+
+def testAnythingElseIsLeftToTheParsers():
+    assert _numArray('(1, 2; 3)') is Missing          # ragged
+    assert _numArray('(1, -2)') is Missing            # a call
+    assert _numArray('(1, 2.5e3)') is Missing         # not lexed as a single number
+
+
+def main():
+    testIntegersGoIntoAnIntBuffer()
+    testRowsMakeA2DArray()
+    testATrailingSemicolonIsIgnored()
+    testAnythingElseIsLeftToTheParsers()
+    print('pass')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# The optimiser passes over hand built trees (see harness.py) - each program is built afresh, run unoptimised and
+# optimised, and the observable calls compared
+
+from bones.kernel._core import MODULE_SCOPE
+from bones.kernel.optimise import eliminateCommonSubexpressions, foldConstants, hoistInvariants
+from bones.kernel.parallel import pure
+from bones.kernel.tc_interpreter import TCInterpreter
+from bones.kernel.tc import tcconst
+from bones.kernel.tests.harness import Kernel, Trees
+
+
+t = Trees()
+seen, squared = [], []
+t.pyfn('each', lambda xs, block: [block(x) for x in xs])
+t.pyfn('note', lambda x: seen.append(x) or x)
+t.pyfn('sq', pure(lambda x: squared.append(x) or x * x))
+t.pyfn('inv', pure(lambda x: 1 / x))
+# getM(): ..m - a bones fn with no python callees reading a module value
+t.fn('getM', [], t.get('m', MODULE_SCOPE))
+
+
+def _run(snippet):
+    seen.clear()
+    squared.clear()
+    t.pace(TCInterpreter, *snippet.nodes)
+    return list(seen), list(squared)
+
+
+def _loopNoting(*phrases):
+    # (1, 2, 3) each {[i] phrases}
+    return t.apply('each', t.lit((1, 2, 3)), t.block(*phrases, argnames=['i']))
+
+
+def _fold(snippet):
+    squared.clear()
+    return foldConstants(snippet, Kernel(TCInterpreter))
+
+
+def testPureCallsOnLiteralsFoldOnce():
+    # note(sq(sq(2)))
+    snippet = t.snippet(t.apply('note', t.apply('sq', t.apply('sq', t.lit(2)))))
+    assert _fold(snippet) == 2 and squared == [2, 4]
+    folded = snippet.nodes[0].argnodes[0]
+    assert isinstance(folded, tcconst) and folded.tv == 16
+    assert _run(snippet) == ([16], [])
+
+
+def testImpureCallsAndNonLiteralArgsAreNotFolded():
+    # note(1). sq(k)
+    snippet = t.snippet(t.apply('note', t.lit(1)), t.apply('sq', t.get('k')))
+    assert _fold(snippet) == 0 and not squared
+    assert not any(isinstance(n, tcconst) for n in snippet.nodes)
+
+
+def testCallsThatRaiseAreLeftToRaiseWhenRun():
+    # inv(0)
+    snippet = t.snippet(t.apply('inv', t.lit(0)))
+    assert _fold(snippet) == 0 and not isinstance(snippet.nodes[0], tcconst)
+
+
+def testLiteralTuplesAndStructsFold():
+    # (1, sq(3)) and {a: sq(2), b: k} - the struct keeps the field that folded
+    tup = t.tup(t.lit(1), t.apply('sq', t.lit(3)))
+    struct = t.struct(a=t.apply('sq', t.lit(2)), b=t.get('k'))
+    snippet = t.snippet(tup, struct)
+    assert _fold(snippet) == 3
+    assert isinstance(snippet.nodes[0], tcconst) and list(snippet.nodes[0].tv) == [1, 9]
+    assert snippet.nodes[1] is struct and isinstance(struct.tv.a, tcconst) and struct.tv.a.tv == 4
+
+
+def testInvariantIsHoistedOutOfTheLoop():
+    # k: 4. (1, 2, 3) each {[i] note(sq(k))}
+    build = lambda: t.snippet(t.bind('k', t.lit(4)), _loopNoting(t.apply('note', t.apply('sq', t.get('k')))))
+    report, optimised = [], build()
+    assert hoistInvariants(optimised, report) == 1 and len(report) == 1
+    assert _run(build()) == ([16, 16, 16], [4, 4, 4])
+    assert _run(optimised) == ([16, 16, 16], [4])
+
+
+def testNamesBoundInTheLoopAreNotHoisted():
+    # (1, 2, 3) each {[i] note(sq(i))}
+    snippet = t.snippet(_loopNoting(t.apply('note', t.apply('sq', t.get('i')))))
+    assert hoistInvariants(snippet, []) == 0
+    assert _run(snippet) == ([1, 4, 9], [1, 2, 3])
+
+
+def testCallsReadingModuleValuesAreNotHoisted():
+    # m: 0. (1, 2, 3) each {[i] m: i. note(getM())}
+    build = lambda: t.snippet(
+        t.bind('m', t.lit(0)),
+        _loopNoting(t.bind('m', t.get('i')), t.apply('note', t.apply('getM'))),
+    )
+    optimised = build()
+    assert hoistInvariants(optimised, []) == 0
+    assert _run(build())[0] == _run(optimised)[0] == [1, 2, 3]
+
+
+def testCommonSubexpressionIsComputedOnce():
+    # f(x): note(sq(x)). note(sq(x))
+    t.fn('f', ['x'], t.apply('note', t.apply('sq', t.get('x'))), t.apply('note', t.apply('sq', t.get('x'))))
+    snippet = t.snippet(t.st.ovByName['f'], t.apply('f', t.lit(3)))
+    report = []
+    assert eliminateCommonSubexpressions(snippet, report) == 1 and len(report) == 1
+    assert _run(snippet) == ([9, 9], [3])
+
+
+def testRebindingEndsTheReuse():
+    # g(x): note(sq(x)). x: 5. note(sq(x))
+    t.fn('g', ['x'],
+        t.apply('note', t.apply('sq', t.get('x'))),
+        t.bind('x', t.lit(5)),
+        t.apply('note', t.apply('sq', t.get('x'))),
+    )
+    snippet = t.snippet(t.st.ovByName['g'], t.apply('g', t.lit(3)))
+    assert eliminateCommonSubexpressions(snippet, []) == 0
+    assert _run(snippet) == ([9, 25], [3, 5])
+
+
+def testCallsReadingModuleValuesAreNotReused():
+    # h(): note(getM()). ..m: 5. note(getM())
+    t.fn('h', [],
+        t.apply('note', t.apply('getM')),
+        t.bind('m', t.lit(5), MODULE_SCOPE),
+        t.apply('note', t.apply('getM')),
+    )
+    snippet = t.snippet(t.bind('m', t.lit(0)), t.st.ovByName['h'], t.apply('h'))
+    assert eliminateCommonSubexpressions(snippet, []) == 0
+    assert _run(snippet)[0] == [0, 5]
+
+
+def testTheSnippetIsNotEliminated():
+    # note(sq(2)). note(sq(2)) - temps at the top level would be left in the module's frame
+    snippet = t.snippet(t.apply('note', t.apply('sq', t.lit(2))), t.apply('note', t.apply('sq', t.lit(2))))
+    assert eliminateCommonSubexpressions(snippet, []) == 0
+
+
+def testHoistedTempsAreForgotten():
+    snippet = t.snippet(t.bind('k', t.lit(4)), _loopNoting(t.apply('note', t.apply('sq', t.get('k')))))
+    hoistInvariants(snippet, [])
+    kernel, answer = t.pace(TCInterpreter, *snippet.nodes)
+    assert not [name for name in kernel.sm.frameForSymTab(t.st).values if name.startswith('__once')]
+
+
+def main():
+    testPureCallsOnLiteralsFoldOnce()
+    testImpureCallsAndNonLiteralArgsAreNotFolded()
+    testCallsThatRaiseAreLeftToRaiseWhenRun()
+    testLiteralTuplesAndStructsFold()
+    testInvariantIsHoistedOutOfTheLoop()
+    testNamesBoundInTheLoopAreNotHoisted()
+    testCallsReadingModuleValuesAreNotHoisted()
+    testCommonSubexpressionIsComputedOnce()
+    testRebindingEndsTheReuse()
+    testCallsReadingModuleValuesAreNotReused()
+    testTheSnippetIsNotEliminated()
+    testHoistedTempsAreForgotten()
+    print('pass')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# isPure over hand built trees (see harness.py), and pmap / pselect behind each and select as a library would wire them
+
+import threading
+
+from bones.core.context import context
+from bones.kernel._core import MODULE_SCOPE, CONTEXT_SCOPE
+from bones.kernel.parallel import pure, isPure, pmap, pselect
+from bones.kernel.tc_interpreter import TCInterpreter
+from bones.kernel.tests.harness import Trees
+
+
+t = Trees()
+threadNames = set()
+t.pyfn('each', lambda xs, fn: pmap(fn, xs))
+t.pyfn('select', lambda xs, fn: pselect(fn, xs))
+t.pyfn('note', lambda x: x)
+t.pyfn('sq', pure(lambda x: threadNames.add(threading.current_thread().name) or x * x))
+t.pyfn('isOdd', pure(lambda x: threadNames.add(threading.current_thread().name) or x % 2 == 1))
+
+# quad(x): y: sq(x). sq(y)
+_quad = t.fn('quad', ['x'], t.bind('y', t.apply('sq', t.get('x'))), t.apply('sq', t.get('y')))
+# noisy(x): note(sq(x))
+_noisy = t.fn('noisy', ['x'], t.apply('note', t.apply('sq', t.get('x'))))
+# setsM(x): ..m: x
+_setsM = t.fn('setsM', ['x'], t.bind('m', t.get('x'), MODULE_SCOPE))
+# readsCtx(x): sq(_.n)
+_readsCtx = t.fn('readsCtx', ['x'], t.apply('sq', t.get('n', CONTEXT_SCOPE)))
+# down(x): down(x) - recursion is pure unless the body says otherwise
+_down = t.fn('down', ['x'], t.apply('down', t.get('x')))
+# callsQuad(x): quad(quad(x))
+_callsQuad = t.fn('callsQuad', ['x'], t.apply('quad', t.apply('quad', t.get('x'))))
+
+
+def testFnsArePureIfAllTheyCallArePure():
+    assert isPure(_quad) and isPure(_down) and isPure(_callsQuad)
+    assert not isPure(_noisy)
+
+
+def testBindsOutsideTheFrameAndContextReadsAreImpure():
+    assert not isPure(_setsM)
+    assert not isPure(_readsCtx)
+
+
+def testBlocksMayNotBindAsTheyShareTheirFnsFrame():
+    assert isPure(t.block(t.apply('sq', t.get('x')), argnames=['x']))
+    assert not isPure(t.block(t.bind('y', t.get('x')), argnames=['x']))
+
+
+def _paced(fnName, block, xs):
+    threadNames.clear()
+    k, answer = t.pace(TCInterpreter, t.apply(fnName, t.lit(xs), block))
+    return answer
+
+
+def testPureBlocksAreRunInParallelInOrder():
+    xs = list(range(1000))
+    with context(parallelWorkers=4, parallelMinChunk=10):
+        squares = _paced('each', t.block(t.apply('sq', t.get('x')), argnames=['x']), xs)
+        assert squares == [x * x for x in xs]
+        assert any(name.startswith('bones') for name in threadNames)
+        odds = _paced('select', t.block(t.apply('isOdd', t.get('x')), argnames=['x']), xs)
+        assert odds == [x for x in xs if x % 2 == 1]
+        assert any(name.startswith('bones') for name in threadNames)
+
+
+def testImpureOrSmallRunsSerially():
+    xs = list(range(1000))
+    with context(parallelWorkers=4, parallelMinChunk=10):
+        answer = _paced('each', t.block(t.apply('note', t.apply('sq', t.get('x'))), argnames=['x']), xs)
+        assert answer == [x * x for x in xs] and threadNames == {threading.current_thread().name}
+    with context(parallelWorkers=4, parallelMinChunk=1000):
+        answer = _paced('each', t.block(t.apply('sq', t.get('x')), argnames=['x']), xs)
+        assert answer == [x * x for x in xs] and threadNames == {threading.current_thread().name}
+
+
+def main():
+    testFnsArePureIfAllTheyCallArePure()
+    testBindsOutsideTheFrameAndContextReadsAreImpure()
+    testBlocksMayNotBindAsTheyShareTheirFnsFrame()
+    testPureBlocksAreRunInParallelInOrder()
+    testImpureOrSmallRunsSerially()
+    print('pass')
+
+
+if __name__ == '__main__':
+    main()
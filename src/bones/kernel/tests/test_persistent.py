@@ -0,0 +1,141 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+import copy, pickle, random
+
+from bones.core.sentinels import Missing
+from bones.kernel.persistent import PSeq, PMap, ptup, pstruct
+
+
+class _Collides:
+    # equal keys with the same hash so PMap has to keep them in a collision node
+    def __init__(self, name):
+        self.name = name
+    def __hash__(self):
+        return 42
+    def __eq__(self, other):
+        return isinstance(other, _Collides) and other.name == self.name
+
+
+def testPSeqMatchesList():
+    rng = random.Random(1)
+    xs, s = [], PSeq()
+    for i in range(2000):
+        op = rng.randrange(5)
+        if op == 0:
+            xs, s = xs + [i], s.append(i)
+        elif op == 1:
+            xs, s = [i] + xs, s.prepend(i)
+        elif op == 2 and xs:
+            j = rng.randrange(len(xs))
+            xs, s = xs[:j] + [-i] + xs[j + 1:], s.set(j, -i)
+        elif op == 3:
+            ys = list(range(rng.randrange(100)))
+            xs, s = xs + ys, s.join(PSeq(ys))
+        elif xs:
+            a, b = sorted(rng.randrange(len(xs) + 1) for _ in range(2))
+            xs, s = xs[a:b], s[a:b]
+        assert len(s) == len(xs)
+        assert list(s) == xs
+    assert all(s[j] == x for j, x in enumerate(xs))
+    assert all(s[-j] == xs[-j] for j in range(1, len(xs) + 1))
+
+
+def testPSeqIsPersistent():
+    s1 = PSeq(range(100))
+    s2 = s1.set(50, 'x').append(100).prepend(-1)
+    assert list(s1) == list(range(100))
+    assert s2[0] == -1 and s2[51] == 'x' and s2[-1] == 100 and len(s2) == 102
+
+
+def testPSeqTakeDropAndIndexErrors():
+    s = PSeq(range(10))
+    assert s.take(3) == (0, 1, 2) and s.take(-2) == [8, 9]
+    assert s.drop(8) == [8, 9] and s.drop(-8) == [0, 1]
+    assert s[::2] == [0, 2, 4, 6, 8]
+    assert s + [10] == list(range(11))
+    for i in (10, -11):
+        try:
+            s[i]
+            assert False, f'{i} should be out of range'
+        except IndexError:
+            pass
+
+
+def testPMapMatchesDict():
+    rng = random.Random(2)
+    d, m = {}, PMap()
+    for i in range(3000):
+        k = rng.randrange(500)
+        if rng.random() < 0.3:
+            d.pop(k, None)
+            m = m.without(k)
+        else:
+            d[k] = i
+            m = m.set(k, i)
+        assert len(m) == len(d)
+    assert m == d
+    assert all(m[k] == v for k, v in d.items())
+    assert all(k not in m for k in range(500) if k not in d)
+
+
+def testPMapIteratesInInsertionOrder():
+    m = PMap([('c', 1), ('a', 2), ('b', 3)])
+    m = m.set('a', 20).set('d', 4)
+    assert m.keys() == ['c', 'a', 'b', 'd']
+    assert m.values() == [1, 20, 3, 4]
+    assert m.without('a').set('a', 5).keys() == ['c', 'b', 'd', 'a']
+
+
+def testPMapCollisions():
+    a, b, c = _Collides('a'), _Collides('b'), _Collides('c')
+    m = PMap([(a, 1), (b, 2), (c, 3)])
+    assert len(m) == 3 and m[b] == 2
+    m2 = m.without(b)
+    assert len(m2) == 2 and b not in m2 and m2[a] == 1 and m2[c] == 3
+    assert m[b] == 2
+    assert m2.without(a).without(c).get(a) is Missing
+
+
+def testPStructUpdateSharesTheOriginal():
+    s1 = pstruct('T', {'x': 1, 'y': 2})
+    s2 = s1._update({'y': 3, 'z': 4})
+    assert (s1.x, s1.y, len(s1)) == (1, 2, 2)
+    assert (s2.x, s2.y, s2.z, s2._t) == (1, 3, 4, 'T')
+    try:
+        s1.z
+        assert False, 'z should be missing'
+    except AttributeError:
+        pass
+
+
+def testPickleAndCopy():
+    t = ptup('T', range(40))
+    s = pstruct('S', {'a': t, 'b': PMap({'k': PSeq([1, 2])})})
+    for x in (t, s):
+        assert pickle.loads(pickle.dumps(x)) == x
+        assert copy.copy(x) == x
+        assert copy.deepcopy(x) == x
+    assert pickle.loads(pickle.dumps(s))._t == 'S'
+
+
+def main():
+    testPSeqMatchesList()
+    testPSeqIsPersistent()
+    testPSeqTakeDropAndIndexErrors()
+    testPMapMatchesDict()
+    testPMapIteratesInInsertionOrder()
+    testPMapCollisions()
+    testPStructUpdateSharesTheOriginal()
+    testPickleAndCopy()
+    print('pass')
+
+
+if __name__ == '__main__':
+    main()
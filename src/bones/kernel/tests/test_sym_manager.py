@@ -0,0 +1,64 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+import os, tempfile
+
+from bones.kernel.sym_manager import SymManager
+
+
+def _snapshotOf(*strings):
+    path = os.path.join(tempfile.mkdtemp(), 'syms.bsym')
+    sm = SymManager()
+    for s in strings: sm.Sym(s)
+    sm.save(path)
+    return path
+
+
+def testSnapshotKeepsIdsAndOrder():
+    path = _snapshotOf('pear', 'apple', 'zeta')
+    sm = SymManager.fromSnapshot(path)
+    apple, banana, zz = sm.Sym('apple'), sm.Sym('banana'), sm.Sym('zz')
+    assert apple._id == 1 and banana._id == 3
+    assert apple < banana < sm.Sym('pear') < sm.Sym('zeta') < zz
+    sm.close()
+
+
+def testAppendedSymsKeepTheirIds():
+    path = _snapshotOf('pear', 'apple')
+    sm = SymManager.fromSnapshot(path)
+    sm.Sym('fig')
+    sm.appendDelta(path)
+    sm.Sym('kiwi')
+    sm.appendDelta(path)
+    sm2 = SymManager.fromSnapshot(path)
+    assert (sm2.Sym('fig')._id, sm2.Sym('kiwi')._id, str(sm2.Sym('apple'))) == (2, 3, 'apple')
+    sm.close(); sm2.close()
+
+
+def testSavingACopyLeavesTheDeltaToAppend():
+    path = _snapshotOf('pear', 'apple')
+    sm = SymManager.fromSnapshot(path)
+    sm.Sym('new1')
+    sm.save(path + '.copy')
+    sm.Sym('new2')
+    sm.appendDelta(path)
+    sm2 = SymManager.fromSnapshot(path)
+    assert (sm2.Sym('new1')._id, sm2.Sym('new2')._id) == (2, 3)
+    sm.close(); sm2.close()
+
+
+def main():
+    testSnapshotKeepsIdsAndOrder()
+    testAppendedSymsKeepTheirIds()
+    testSavingACopyLeavesTheDeltaToAppend()
+    print('pass')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Both interpreters over hand built trees (see harness.py), the python fns being called with whatever the interpreter
+# passes
+
+import asyncio, sys
+
+from bones.core.sentinels import Missing
+from bones.kernel.errors import BonesReturnError, BonesSignalError
+from bones.kernel.tailcalls import markTailCalls
+from bones.kernel.tc_interpreter import TCInterpreter, StacklessTCInterpreter
+from bones.kernel.tests.harness import Kernel, Trees
+
+
+_RUNNERS = (TCInterpreter, StacklessTCInterpreter)
+
+t = Trees()
+t.pyfn('ifZero', lambda n, block: block() if n == 0 else None)
+t.pyfn('call', lambda block: block())
+t.pyfn('dec', lambda n: n - 1)
+t.pyfn('inc', lambda n: n + 1)
+# each ignores whatever its block answers, UNWIND included
+t.pyfn('each', lambda xs, block: [block(x) for x in xs])
+noted = []
+t.pyfn('note', lambda x: noted.append(x) or x)
+
+
+# sign(n): n ifZero [^ 0]; 1
+t.fn('sign', ['n'], t.apply('ifZero', t.get('n'), t.block(t.ret(t.lit(0)))), t.lit(1))
+# outer(n): inc(sign(n)) - a ^ in sign's block returns from sign only
+t.fn('outer', ['n'], t.apply('inc', t.apply('sign', t.get('n'))))
+# alarm(n): n ifZero [^^ n]; n
+t.fn('alarm', ['n'], t.apply('ifZero', t.get('n'), t.block(t.ret(t.get('n'), signal=True))), t.get('n'))
+# find(): (1, 2, 3) each {[x] ^ x}. note(99)
+t.fn('find', [], t.apply('each', t.lit((1, 2, 3)), t.block(t.ret(t.get('x')), argnames=['x'])), t.apply('note', t.lit(99)))
+# alarmEach(): (1, 2, 3) each {[x] note(x). ^^ x}. note(99)
+t.fn('alarmEach', [],
+    t.apply('each', t.lit((1, 2, 3)), t.block(t.apply('note', t.get('x')), t.ret(t.get('x'), signal=True), argnames=['x'])),
+    t.apply('note', t.lit(99)),
+)
+# ticks(tag, n): n ifZero [^ 0]. note(tag). ticks(tag, dec n)
+t.fn('ticks', ['tag', 'n'],
+    t.apply('ifZero', t.get('n'), t.block(t.ret(t.lit(0)))),
+    t.apply('note', t.get('tag')),
+    t.apply('ticks', t.get('tag'), t.apply('dec', t.get('n'))),
+)
+# escaping(): [^ 1] - the block outlives the fn it would return from
+t.fn('escaping', [], t.block(t.ret(t.lit(1))))
+# down(n): n ifZero [^ 0]; down(dec n) - a tail call
+_down = t.fn('down', ['n'],
+    t.apply('ifZero', t.get('n'), t.block(t.ret(t.lit(0)))),
+    t.apply('down', t.apply('dec', t.get('n'))),
+)
+# depth(n): n ifZero [^ 0]; inc(depth(dec n)) - not a tail call
+_depth = t.fn('depth', ['n'],
+    t.apply('ifZero', t.get('n'), t.block(t.ret(t.lit(0)))),
+    t.apply('inc', t.apply('depth', t.apply('dec', t.get('n')))),
+)
+
+
+def testReturnFromBlockUnwindsToItsFn():
+    for runnerClass in _RUNNERS:
+        k, answer = t.pace(runnerClass, t.apply('sign', t.lit(0)))
+        assert answer == 0 and not k.sm.stack, runnerClass
+        k, answer = t.pace(runnerClass, t.apply('sign', t.lit(5)))
+        assert answer == 1 and not k.sm.stack, runnerClass
+        k, answer = t.pace(runnerClass, t.apply('outer', t.lit(0)))
+        assert answer == 1 and not k.sm.stack, runnerClass
+
+
+def testReturnAtTopLevelAnswersFromTheSnippet():
+    for runnerClass in _RUNNERS:
+        k, answer = t.pace(runnerClass, t.ret(t.lit(5)), t.lit(6))
+        assert answer == 5, runnerClass
+
+
+def testSignalUnwindsToThePace():
+    for runnerClass in _RUNNERS:
+        k, answer = t.pace(runnerClass, t.apply('alarm', t.lit(3)))
+        assert answer == 3, runnerClass
+        try:
+            t.pace(runnerClass, t.apply('inc', t.apply('alarm', t.lit(0))))
+            assert False, f'{runnerClass.__name__} should have raised'
+        except BonesSignalError:
+            pass
+        assert not t.st.kernel.sm.stack and t.st.kernel.sm.takeSignal() is Missing, runnerClass
+
+
+def testReturnFromABlockGivenToAPythonFnStillUnwinds():
+    for runnerClass in _RUNNERS:
+        noted.clear()
+        k, answer = t.pace(runnerClass, t.apply('find'))
+        assert answer == 1 and not noted and not k.sm.stack, runnerClass
+        try:
+            t.pace(runnerClass, t.apply('alarmEach'))
+            assert False, f'{runnerClass.__name__} should have raised'
+        except BonesSignalError:
+            pass
+        assert noted == [1], runnerClass
+
+
+def testReturnFromADeadFnRaises():
+    for runnerClass in _RUNNERS:
+        try:
+            t.pace(runnerClass, t.apply('call', t.apply('escaping')))
+            assert False, f'{runnerClass.__name__} should have raised'
+        except BonesReturnError:
+            pass
+
+
+def testOnlyCallsInTailPositionAreMarked():
+    # inc(...) is marked too - whether a call loops is decided when it has selected a bones fn
+    assert markTailCalls(t.snippet(_down, _depth)) == 2
+    assert _down.body[-1].tail and not _down.body[-1].argnodes[0].tail
+    assert _depth.body[-1].tail and not _depth.body[-1].argnodes[0].tail
+
+
+def testTailCallsRunInConstantStack():
+    markTailCalls(t.snippet(_down))
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(1000)
+    try:
+        for runnerClass in _RUNNERS:
+            k, answer = t.pace(runnerClass, t.apply('down', t.lit(20_000)))
+            assert answer == 0 and not k.sm.stack, runnerClass
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def testNonTailRecursionStillAnswers():
+    markTailCalls(t.snippet(_depth))
+    for runnerClass in _RUNNERS:
+        k, answer = t.pace(runnerClass, t.apply('depth', t.lit(50)))
+        assert answer == 50 and not k.sm.stack, runnerClass
+
+
+def testStacklessRecursionIsNotBoundByThePythonStack():
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(1000)
+    try:
+        k, answer = t.pace(StacklessTCInterpreter, t.apply('depth', t.lit(5_000)))
+        assert answer == 5_000 and not k.sm.stack
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def testStacklessSessionsTakeTurnsOnTheLoop():
+    # each call yields to the loop so neither session runs to completion before the other starts
+    async def both():
+        runs = [Kernel(StacklessTCInterpreter).tcrunner.aexecuteTc(t.snippet(t.apply('ticks', t.lit(tag), t.lit(3))))
+            for tag in ('a', 'b')]
+        return await asyncio.gather(*runs)
+    noted.clear()
+    assert asyncio.run(both()) == [0, 0]
+    assert noted == ['a', 'b'] * 3
+
+
+def main():
+    testReturnFromBlockUnwindsToItsFn()
+    testReturnAtTopLevelAnswersFromTheSnippet()
+    testSignalUnwindsToThePace()
+    testReturnFromABlockGivenToAPythonFnStillUnwinds()
+    testReturnFromADeadFnRaises()
+    testOnlyCallsInTailPositionAreMarked()
+    testTailCallsRunInConstantStack()
+    testNonTailRecursionStillAnswers()
+    testStacklessRecursionIsNotBoundByThePythonStack()
+    testStacklessSessionsTakeTurnsOnTheLoop()
+    print('pass')
+
+
+if __name__ == '__main__':
+    main()
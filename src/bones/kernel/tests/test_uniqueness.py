@@ -0,0 +1,83 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# markMayMutate over hand built trees (see harness.py)
+
+from bones.kernel._core import MODULE_SCOPE
+from bones.kernel.tc import tconce, tchoist
+from bones.kernel.uniqueness import markMayMutate, acceptsMayMutate
+from bones.kernel.tests.harness import Trees
+
+
+t = Trees()
+t.pyfn('T', acceptsMayMutate(lambda x, mayMutate=(): x))
+t.pyfn('T2', acceptsMayMutate(lambda x, y, mayMutate=(): x))
+t.pyfn('cached', lambda: [1])
+t.pyfn('ifTrue', lambda c, b: b() if c else None)
+
+
+def _marks(*nodes):
+    # answers the mayMutate of the last node, a bind of b: b T
+    markMayMutate(t.snippet(*nodes))
+    return nodes[-1].vnode.mayMutate
+
+
+def testFreshValueIsUpdatedInPlace():
+    assert _marks(t.bind('b', t.tup(t.lit(1))), t.bind('b', t.apply('T', t.get('b')))) == (0,)
+
+
+def testNonLocalValueIsShared():
+    assert _marks(t.bind('b', t.get('m', MODULE_SCOPE)), t.bind('b', t.apply('T', t.get('b')))) == ()
+
+
+def testAliasIsNotUnique():
+    assert _marks(t.bind('b', t.tup(t.lit(1))), t.bind('c', t.get('b')), t.bind('b', t.apply('T', t.get('b')))) == ()
+
+
+def testReadTwiceIsNotUnique():
+    assert _marks(t.bind('b', t.tup(t.lit(1))), t.bind('b', t.apply('T2', t.get('b'), t.get('b')))) == ()
+
+
+def testOnlyOptedInCallsAnswerFreshValues():
+    assert _marks(t.bind('b', t.apply('cached')), t.bind('b', t.apply('T', t.get('b')))) == ()
+    assert _marks(t.bind('b', t.apply('T', t.tup(t.lit(1)))), t.bind('b', t.apply('T', t.get('b')))) == (0,)
+
+
+def testCapturedByABlockIsNotUnique():
+    captured = t.bind('f', t.block(t.get('b')))
+    assert _marks(t.bind('b', t.tup(t.lit(1))), captured, t.bind('b', t.apply('T', t.get('b')))) == ()
+
+
+def testBlockPassedToAFnIsAnalysedInline():
+    inner = t.bind('b', t.apply('T', t.get('b')))
+    markMayMutate(t.snippet(t.bind('b', t.tup(t.lit(1))), t.apply('ifTrue', t.lit(True), t.block(inner))))
+    assert inner.vnode.mayMutate == (0,)
+
+
+def testHoistedInvariantIsShared():
+    once = t.node(tconce, vnode=t.tup(t.lit(1)), name='__once1__')
+    assert _marks(t.bind('b', once), t.bind('b', t.apply('T', t.get('b')))) == ()
+    hoisted = t.node(tchoist, vnode=t.apply('T', t.tup(t.lit(1))), names=['__once1__'])
+    assert _marks(t.bind('b', hoisted), t.bind('b', t.apply('T', t.get('b')))) == (0,)
+
+
+def main():
+    testFreshValueIsUpdatedInPlace()
+    testNonLocalValueIsShared()
+    testAliasIsNotUnique()
+    testReadTwiceIsNotUnique()
+    testOnlyOptedInCallsAnswerFreshValues()
+    testCapturedByABlockIsNotUnique()
+    testBlockPassedToAFnIsAnalysedInline()
+    testHoistedInvariantIsShared()
+    print('pass')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,220 @@
+# **********************************************************************************************************************
+# Copyright 2025 David Briant, https://github.com/coppertop-bones. Licensed under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance with the License. You may obtain a copy of the  License at
+# http://www.apache.org/licenses/LICENSE-2.0. Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT WARRANTIES OR CONDITIONS OF ANY  KIND,
+# either express or implied. See the License for the specific language governing permissions and limitations under the
+# License. See the NOTICE file distributed with this work for additional information regarding copyright ownership.
+# **********************************************************************************************************************
+
+# Uniqueness / last use analysis so that library fns can update in place (see canon/test_suite/blocks.b). In
+#
+#   b: b T
+#
+# the old value of b is dead once the bind happens, so if nothing else can refer to it T may reuse its buffer. The pass
+# walks each phrase sequence tracking which local names may alias each other and, for a bind of the form
+# x: f(..., x, ...) where x is unique and read exactly once, sets tcapply.mayMutate to the index of that arg. The
+# interpreter passes mayMutate=(i, ...) to python fns that opt in with @acceptsMayMutate - anything else is unaffected.
+#
+# The tracking is deliberately conservative:
+#   - only LOCAL_SCOPE names bound earlier in the same sequence are candidates - a module, global, parent or
+#     contextual value may be referred to from elsewhere so a name bound to one (e.g. b: ..m) is never unique
+#   - a call's answer may be shared (e.g. a cached object) unless every fn it may select opts in with
+#     @acceptsMayMutate, which promises to answer a new value or one of its args
+#   - c: b, c: b.x and c: f(b) make c and b (and anything aliasing b) aliases of each other
+#   - a block passed directly to a fn (e.g. ifTrue: [b: b T]) is analysed inline, assuming it may run any number of
+#     times, other blocks and fns capture the names they use so those names are never unique afterwards
+#   - anything not understood makes every name it mentions non unique
+#   - a name bound to a folded constant (see optimise.py) is never unique as the value is shared by every execution
+#   - likewise a hoisted loop invariant (tconce) is shared by every iteration, the loop it came from (tchoist) is
+#     analysed as if it hadn't been hoisted
+
+from bones.core.sentinels import Missing
+from bones.lang.types import _tvfunc
+from bones.ts.select import Overload
+from bones.kernel._core import LOCAL_SCOPE
+from bones.kernel.tc import tcnode, tcsnippet, tcapply, tcbindval, tcgetval, tcblock, tcfunc, tcbindfn, tclit, \
+    tcconst, tclitbtype, tclittup, tclitstruct, tcgetfamily, tcgetoverload, tccoerce, tcpartialcheck, tchoist, tconce
+
+
+_SHARED = '<shared>'        # stands for a value that may be referred to from elsewhere, e.g. a folded constant
+
+
+def acceptsMayMutate(pyfn):
+    # marks a python fn as understanding the mayMutate kwarg - a tuple of the indices of args it may update in place
+    pyfn.bonesMayMutate = True
+    return pyfn
+
+
+def markMayMutate(snippet):
+    # answers the number of call sites marked
+    marker = _Marker()
+    marker.sequence(snippet.nodes if isinstance(snippet, tcsnippet) else [snippet], _AliasState())
+    return marker.numMarked
+
+
+class _AliasState:
+    __slots__ = ['known', 'escaped', 'aliasesByName']
+
+    def __init__(self, known=Missing, escaped=Missing, aliasesByName=Missing):
+        self.known = set() if known is Missing else known                   # bound locally in this sequence
+        self.escaped = set() if escaped is Missing else escaped             # may be referenced from elsewhere
+        self.aliasesByName = {} if aliasesByName is Missing else aliasesByName
+
+    def copy(self):
+        return _AliasState(set(self.known), set(self.escaped), {k: set(v) for k, v in self.aliasesByName.items()})
+
+    def isUnique(self, name):
+        return name in self.known and name not in self.escaped and not self.aliasesByName.get(name)
+
+    def bind(self, name, sources):
+        # name now refers to something that may also be referred to by sources (and their aliases)
+        for other in self.aliasesByName.pop(name, ()):
+            self.aliasesByName[other].discard(name)
+        aliases, escaped = set(), False
+        for source in sources:
+            if source == name: continue       # the old value is overwritten
+            aliases.add(source)
+            aliases.update(self.aliasesByName.get(source, ()))
+            escaped = escaped or source not in self.known or source in self.escaped
+        aliases.discard(name)
+        for other in aliases:
+            self.aliasesByName.setdefault(other, set()).add(name)
+        if aliases: self.aliasesByName[name] = aliases
+        self.known.add(name)
+        if escaped: self.escaped.add(name)
+        else: self.escaped.discard(name)
+
+    def escape(self, names):
+        self.escaped.update(names)
+
+    def joinWith(self, other):
+        self.known &= other.known
+        self.escaped |= other.escaped
+        for name, aliases in other.aliasesByName.items():
+            self.aliasesByName.setdefault(name, set()).update(aliases)
+
+
+class _Marker:
+
+    def __init__(self):
+        self.numMarked = 0
+
+    def sequence(self, nodes, state, mark=True):
+        for n in nodes:
+            self.node(n, state, mark)
+
+    def node(self, n, state, mark):
+        # answers the names whose values the result of n may refer to
+        if isinstance(n, tcbindval):
+            if n.accessors or n.scope != LOCAL_SCOPE:
+                state.escape(self.node(n.vnode, state, mark))
+                if n.accessors: state.escape([n.name])
+                return [n.name]
+            vnode = n.vnode.vnode if isinstance(n.vnode, tchoist) else n.vnode
+            if isinstance(vnode, tcapply):
+                sources = self.apply(vnode, state, mark, target=n.name)
+            else:
+                sources = self.node(vnode, state, mark)
+            state.bind(n.name, sources)
+            return [n.name]
+        if isinstance(n, tcgetval):
+            return [n.name] if n.scope == LOCAL_SCOPE else [_SHARED]
+        if isinstance(n, tcapply):
+            return self.apply(n, state, mark, Missing)
+        if isinstance(n, tcconst):
+            return [_SHARED]
+        if isinstance(n, tchoist):
+            return self.node(n.vnode, state, mark)
+        if isinstance(n, tconce):
+            # the value outlives the iteration so it and anything it refers to can't be updated in place
+            state.escape(self.node(n.vnode, state, False))
+            return [_SHARED]
+        if isinstance(n, (tclit, tclitbtype, tcgetfamily, tcgetoverload)):
+            return []
+        if isinstance(n, (tccoerce, tcpartialcheck)):
+            return self.node(n.lhnode, state, mark)
+        if isinstance(n, tclittup):
+            return [name for e in n.tv._v for name in self.node(e, state, mark)]
+        if isinstance(n, tclitstruct):
+            return [name for _, v in n.tv._kvs() for name in self.node(v, state, mark)]
+        if isinstance(n, tcbindfn):
+            self.node(n.fnode, state, mark)
+            return []
+        if isinstance(n, tcfunc):
+            # a fn has its own frame so analyse its body separately, but it may capture names from here
+            state.escape(_namesIn(n.body))
+            self.sequence(n.body, _AliasState(), mark)
+            return []
+        if isinstance(n, tcblock):
+            state.escape(_namesIn(n.body))
+            return []
+        if isinstance(n, tcnode):
+            state.escape(_namesIn([n]))
+        return []
+
+    def apply(self, n, state, mark, target):
+        sources = []
+        for arg in n.argnodes:
+            if isinstance(arg, tcblock) and not isinstance(arg, tcfunc):
+                self.inlineBlock(arg, state, mark)
+            else:
+                sources.extend(self.node(arg, state, mark))
+        if mark and target is not Missing and state.isUnique(target):
+            hints = tuple(
+                i for i, arg in enumerate(n.argnodes)
+                if isinstance(arg, tcgetval) and arg.name == target and arg.scope == LOCAL_SCOPE and not arg.accessors
+            )
+            if len(hints) == 1 and _countReads(n.argnodes, target) == 1:
+                n.mayMutate = hints
+                self.numMarked += 1
+        if not _answersNewOrArg(n): sources.append(_SHARED)
+        return sources
+
+    def inlineBlock(self, block, state, mark):
+        # the block may run zero or more times so join the state before and after, twice to catch anything carried
+        # from one iteration to the next, marking only on the final pass
+        for final in (False, True):
+            after = state.copy()
+            self.sequence(block.body, after, mark and final)
+            state.joinWith(after)
+
+
+def _answersNewOrArg(n):
+    # True if every fn n may call follows the @acceptsMayMutate protocol
+    fnnode = n.fnnode
+    if (name := getattr(fnnode, 'name', Missing)) is Missing: return False
+    if (fnMeta := n.symtab.fMetaForGet(name, fnnode.scope)) is Missing: return False
+    ov = fnMeta.symtab.getOverload(name, len(n.argnodes))
+    if not isinstance(ov, Overload) or not ov: return False
+    return all(isinstance(fn, _tvfunc) and getattr(fn._v, 'bonesMayMutate', False) for _, fn in ov.items())
+
+
+def _namesIn(nodes):
+    names = set()
+    stack = list(nodes)
+    while stack:
+        n = stack.pop()
+        if isinstance(n, (tcgetval, tcbindval)): names.add(n.name)
+        for attr in ('vnode', 'lhnode', 'fnode'):
+            if (child := getattr(n, attr, Missing)) is not Missing and isinstance(child, tcnode): stack.append(child)
+        if isinstance(n, tcapply): stack.extend(n.argnodes)
+        if isinstance(n, tcblock): stack.extend(n.body)
+        if isinstance(n, tclittup): stack.extend(e for e in n.tv._v if isinstance(e, tcnode))
+        if isinstance(n, tclitstruct): stack.extend(v for _, v in n.tv._kvs() if isinstance(v, tcnode))
+    return names
+
+
+def _countReads(nodes, name):
+    return sum(1 for n in _walk(nodes) if isinstance(n, tcgetval) and n.name == name)
+
+
+def _walk(nodes):
+    stack = list(nodes)
+    while stack:
+        n = stack.pop()
+        yield n
+        for attr in ('vnode', 'lhnode', 'fnode'):
+            if (child := getattr(n, attr, Missing)) is not Missing and isinstance(child, tcnode): stack.append(child)
+        if isinstance(n, tcapply): stack.extend(n.argnodes)
+        if isinstance(n, tcblock): stack.extend(n.body)